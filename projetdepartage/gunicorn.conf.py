@@ -0,0 +1,53 @@
+"""
+Configuration gunicorn, chargée automatiquement depuis ce répertoire :
+
+    gunicorn projetdepartage.wsgi
+
+L'application est préchargée dans le processus maître (imports, settings,
+URLconf et serializers partagés par copy-on-write), puis chaque worker exécute
+le préchauffage de mesrecettes/startup.py avant de recevoir des requêtes.
+
+Les workers partagent un répertoire de métriques (METRICS_DIR, voir
+mesrecettes/metrics.py) créé à chaque démarrage du maître, avant le
+chargement des settings, et supprimé à l'arrêt.
+
+Variables d'environnement : GUNICORN_PRELOAD (True par défaut), WEB_CONCURRENCY
+(nombre de workers, lu directement par gunicorn), STARTUP_WARM_UP (settings).
+"""
+import os
+import shutil
+import tempfile
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() in ('true', '1', 'yes')
+
+if 'METRICS_DIR' not in os.environ:
+    os.environ['METRICS_DIR'] = _metrics_dir = tempfile.mkdtemp(prefix='mesrecettes-metrics-')
+else:
+    _metrics_dir = None
+
+
+def when_ready(server):
+    # Étapes sans état propre au processus : faites une seule fois avant le fork
+    if preload_app:
+        from mesrecettes import startup
+        startup.warm_up(scopes=(startup.SHARED,))
+
+
+def post_fork(server, worker):
+    # Une connexion ouverte dans le maître ne doit pas être partagée entre workers
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    from mesrecettes import startup
+    if preload_app:
+        startup.warm_up(scopes=(startup.WORKER,))
+    else:
+        startup.warm_up()
+
+
+def on_exit(server):
+    if _metrics_dir:
+        shutil.rmtree(_metrics_dir, ignore_errors=True)
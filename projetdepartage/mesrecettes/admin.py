@@ -1,13 +1,29 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Count, Q
+from django.urls import reverse
 from django.utils.html import format_html
 from .models import (
     User, UserProfile, Recipe, RecipeImage, Ingredient,
     RecipeCategory, IngredientCategory, DietaryRestriction,
     Allergy, FavoriteRecipe, RecipeView, ShoppingList,
-    ShoppingListItem, Menu, MenuRecipe
+    ShoppingListItem, Menu, MenuRecipe, UserStatistics, SlowQuery
 )
 
+# Listes de l'admin en nombre de requêtes constant : les compteurs sont des
+# annotations de get_queryset, les clés étrangères affichées (et celles de leur
+# __str__) sont chargées par list_select_related. Les tables volumineuses
+# (utilisateurs, recettes, listes, menus) sont choisies par autocomplétion et ne
+# servent pas de filtres latéraux : filtrer par l'URL (?recipe__id__exact=...)
+# ou depuis les liens des compteurs.
+
+
+def changelist_link(model, count, **filters):
+    """Compteur cliquable vers la liste de `model` filtrée"""
+    url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+    query = '&'.join(f'{lookup}={value}' for lookup, value in filters.items())
+    return format_html('<a href="{}?{}">{}</a>', url, query, count)
+
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -28,6 +44,8 @@ class UserAdmin(BaseUserAdmin):
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'get_dietary_restrictions_count', 'get_allergies_count', 'created_at', 'updated_at']
     list_filter = ['created_at', 'updated_at']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
     search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name']
     filter_horizontal = ['dietary_restrictions', 'allergies']
     readonly_fields = ['created_at', 'updated_at']
@@ -44,13 +62,22 @@ class UserProfileAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # distinct : les deux jointures ManyToMany se multiplient
+        return super().get_queryset(request).annotate(
+            dietary_restrictions_count=Count('dietary_restrictions', distinct=True),
+            allergies_count=Count('allergies', distinct=True),
+        )
+
     def get_dietary_restrictions_count(self, obj):
-        return obj.dietary_restrictions.count()
+        return obj.dietary_restrictions_count
     get_dietary_restrictions_count.short_description = 'Régimes alimentaires'
+    get_dietary_restrictions_count.admin_order_field = 'dietary_restrictions_count'
     
     def get_allergies_count(self, obj):
-        return obj.allergies.count()
+        return obj.allergies_count
     get_allergies_count.short_description = 'Allergies'
+    get_allergies_count.admin_order_field = 'allergies_count'
 
 
 @admin.register(RecipeCategory)
@@ -72,9 +99,15 @@ class RecipeCategoryAdmin(admin.ModelAdmin):
         return "Aucune image"
     get_image_preview.short_description = 'Aperçu'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=Count('recipe', filter=Q(recipe__deleted_at__isnull=True))
+        )
+
     def get_recipes_count(self, obj):
-        return obj.recipe_set.count()
+        return changelist_link(Recipe, obj.recipes_count, category__id__exact=obj.pk)
     get_recipes_count.short_description = 'Nombre de recettes'
+    get_recipes_count.admin_order_field = 'recipes_count'
 
 
 @admin.register(IngredientCategory)
@@ -82,9 +115,13 @@ class IngredientCategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'get_ingredients_count', 'description']
     search_fields = ['name', 'description']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(ingredients_count=Count('ingredient'))
+
     def get_ingredients_count(self, obj):
-        return obj.ingredient_set.count()
+        return changelist_link(Ingredient, obj.ingredients_count, category__id__exact=obj.pk)
     get_ingredients_count.short_description = 'Nombre d\'ingrédients'
+    get_ingredients_count.admin_order_field = 'ingredients_count'
 
 
 @admin.register(DietaryRestriction)
@@ -92,9 +129,13 @@ class DietaryRestrictionAdmin(admin.ModelAdmin):
     list_display = ['name', 'get_users_count', 'description']
     search_fields = ['name', 'description']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(users_count=Count('userprofile'))
+
     def get_users_count(self, obj):
-        return obj.userprofile_set.count()
+        return obj.users_count
     get_users_count.short_description = 'Utilisateurs'
+    get_users_count.admin_order_field = 'users_count'
 
 
 @admin.register(Allergy)
@@ -102,30 +143,39 @@ class AllergyAdmin(admin.ModelAdmin):
     list_display = ['name', 'get_users_count', 'description']
     search_fields = ['name', 'description']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(users_count=Count('userprofile'))
+
     def get_users_count(self, obj):
-        return obj.userprofile_set.count()
+        return obj.users_count
     get_users_count.short_description = 'Utilisateurs'
+    get_users_count.admin_order_field = 'users_count'
 
 
 class RecipeImageInline(admin.TabularInline):
     model = RecipeImage
     extra = 1
-    fields = ['image', 'order']
+    fields = ['image']
 
 
 class IngredientInline(admin.TabularInline):
     model = Ingredient
     extra = 1
-    fields = ['name', 'quantity', 'unit', 'category', 'estimated_price', 'order']
+    fields = ['name', 'quantity', 'unit', 'category', 'estimated_price']
+    # Un <select> complet par ligne sinon (une requête chacun)
+    autocomplete_fields = ['category']
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ['title', 'author', 'category', 'difficulty', 'servings', 'total_time_display', 
                     'estimated_cost', 'is_published', 'views_count', 'favorites_count', 'created_at']
-    list_filter = ['category', 'difficulty', 'estimated_cost', 'is_published', 'created_at', 'updated_at']
+    list_filter = ['category', 'difficulty', 'estimated_cost', 'is_published', 'created_at', 'updated_at',
+                   'deleted_at']
+    list_select_related = ['author', 'category']
     search_fields = ['title', 'description', 'author__username', 'author__email', 'tags']
     readonly_fields = ['views_count', 'favorites_count', 'created_at', 'updated_at', 'published_at']
+    autocomplete_fields = ['author']
     date_hierarchy = 'created_at'
     inlines = [RecipeImageInline, IngredientInline]
     
@@ -143,12 +193,21 @@ class RecipeAdmin(admin.ModelAdmin):
             'fields': ('views_count', 'favorites_count')
         }),
         ('Publication', {
-            'fields': ('is_published', 'published_at')
+            # deleted_at vidé : recette restaurée avant la purge (purge.py)
+            'fields': ('is_published', 'published_at', 'deleted_at')
         }),
         ('Dates', {
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+    def get_queryset(self, request):
+        # Recettes supprimées comprises (Recipe.objects les exclut), filtrables par deleted_at
+        queryset = Recipe.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
     
     def total_time_display(self, obj):
         return f"{obj.total_time} min"
@@ -163,10 +222,12 @@ class RecipeAdmin(admin.ModelAdmin):
 
 @admin.register(RecipeImage)
 class RecipeImageAdmin(admin.ModelAdmin):
-    list_display = ['recipe', 'image_preview', 'order', 'created_at']
-    list_filter = ['recipe', 'created_at']
+    list_display = ['recipe', 'image_preview', 'created_at']
+    list_filter = ['created_at']
+    list_select_related = ['recipe']
     search_fields = ['recipe__title']
-    ordering = ['recipe', 'order']
+    autocomplete_fields = ['recipe']
+    ordering = ['recipe', 'rank']
     
     def image_preview(self, obj):
         if obj.image:
@@ -177,17 +238,20 @@ class RecipeImageAdmin(admin.ModelAdmin):
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
-    list_display = ['name', 'recipe', 'quantity', 'unit', 'category', 'estimated_price', 'order']
-    list_filter = ['category', 'recipe', 'recipe__author']
+    list_display = ['name', 'recipe', 'quantity', 'unit', 'category', 'estimated_price']
+    list_filter = ['category']
+    list_select_related = ['recipe', 'category']
     search_fields = ['name', 'recipe__title']
-    ordering = ['recipe', 'order']
+    ordering = ['recipe', 'rank']
+    autocomplete_fields = ['recipe', 'category']
+    show_full_result_count = False
     
     fieldsets = (
         ('Informations', {
             'fields': ('recipe', 'name', 'category')
         }),
         ('Quantité et prix', {
-            'fields': ('quantity', 'unit', 'estimated_price', 'order')
+            'fields': ('quantity', 'unit', 'estimated_price')
         }),
     )
 
@@ -196,66 +260,89 @@ class IngredientAdmin(admin.ModelAdmin):
 class FavoriteRecipeAdmin(admin.ModelAdmin):
     list_display = ['user', 'recipe', 'created_at']
     list_filter = ['created_at', 'recipe__category']
+    list_select_related = ['user', 'recipe']
     search_fields = ['user__username', 'recipe__title']
     date_hierarchy = 'created_at'
     readonly_fields = ['created_at']
+    autocomplete_fields = ['user', 'recipe']
+    show_full_result_count = False
 
 
 @admin.register(RecipeView)
 class RecipeViewAdmin(admin.ModelAdmin):
     list_display = ['recipe', 'user', 'ip_address', 'viewed_at']
     list_filter = ['viewed_at', 'recipe__category']
+    list_select_related = ['recipe', 'user']
     search_fields = ['recipe__title', 'user__username', 'ip_address']
     date_hierarchy = 'viewed_at'
     readonly_fields = ['viewed_at']
+    autocomplete_fields = ['recipe', 'user']
+    show_full_result_count = False
 
 
 class ShoppingListItemInline(admin.TabularInline):
     model = ShoppingListItem
     extra = 1
-    fields = ['ingredient_name', 'quantity', 'unit', 'category', 'is_checked', 'order']
+    fields = ['ingredient_name', 'quantity', 'unit', 'category', 'is_checked']
+    autocomplete_fields = ['category']
 
 
 @admin.register(ShoppingList)
 class ShoppingListAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'get_items_count', 'get_checked_items_count', 'created_at', 'updated_at']
     list_filter = ['created_at', 'updated_at']
+    list_select_related = ['user']
     search_fields = ['name', 'user__username', 'user__email']
     date_hierarchy = 'created_at'
     inlines = [ShoppingListItemInline]
     readonly_fields = ['created_at', 'updated_at']
+    autocomplete_fields = ['user']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            items_count=Count('items'),
+            checked_items_count=Count('items', filter=Q(items__is_checked=True)),
+        )
     
     def get_items_count(self, obj):
-        return obj.items.count()
+        return changelist_link(ShoppingListItem, obj.items_count, shopping_list__id__exact=obj.pk)
     get_items_count.short_description = 'Total items'
+    get_items_count.admin_order_field = 'items_count'
     
     def get_checked_items_count(self, obj):
-        return obj.items.filter(is_checked=True).count()
+        return obj.checked_items_count
     get_checked_items_count.short_description = 'Items cochés'
+    get_checked_items_count.admin_order_field = 'checked_items_count'
 
 
 @admin.register(ShoppingListItem)
 class ShoppingListItemAdmin(admin.ModelAdmin):
-    list_display = ['ingredient_name', 'shopping_list', 'quantity', 'unit', 'category', 'is_checked', 'order']
-    list_filter = ['is_checked', 'category', 'shopping_list']
+    list_display = ['ingredient_name', 'shopping_list', 'quantity', 'unit', 'category', 'is_checked']
+    list_filter = ['is_checked', 'category']
+    list_select_related = ['shopping_list__user', 'category']
     search_fields = ['ingredient_name', 'shopping_list__name', 'shopping_list__user__username']
-    ordering = ['shopping_list', 'order', 'ingredient_name']
+    ordering = ['shopping_list', 'rank', 'ingredient_name']
+    autocomplete_fields = ['shopping_list', 'category']
+    show_full_result_count = False
 
 
 class MenuRecipeInline(admin.TabularInline):
     model = MenuRecipe
     extra = 1
     fields = ['recipe', 'date', 'meal_type']
+    autocomplete_fields = ['recipe']
 
 
 @admin.register(Menu)
 class MenuAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'start_date', 'end_date', 'get_recipes_count', 'created_at', 'updated_at']
     list_filter = ['start_date', 'end_date', 'created_at']
+    list_select_related = ['user']
     search_fields = ['name', 'user__username', 'user__email']
     date_hierarchy = 'start_date'
     inlines = [MenuRecipeInline]
     readonly_fields = ['created_at', 'updated_at']
+    autocomplete_fields = ['user']
     
     fieldsets = (
         ('Informations', {
@@ -269,17 +356,23 @@ class MenuAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(recipes_count=Count('recipes'))
+
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return changelist_link(MenuRecipe, obj.recipes_count, menu__id__exact=obj.pk)
     get_recipes_count.short_description = 'Nombre de recettes'
+    get_recipes_count.admin_order_field = 'recipes_count'
 
 
 @admin.register(MenuRecipe)
 class MenuRecipeAdmin(admin.ModelAdmin):
     list_display = ['menu', 'recipe', 'date', 'meal_type']
-    list_filter = ['meal_type', 'date', 'menu']
+    list_filter = ['meal_type', 'date']
+    list_select_related = ['menu__user', 'recipe']
     search_fields = ['menu__name', 'recipe__title', 'menu__user__username']
     date_hierarchy = 'date'
+    autocomplete_fields = ['menu', 'recipe']
     
     fieldsets = (
         ('Informations', {
@@ -291,3 +384,51 @@ class MenuRecipeAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(UserStatistics)
+class UserStatisticsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'recipes_count', 'favorites_given', 'favorites_received',
+                    'views_made', 'views_received', 'updated_at']
+    list_select_related = ['user']
+    search_fields = ['user__username', 'user__email']
+    readonly_fields = ['updated_at']
+    autocomplete_fields = ['user']
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Tableau des requêtes lentes, alimenté par slow_queries.py"""
+    list_display = ['get_short_sql', 'view', 'count', 'get_mean_ms', 'max_ms', 'total_ms', 'last_seen']
+    list_filter = ['database', 'view']
+    search_fields = ['normalized_sql', 'view', 'fingerprint']
+    ordering = ['-total_ms']
+    readonly_fields = [field.name for field in SlowQuery._meta.fields]
+
+    fieldsets = (
+        ('Requête', {
+            'fields': ('fingerprint', 'normalized_sql', 'sample_sql', 'params_fingerprint', 'database', 'view')
+        }),
+        ('Durées', {
+            'fields': ('count', 'total_ms', 'max_ms', 'last_ms', 'first_seen', 'last_seen')
+        }),
+        ("Plan d'exécution", {
+            'fields': ('get_explain',)
+        }),
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_short_sql(self, obj):
+        return obj.normalized_sql[:120]
+    get_short_sql.short_description = 'SQL'
+
+    def get_mean_ms(self, obj):
+        return round(obj.total_ms / obj.count, 1) if obj.count else 0
+    get_mean_ms.short_description = 'Moyenne (ms)'
+
+    def get_explain(self, obj):
+        return format_html('<pre>{}</pre>', obj.explain or '—')
+    get_explain.short_description = 'EXPLAIN'
@@ -7,3 +7,4 @@ class MesrecettesConfig(AppConfig):
 
     def ready(self):
         import mesrecettes.signals  # Import des signals pour activer les handlers
+        import mesrecettes.slow_queries  # Journal des requêtes lentes (execute_wrapper)
@@ -0,0 +1,265 @@
+"""
+Vues asynchrones (ASGI) pour les endpoints de lecture les plus sollicités.
+
+DRF ne gère pas les vues async : ces vues Django natives réutilisent les
+serializers (sur des objets entièrement préchargés, donc sans accès à la base)
+et l'ORM asynchrone (aget, aiterator, aexists). Les requêtes indépendantes
+sont lancées en parallèle dans des threads disposant de leur propre connexion
+(désactivable avec ASYNC_PARALLEL_QUERIES = False, par exemple pour les tests
+exécutés dans une transaction).
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections, router
+from django.db.models import Exists, F, OuterRef
+from django.http import HttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import check_revoked, user_cache
+from .conditional import (
+    ALLERGIES, DIETARY_RESTRICTIONS, INGREDIENT_CATEGORIES, RECIPE_CATEGORIES
+)
+from .documents import recipe_body, with_document
+from .facets import get_facets, wants_facets
+from .models import FavoriteRecipe, Recipe, RecipeView
+from .pagination import page_number, paginated
+from .recipe_filters import filter_recipes, order_recipes, search_recipes, visible_recipes
+from .reference_data import get_snapshots
+from .renderers import FastJSONRenderer
+from .serializers import RecipeSerializer
+from .stats import format_statistics, get_daily_view_counts, get_statistics_row
+
+User = get_user_model()
+
+HISTORY_LIMIT = 50
+
+
+def json_response(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status)
+
+
+async def in_thread(func, *args):
+    """
+    Exécute une fonction ORM synchrone. En mode parallèle, elle tourne dans un
+    thread du pool avec sa propre connexion, ce qui permet à asyncio.gather de
+    faire avancer plusieurs requêtes en même temps.
+    """
+    if not getattr(settings, 'ASYNC_PARALLEL_QUERIES', True):
+        return await sync_to_async(func)(*args)
+
+    def call():
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(call, thread_sensitive=False)()
+
+
+async def authenticate(request):
+    """
+    Équivalent asynchrone de CachedJWTAuthentication : seul le chargement de
+    l'utilisateur, absent du cache, touche la base
+    """
+    backend = JWTAuthentication()
+    header = backend.get_header(request)
+    raw_token = backend.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return AnonymousUser()
+    validated_token = backend.get_validated_token(raw_token)
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken('Token contained no recognizable user identification')
+    user = user_cache.get(user_id)
+    if user is not None:
+        check_revoked(validated_token, user)
+        return user
+    user = await User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+    if user is None:
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    check_revoked(validated_token, user)
+    user_cache.set(user_id, user)
+    return user
+
+
+def async_api_view(require_authentication=False):
+    """Authentification JWT, restriction à GET et erreurs au format DRF"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            try:
+                request.user = await authenticate(request)
+            except (InvalidToken, TokenError, AuthenticationFailed) as exc:
+                return json_response({'detail': str(getattr(exc, 'detail', exc))}, status=401)
+            if require_authentication and not request.user.is_authenticated:
+                return json_response({'detail': "Informations d'authentification non fournies."}, status=401)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def favorited_ids(user, recipe_ids):
+    if not user.is_authenticated or not recipe_ids:
+        return set()
+    return {
+        recipe_id async for recipe_id in FavoriteRecipe.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True)
+    }
+
+
+def with_relations(queryset):
+    # Catégories lues depuis les instantanés de reference_data
+    return queryset.select_related('author').prefetch_related('ingredients', 'images')
+
+
+async def recipe_snapshots():
+    """Instantanés utilisés par RecipeSerializer, chargés hors de la boucle d'événements"""
+    return await in_thread(get_snapshots, RECIPE_CATEGORIES, INGREDIENT_CATEGORIES)
+
+
+def serialize_recipes(request, recipes, favorites, snapshots, many=True):
+    context = {'request': request, 'favorited_ids': favorites, 'reference_snapshots': snapshots}
+    return RecipeSerializer(recipes, many=many, context=context).data
+
+
+@async_api_view()
+async def recipe_list(request):
+    try:
+        queryset = filter_recipes(visible_recipes(request.user), request.GET)
+    except ValidationError as exc:
+        return json_response(exc.detail, status=400)
+    queryset = search_recipes(queryset, request.GET.get(api_settings.SEARCH_PARAM, ''))
+    queryset = order_recipes(queryset.distinct(), request.GET.get(api_settings.ORDERING_PARAM))
+
+    page = page_number(request)
+    if page is None or page < 1:
+        return json_response({'detail': 'Invalid page.'}, status=404)
+    size = api_settings.PAGE_SIZE
+    offset = (page - 1) * size
+
+    async def fetch_page():
+        page_queryset = with_relations(queryset[offset:offset + size])
+        return [recipe async for recipe in page_queryset.aiterator(chunk_size=size)]
+
+    async def fetch_facets():
+        if not wants_facets(request.GET):
+            return None
+        return await in_thread(get_facets, request.user, request.GET, request.GET.get(api_settings.SEARCH_PARAM, ''))
+
+    # Le COUNT, la page (avec ses préchargements), les facettes et les instantanés sont indépendants
+    count, recipes, facets, snapshots = await asyncio.gather(
+        in_thread(queryset.count), fetch_page(), fetch_facets(), recipe_snapshots()
+    )
+    if not recipes and page > 1:
+        return json_response({'detail': 'Invalid page.'}, status=404)
+
+    favorites = await favorited_ids(request.user, [recipe.pk for recipe in recipes])
+    results = serialize_recipes(request, recipes, favorites, snapshots)
+    data = paginated(request, page, count, results)
+    if facets is not None:
+        data['facets'] = facets
+    return json_response(data)
+
+
+@async_api_view()
+async def recipe_detail(request, pk):
+    # Lu sur la base d'écriture : views_count est incrémenté à partir de cet objet
+    queryset = with_document(Recipe.objects.using(router.db_for_write(Recipe)).only(
+        'id', 'author_id', 'views_count', 'favorites_count', 'is_published', 'updated_at'
+    ).annotate(author_updated_at=F('author__updated_at')))
+    if request.user.is_authenticated:
+        queryset = queryset.annotate(is_favorited_flag=Exists(
+            FavoriteRecipe.objects.filter(user=request.user, recipe=OuterRef('pk'))
+        ))
+    try:
+        recipe = await queryset.aget(pk=pk)
+    except (Recipe.DoesNotExist, ValueError):
+        recipe = None
+    if recipe is None or (not recipe.is_published and recipe.author_id != request.user.pk):
+        return json_response({'detail': 'No Recipe matches the given query.'}, status=404)
+
+    # Enregistrer la vue
+    await RecipeView.objects.acreate(
+        recipe=recipe,
+        user=request.user if request.user.is_authenticated else None,
+        ip_address=request.META.get('REMOTE_ADDR')
+    )
+    recipe.views_count += 1
+    await recipe.asave(update_fields=['views_count'])
+
+    # Document précalculé (documents.py), régénéré s'il est périmé ; recette non
+    # publiée (URLs d'images signées, voir media.py) : sérialisation complète
+    if recipe.is_published:
+        body = await in_thread(recipe_body, request, recipe)
+        if body is not None:
+            return HttpResponse(body, content_type='application/json')
+    try:
+        recipe = await with_relations(Recipe.objects.using(recipe._state.db)).aget(pk=pk)
+    except Recipe.DoesNotExist:
+        return json_response({'detail': 'No Recipe matches the given query.'}, status=404)
+    favorites, snapshots = await asyncio.gather(favorited_ids(request.user, [recipe.pk]), recipe_snapshots())
+    return json_response(serialize_recipes(request, recipe, favorites, snapshots, many=False))
+
+
+@async_api_view(require_authentication=True)
+async def recipe_history(request):
+    recipe_ids = [
+        recipe_id async for recipe_id in RecipeView.objects.filter(
+            user=request.user, recipe__deleted_at__isnull=True
+        ).order_by('-viewed_at').values_list('recipe_id', flat=True)[:HISTORY_LIMIT]
+    ]
+
+    async def fetch_recipes():
+        queryset = with_relations(Recipe.objects.filter(pk__in=set(recipe_ids)))
+        return {recipe.pk: recipe async for recipe in queryset.aiterator(chunk_size=HISTORY_LIMIT)}
+
+    recipes, favorites, snapshots = await asyncio.gather(
+        fetch_recipes(), favorited_ids(request.user, recipe_ids), recipe_snapshots()
+    )
+    ordered = [recipes[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes]
+    return json_response(serialize_recipes(request, ordered, favorites, snapshots))
+
+
+@async_api_view()
+async def recipe_category_list(request):
+    snapshots = await in_thread(get_snapshots, RECIPE_CATEGORIES)
+    body = snapshots[RECIPE_CATEGORIES].page_body(request, page_number(request), api_settings.PAGE_SIZE)
+    if body is None:
+        return json_response({'detail': 'Invalid page.'}, status=404)
+    return HttpResponse(body, content_type='application/json')
+
+
+@async_api_view()
+async def reference_data(request):
+    """Catégories, catégories d'ingrédients, régimes et allergies depuis les instantanés en mémoire"""
+    snapshots = await in_thread(get_snapshots)
+    return json_response({
+        'recipe_categories': snapshots[RECIPE_CATEGORIES].all(request),
+        'ingredient_categories': snapshots[INGREDIENT_CATEGORIES].all(request),
+        'dietary_restrictions': snapshots[DIETARY_RESTRICTIONS].all(request),
+        'allergies': snapshots[ALLERGIES].all(request),
+    })
+
+
+@async_api_view(require_authentication=True)
+async def statistics(request):
+    stats, counts = await asyncio.gather(
+        in_thread(get_statistics_row, request.user.pk),
+        in_thread(get_daily_view_counts, request.user.pk),
+    )
+    return json_response(format_statistics(stats, counts))
@@ -0,0 +1,114 @@
+"""
+Authentification JWT sans lecture de l'utilisateur à chaque requête.
+
+Les utilisateurs authentifiés sont conservés dans un cache LRU borné, propre
+au processus, avec une durée de vie courte (JWT_USER_CACHE_TTL). Une entrée
+est invalidée dès que l'utilisateur est enregistré ou supprimé dans le
+processus courant (voir signals.py) ; les autres workers la voient expirer au
+plus tard après le TTL. Les requêtes en écriture rechargent toujours
+l'utilisateur depuis la base.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .profiling import phase
+
+
+class UserCache:
+    """
+    Cache LRU borné, avec expiration, des utilisateurs actifs. Les clés sont
+    normalisées en chaînes : les jetons portent l'identifiant sous forme de
+    texte, les signals sous forme d'entier.
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        return self._maxsize or getattr(settings, 'JWT_USER_CACHE_SIZE', 1024)
+
+    @property
+    def ttl(self):
+        return self._ttl if self._ttl is not None else getattr(settings, 'JWT_USER_CACHE_TTL', 30)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id):
+        """Copie de l'utilisateur en cache (les vues peuvent la modifier), None si absent ou expiré"""
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        if not self.ttl or not user.is_active:
+            return
+        user_id = str(user_id)
+        with self._lock:
+            self._entries[user_id] = (copy.copy(user), time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(user_id), None)
+
+
+user_cache = UserCache()
+
+
+def check_revoked(validated_token, user):
+    """Même contrôle que simplejwt (CHECK_REVOKE_TOKEN) pour un utilisateur lu depuis le cache"""
+    if jwt_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication dont l'utilisateur est lu depuis user_cache pour les
+    requêtes en lecture (GET, HEAD, OPTIONS). Les autres méthodes chargent
+    l'utilisateur depuis la base, comme la classe de simplejwt.
+    """
+
+    def authenticate(self, request):
+        self.use_cache = request.method in SAFE_METHODS
+        with phase('auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if not getattr(self, 'use_cache', False):
+            return super().get_user(validated_token)
+        user_id = validated_token.get(jwt_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        else:
+            check_revoked(validated_token, user)
+        return user
@@ -0,0 +1,122 @@
+"""
+Opérations groupées sur les items de listes de courses
+(POST /shopping-list-items/bulk/).
+
+Un lot mêle créations, modifications et suppressions. La propriété est
+vérifiée pour l'ensemble du lot (deux requêtes : items et listes de
+l'utilisateur), chaque opération est validée sans requête, puis le lot est
+appliqué dans une transaction : une nouvelle révision par liste touchée (voir
+sync.py), un DELETE, un bulk_update et un bulk_create. Si une opération est
+invalide, rien n'est appliqué.
+"""
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import ShoppingList, ShoppingListItem, ShoppingListTombstone
+from .purge import raw_delete
+from .ranking import append_ranks
+from .serializers import BulkShoppingListItemSerializer
+from .sync import bump
+
+
+def apply_item_operations(user, operations, context=None):
+    """
+    Applique les opérations validées par ShoppingListItemBulkSerializer.
+
+    Renvoie (succès, résultats) ; un résultat par opération, dans l'ordre.
+    """
+    item_ids = {operation['id'] for operation in operations if operation['op'] != 'create'}
+    items = ShoppingListItem.objects.filter(shopping_list__user=user).in_bulk(item_ids)
+    list_ids = {operation['shopping_list'] for operation in operations if operation['op'] == 'create'}
+    owned_lists = set(
+        ShoppingList.objects.filter(user=user, pk__in=list_ids).values_list('pk', flat=True)
+    ) if list_ids else set()
+
+    results = []
+    deleted, updated, created = set(), [], []
+    fields = set()
+    for operation in operations:
+        op = operation['op']
+        if op == 'create':
+            if operation['shopping_list'] not in owned_lists:
+                results.append({'op': op, 'status': 'error', 'errors': {'shopping_list': 'Liste introuvable.'}})
+                continue
+            instance = None
+        else:
+            instance = items.get(operation['id'])
+            # Items d'un autre utilisateur : même réponse qu'un item inexistant
+            if instance is None or operation['id'] in deleted:
+                results.append({'op': op, 'id': operation['id'], 'status': 'error', 'errors': {'id': 'Item introuvable.'}})
+                continue
+        if op == 'delete':
+            deleted.add(instance.pk)
+            results.append({'op': op, 'id': instance.pk, 'status': 'ok'})
+            continue
+
+        serializer = BulkShoppingListItemSerializer(
+            instance, data=operation['data'], partial=op == 'update', context=context
+        )
+        if not serializer.is_valid():
+            result = {'op': op, 'status': 'error', 'errors': serializer.errors}
+            if instance is not None:
+                result['id'] = instance.pk
+            results.append(result)
+            continue
+        data = serializer.validated_data
+        if op == 'create':
+            instance = ShoppingListItem(shopping_list_id=operation['shopping_list'], **data)
+            created.append(instance)
+        else:
+            for field, value in data.items():
+                setattr(instance, field, value)
+            fields.update(data)
+            updated.append(instance)
+        results.append({'op': op, 'instance': instance})
+
+    if any(result.get('status') == 'error' for result in results):
+        for result in results:
+            if result.get('status') != 'error':
+                instance = result.pop('instance', None)
+                if instance is not None and instance.pk is not None:
+                    result['id'] = instance.pk
+                result['status'] = 'skipped'
+        return False, results
+
+    # Un item modifié puis supprimé dans le même lot est seulement supprimé
+    updated = [instance for instance in updated if instance.pk not in deleted]
+    touched = (
+        {items[pk].shopping_list_id for pk in deleted}
+        | {instance.shopping_list_id for instance in updated}
+        | {instance.shopping_list_id for instance in created}
+    )
+    using = router.db_for_write(ShoppingListItem)
+    with transaction.atomic(using=using):
+        # Les opérations groupées n'envoient pas de signals : révisions de
+        # synchronisation (et updated_at des listes) attribuées ici, listes
+        # verrouillées dans un ordre fixe
+        revisions = {pk: bump(pk) for pk in sorted(touched)}
+        now = timezone.now()
+        if deleted:
+            ShoppingListTombstone.objects.bulk_create([
+                ShoppingListTombstone(
+                    shopping_list_id=items[pk].shopping_list_id, item_id=pk, client_id=items[pk].client_id,
+                    revision=revisions[items[pk].shopping_list_id], deleted_at=now,
+                ) for pk in deleted
+            ])
+            # Tombstones déjà inscrites ci-dessus : sans le receiver post_delete
+            raw_delete(ShoppingListItem.objects.filter(pk__in=deleted), using)
+        for instance in updated + created:
+            instance.revision, instance.updated_at = revisions[instance.shopping_list_id], now
+        if updated:
+            ShoppingListItem.objects.bulk_update(updated, sorted(fields | {'revision', 'updated_at'}))
+        if created:
+            append_ranks(created)
+            ShoppingListItem.objects.bulk_create(created)
+
+    for result in results:
+        instance = result.pop('instance', None)
+        if instance is not None:
+            result['id'] = instance.pk
+            result['status'] = 'ok'
+            result['item'] = BulkShoppingListItemSerializer(instance, context=context).data
+    return True, results
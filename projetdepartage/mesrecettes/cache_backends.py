@@ -0,0 +1,56 @@
+"""
+Backends de cache Django comptant les lectures trouvées / manquées
+(django_cache_requests_total, voir metrics.py).
+
+Chaque classe reprend le backend Django du même nom ; l'étiquette `cache` des
+métriques est METRICS_NAME dans CACHES, à défaut LOCATION.
+"""
+from django.core.cache.backends import db, filebased, locmem, memcached, redis
+from django.core.cache.backends.base import BaseCache
+
+from . import metrics
+
+
+class MetricsCacheMixin:
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.metrics_name = params.get('METRICS_NAME') or location or 'default'
+        # BaseCache.get_many repasse par get() : ses lectures sont déjà comptées
+        implementation = next(
+            klass for klass in type(self).__mro__
+            if klass is not MetricsCacheMixin and 'get_many' in vars(klass)
+        )
+        self._get_many_counted = implementation is BaseCache
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing_key, version=version)
+        metrics.record_cache(self.metrics_name, value is not self._missing_key)
+        return default if value is self._missing_key else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        if not self._get_many_counted:
+            for key in keys:
+                metrics.record_cache(self.metrics_name, key in found)
+        return found
+
+
+class LocMemCache(MetricsCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(MetricsCacheMixin, filebased.FileBasedCache):
+    pass
+
+
+class DatabaseCache(MetricsCacheMixin, db.DatabaseCache):
+    pass
+
+
+class RedisCache(MetricsCacheMixin, redis.RedisCache):
+    pass
+
+
+class PyMemcacheCache(MetricsCacheMixin, memcached.PyMemcacheCache):
+    pass
@@ -0,0 +1,116 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified) pour les endpoints de lecture.
+
+Les validateurs sont calculés à partir de champs updated_at et de compteurs de
+version (ResourceVersion) sans sérialiser le corps de la réponse : si le
+client possède déjà la bonne version, un 304 est renvoyé avant que les
+serializers ne soient exécutés.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import ResourceVersion
+
+RECIPE_CATEGORIES = 'recipe-categories'
+INGREDIENT_CATEGORIES = 'ingredient-categories'
+DIETARY_RESTRICTIONS = 'dietary-restrictions'
+ALLERGIES = 'allergies'
+
+
+def bump_version(name):
+    """Incrémente le compteur de version `name` (créé à la volée)"""
+    now = timezone.now()
+    updated = ResourceVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            ResourceVersion.objects.create(name=name, version=1, updated_at=now)
+    except IntegrityError:
+        ResourceVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+
+
+def get_versions(*names):
+    """Retourne {name: (version, updated_at)} en une requête ; (0, None) si absent"""
+    found = {
+        name: (version, updated_at)
+        for name, version, updated_at in ResourceVersion.objects.filter(
+            name__in=names
+        ).values_list('name', 'version', 'updated_at')
+    }
+    return {name: found.get(name, (0, None)) for name in names}
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return 'W/' + quote_etag(digest)
+
+
+def latest(*datetimes):
+    values = [value for value in datetimes if value is not None]
+    return max(values) if values else None
+
+
+class ConditionalGetMixin:
+    """
+    Mixin de ViewSet : list et retrieve répondent 304 lorsque les validateurs
+    renvoyés par get_validators() correspondent à ceux du client.
+    """
+    # Ressource identique pour tous les utilisateurs (sinon privée, Vary: Authorization)
+    public_cache = False
+    cache_max_age = 0
+
+    def get_validators(self):
+        """Retourne (etag, last_modified) pour l'action courante"""
+        return None, None
+
+    def is_public_response(self):
+        return self.public_cache
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = None
+        if etag or timestamp:
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            self.patch_conditional_headers(response, etag, timestamp)
+        return response
+
+    def patch_conditional_headers(self, response, etag, timestamp):
+        if etag:
+            response.headers['ETag'] = etag
+        if timestamp:
+            response.headers['Last-Modified'] = http_date(timestamp)
+        if self.is_public_response():
+            if self.cache_max_age:
+                patch_cache_control(response, public=True, max_age=self.cache_max_age)
+            else:
+                patch_cache_control(response, public=True, no_cache=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+
+
+class VersionedConditionalGetMixin(ConditionalGetMixin):
+    """Validateurs dérivés d'un unique compteur de version (données de référence)"""
+    public_cache = True
+    cache_max_age = 300
+    version_key = None
+
+    def get_validators(self):
+        version, updated_at = get_versions(self.version_key)[self.version_key]
+        return make_etag(self.version_key, version, self.request.get_full_path()), updated_at
@@ -0,0 +1,151 @@
+"""
+Routage des lectures vers les réplicas (DATABASE_REPLICA_URLS).
+
+Les écritures et les migrations vont toujours sur `default`. Les lectures
+d'une requête vont toutes sur un même réplica sain, choisi à tour de rôle
+d'une requête à l'autre, sauf :
+- pendant une requête en écriture ou sur un chemin exclu (REPLICA_EXCLUDED_PATHS) ;
+- pendant REPLICA_PIN_SECONDS après une écriture du même client, pour qu'il
+  relise ses propres modifications (read-your-writes) ;
+- à l'intérieur d'une transaction ouverte sur `default` (select_for_update...).
+
+Le réplica est choisi une fois par ReplicaRoutingMiddleware (middleware.py)
+et fixé dans une ContextVar, propagée aux threads des vues asynchrones par
+asgiref : les lectures d'une requête voient un même état de la base.
+"""
+import base64
+import itertools
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+logger = logging.getLogger(__name__)
+
+# Réplica des lectures de la requête courante ; None : toutes sur le primaire
+read_replica = ContextVar('read_replica', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaHealth:
+    """
+    État des réplicas, vérifié au plus toutes les REPLICA_HEALTH_CHECK_INTERVAL
+    secondes : connexion, présence du schéma et, sous PostgreSQL, retard de
+    réplication inférieur à REPLICA_MAX_LAG secondes.
+    """
+
+    def __init__(self):
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias):
+        healthy, checked_at = self._status.get(alias, (True, None))
+        interval = getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 10)
+        if checked_at is None or time.monotonic() - checked_at >= interval:
+            with self._lock:
+                healthy = self.check(alias)
+                self._status[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+                if connection.vendor == 'postgresql':
+                    # NULL hors réplication (base locale de test) : aucun retard
+                    cursor.execute('SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())')
+                    lag = cursor.fetchone()[0]
+                    if lag is not None and lag > getattr(settings, 'REPLICA_MAX_LAG', 30):
+                        logger.warning('Réplica %s en retard de %.0f s', alias, lag)
+                        return False
+        except Exception:
+            logger.warning('Réplica %s indisponible', alias, exc_info=True)
+            connection.close()
+            return False
+        return True
+
+    def reset(self):
+        self._status.clear()
+
+
+health = ReplicaHealth()
+_round_robin = itertools.count()
+
+
+def pick_replica():
+    """Prochain réplica sain (tour de rôle), None si aucun ; appelé une fois par requête"""
+    healthy = [alias for alias in replica_aliases() if health.is_healthy(alias)]
+    if not healthy:
+        return None
+    return healthy[next(_round_robin) % len(healthy)]
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_replica.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Les réplicas reçoivent le schéma par réplication
+        return db == DEFAULT_DB_ALIAS
+
+
+# ---------------------------------------------------------------------------
+# Épinglage sur le primaire après une écriture
+# ---------------------------------------------------------------------------
+
+def _token_user_id(request):
+    """Identifiant du jeton JWT, lu sans vérification de signature (sert uniquement au routage)"""
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(parts) != 2 or parts[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        payload = parts[1].split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return claims.get(jwt_settings.USER_ID_CLAIM)
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+def client_key(request):
+    user_id = _token_user_id(request)
+    if user_id is not None:
+        return f'replica-pin:user:{user_id}'
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session_key:
+        return f'replica-pin:session:{session_key}'
+    return f"replica-pin:ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def pin_cache():
+    # Avec plusieurs workers, REPLICA_PIN_CACHE doit désigner un cache partagé
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE', 'default')]
+
+
+def pin_to_primary(request):
+    pin_cache().set(client_key(request), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned(request):
+    return bool(pin_cache().get(client_key(request)))
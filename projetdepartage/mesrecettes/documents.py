@@ -0,0 +1,211 @@
+"""
+Documents précalculés du détail des recettes.
+
+Le détail d'une recette (RecipeSerializer : auteur, catégorie, ingrédients,
+images) est sérialisé une fois et stocké en JSON dans RecipeDocument. Une
+lecture charge le document avec la recette, dans la requête qui calcule
+l'ETag (with_document), et renvoie ses octets tels quels, complétés des seuls
+champs propres au lecteur ou modifiés à chaque lecture (LIVE_FIELDS).
+
+Un document porte l'empreinte des données dont il dépend : updated_at de la
+recette et de son auteur, versions des catégories (ResourceVersion) et
+FORMAT. Il est régénéré à la lecture si elle ne correspond plus ; aucune
+écriture concurrente ne peut donc faire servir un document périmé.
+- Recette, ingrédients, images : updated_at de la recette est avancé une fois
+  dans la transaction de la modification (signals.py), puis le document est
+  régénéré à son commit, qu'elle vienne d'une requête ou d'une commande ;
+- auteur, catégories : régénération à la lecture suivante (une modification
+  peut toucher un grand nombre de recettes).
+
+Les URLs de médias sont stockées préfixées de BASE_URL_MARKER, remplacé à la
+lecture par l'origine de la requête : un même document sert tous les hôtes.
+Les recettes non publiées, aux URLs d'images signées et expirantes (media.py),
+sont toujours sérialisées à la lecture.
+
+    python manage.py rebuild_recipe_documents
+"""
+import hashlib
+import logging
+import re
+import threading
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError, router, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .conditional import INGREDIENT_CATEGORIES, RECIPE_CATEGORIES
+from .models import Recipe, RecipeDocument
+from .reference_data import get_snapshots, reference_versions
+from .renderers import FastJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter si la représentation change (serializers) : les documents sont alors régénérés
+FORMAT = 1
+# Champs propres au lecteur ou modifiés à chaque lecture, ajoutés au document servi
+LIVE_FIELDS = ('views_count', 'favorites_count', 'is_favorited')
+# Caractère NUL, refusé dans les champs texte (DRF, PostgreSQL) : encodé \u0000 en JSON
+BASE_URL_MARKER = '\x00'
+# \u0000 qui n'est pas précédé d'un antislash échappé (texte "\u0000" saisi tel quel)
+ENCODED_MARKER = re.compile(rb'(?<!\\)((?:\\\\)*)\\u0000')
+
+_local = threading.local()
+
+
+class DocumentRequest:
+    """Requête fictive passée au serializer : URLs de médias relatives, préfixées du marqueur"""
+    user = AnonymousUser()
+
+    def build_absolute_uri(self, location):
+        if location.startswith('/') and not location.startswith('//'):
+            return BASE_URL_MARKER + location
+        return location
+
+
+def fingerprint(updated_at, author_updated_at, versions):
+    parts = (
+        FORMAT, updated_at.isoformat(), author_updated_at.isoformat(),
+        versions[RECIPE_CATEGORIES][0], versions[INGREDIENT_CATEGORIES][0],
+    )
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def with_document(queryset):
+    """Annote les recettes de leur document stocké (document_body, document_fingerprint)"""
+    documents = RecipeDocument.objects.filter(recipe=OuterRef('pk'))
+    return queryset.annotate(
+        document_body=Subquery(documents.values('body')),
+        document_fingerprint=Subquery(documents.values('fingerprint')),
+    )
+
+
+def build_documents(pks, using=None):
+    """Génère et enregistre les documents des recettes `pks` ; {pk: corps JSON}"""
+    from .serializers import RecipeSerializer
+
+    versions = reference_versions()
+    context = {
+        'request': DocumentRequest(),
+        'favorited_ids': set(),
+        'reference_snapshots': get_snapshots(RECIPE_CATEGORIES, INGREDIENT_CATEGORIES),
+    }
+    # Recettes non publiées : URLs d'images signées et expirantes (media.py), jamais stockées
+    recipes = Recipe.objects.db_manager(using).filter(pk__in=pks, is_published=True).select_related(
+        'author'
+    ).prefetch_related('ingredients', 'images')
+    renderer = FastJSONRenderer()
+    now = timezone.now()
+    documents = []
+    for recipe in recipes:
+        data = RecipeSerializer(recipe, context=context).data
+        for field in LIVE_FIELDS:
+            del data[field]
+        documents.append(RecipeDocument(
+            recipe_id=recipe.pk, body=renderer.render(data), generated_at=now,
+            fingerprint=fingerprint(recipe.updated_at, recipe.author.updated_at, versions),
+        ))
+    try:
+        with transaction.atomic(using=using):
+            RecipeDocument.objects.db_manager(using).bulk_create(
+                documents, update_conflicts=True, unique_fields=['recipe'],
+                update_fields=['fingerprint', 'body', 'generated_at'],
+            )
+    except IntegrityError:
+        # Recette supprimée entre-temps : les documents seront régénérés à la lecture
+        logger.info("Documents de recettes non enregistrés", exc_info=True)
+    return {document.recipe_id: document.body for document in documents}
+
+
+def render(request, body, recipe):
+    """Corps servi : document aux URLs absolues, complété des champs LIVE_FIELDS de `recipe`"""
+    if b'\\u0000' in body:
+        origin = request.build_absolute_uri('/')[:-1].encode()
+        body = ENCODED_MARKER.sub(lambda match: match.group(1) + origin, body)
+    live = FastJSONRenderer().render({
+        'views_count': recipe.views_count,
+        'favorites_count': recipe.favorites_count,
+        'is_favorited': bool(getattr(recipe, 'is_favorited_flag', False)),
+    })
+    return body[:-1] + b',' + live[1:]
+
+
+def recipe_body(request, recipe):
+    """
+    Corps JSON du détail de `recipe`, chargée avec with_document et annotée de
+    author_updated_at (et is_favorited_flag pour un utilisateur authentifié).
+    None si la recette vient d'être supprimée ou dépubliée.
+    """
+    body = recipe.document_body
+    current = fingerprint(recipe.updated_at, recipe.author_updated_at, reference_versions())
+    if body is None or recipe.document_fingerprint != current:
+        body = build_documents([recipe.pk], using=recipe._state.db).get(recipe.pk)
+        if body is None:
+            return None
+    return render(request, bytes(body), recipe)
+
+
+# ---------------------------------------------------------------------------
+# Régénération après modification
+# ---------------------------------------------------------------------------
+
+class PendingDocuments:
+    """Recettes modifiées dans la transaction en cours, régénérées à son commit (on_commit)"""
+
+    def __init__(self, using):
+        self.using = using
+        self.pks = set()
+
+    def __call__(self):
+        if getattr(_local, 'pending', {}).get(self.using) is self:
+            del _local.pending[self.using]
+        try:
+            build_documents(self.pks, using=self.using)
+        except Exception:
+            logger.warning("Régénération des documents de recettes impossible", exc_info=True)
+
+
+def pending_documents(using):
+    """Régénération programmée dans la transaction en cours sur `using`, ou None"""
+    pending = getattr(_local, 'pending', {}).get(using)
+    if pending is None:
+        return None
+    connection = transaction.get_connection(using)
+    # Un rollback (transaction ou point de sauvegarde) retire le rappel de run_on_commit :
+    # les modifications annulées ne comptent plus, la suivante avance à nouveau updated_at
+    if connection.in_atomic_block and any(func is pending for _, func, _ in connection.run_on_commit):
+        return pending
+    del _local.pending[using]
+    return None
+
+
+def recipe_changed(pk, touch=True, using=None):
+    """
+    Contenu de la recette `pk` modifié : avec `touch`, son updated_at est
+    avancé dans la transaction en cours, ce qui périme document et ETag ; le
+    document est régénéré au commit. Une seule fois par recette et par
+    transaction : les modifications suivantes (remplacement des ingrédients)
+    deviennent visibles au même commit, sans nouvel UPDATE.
+    """
+    using = using or router.db_for_write(Recipe)
+    pending = pending_documents(using)
+    if pending is not None and pk in pending.pks:
+        return
+    if touch:
+        Recipe.objects.using(using).filter(pk=pk).update(updated_at=timezone.now())
+    if pending is None:
+        pending = PendingDocuments(using)
+        if transaction.get_connection(using).in_atomic_block:
+            if not hasattr(_local, 'pending'):
+                _local.pending = {}
+            _local.pending[using] = pending
+        # Hors transaction (commandes, shell en autocommit), exécuté immédiatement
+        pending.pks.add(pk)
+        transaction.on_commit(pending, using=using)
+    else:
+        pending.pks.add(pk)
+
+
+def reset():
+    """Oublie les régénérations en attente (tests)"""
+    _local.pending = {}
@@ -0,0 +1,94 @@
+"""
+Facettes de la liste des recettes (?facets=1).
+
+Nombre de recettes par catégorie, difficulté, coût estimé, tranche de temps
+total et pour les tags les plus fréquents, calculés en une seule requête
+d'agrégation sur les recettes visibles filtrées : un COUNT(DISTINCT) filtré
+par valeur. Chaque facette ignore le filtre de sa propre dimension (ses
+nombres sont ceux qu'on obtiendrait en choisissant une autre valeur) et
+applique tous les autres.
+
+Les tags candidats sont les plus fréquents de l'index des suggestions
+(suggest.py) ; seuls ceux présents dans les résultats sont renvoyés.
+
+Le résultat est mis en cache FACETS_CACHE_TTL secondes par combinaison de
+filtres, en commun pour les visiteurs anonymes et par utilisateur sinon (ses
+recettes non publiées sont comptées).
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from . import suggest
+from .conditional import RECIPE_CATEGORIES
+from .models import Recipe
+from .recipe_filters import TIME_BUCKETS, filter_conditions, search_recipes, time_bucket_condition, visible_recipes
+from .reference_data import get_snapshot
+
+FACETS = ('category', 'difficulty', 'estimated_cost', 'total_time', 'tags')
+# Facettes dont toutes les valeurs sont renvoyées, dans l'ordre, y compris à 0
+FIXED_FACETS = ('difficulty', 'estimated_cost', 'total_time')
+# Tags renvoyés, choisis parmi les TAG_CANDIDATES plus fréquents
+TOP_TAGS = 10
+TAG_CANDIDATES = 30
+# Paramètres dont dépend le résultat (clé de cache), en plus de la recherche
+PARAMS = ('category', 'difficulty', 'estimated_cost', 'total_time', 'max_time', 'min_servings', 'tags', 'ingredient')
+
+
+def wants_facets(params):
+    return params.get('facets', '').lower() in ('1', 'true')
+
+
+def facet_values(categories):
+    """facette -> [(valeur, libellé, condition)]"""
+    return {
+        'category': [(item['id'], item['name'], Q(category_id=item['id'])) for item in categories.items],
+        'difficulty': [(value, label, Q(difficulty=value)) for value, label in Recipe.DIFFICULTY_CHOICES],
+        'estimated_cost': [(value, label, Q(estimated_cost=value)) for value, label in Recipe.COST_CHOICES],
+        'total_time': [(key, key, time_bucket_condition(key)) for key in TIME_BUCKETS],
+        'tags': [(tag, tag, Q(tags__icontains=tag)) for tag in suggest.top_tags(TAG_CANDIDATES)],
+    }
+
+
+def compute_facets(user, params, search, categories):
+    conditions = filter_conditions(params)
+    queryset = search_recipes(visible_recipes(user), search)
+    queryset = queryset.filter(*(condition for name, condition in conditions.items() if name not in FACETS))
+    values = facet_values(categories)
+
+    aggregates = {}
+    for facet, choices in values.items():
+        others = Q(*(condition for name, condition in conditions.items() if name in FACETS and name != facet))
+        for position, (_, _, condition) in enumerate(choices):
+            # DISTINCT : la recherche et le filtre ingredient joignent les ingrédients
+            aggregates[f'{facet}_{position}'] = Count('pk', distinct=True, filter=others & condition)
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    facets = {}
+    for facet, choices in values.items():
+        entries = [
+            {'value': value, 'label': label, 'count': counts[f'{facet}_{position}']}
+            for position, (value, label, _) in enumerate(choices)
+        ]
+        if facet not in FIXED_FACETS:
+            entries = sorted((entry for entry in entries if entry['count']), key=lambda entry: -entry['count'])
+        facets[facet] = entries[:TOP_TAGS] if facet == 'tags' else entries
+    return facets
+
+
+def get_facets(user, params, search=''):
+    """Facettes des recettes visibles par `user` filtrées par `params` (QueryDict) et `search`"""
+    categories = get_snapshot(RECIPE_CATEGORIES)
+    scope = user.pk if user.is_authenticated else None
+    filters = [(name, sorted(params.getlist(name))) for name in PARAMS]
+    key = 'recipe-facets:' + hashlib.md5(
+        json.dumps([scope, search, categories.version, filters]).encode()
+    ).hexdigest()
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(user, params, search, categories)
+        cache.set(key, facets, getattr(settings, 'FACETS_CACHE_TTL', 60))
+    return facets
@@ -0,0 +1,59 @@
+"""
+Champs d'images nommées d'après leur contenu (voir media.py et uploads.py).
+"""
+import hashlib
+import posixpath
+import re
+
+from django.db.models.fields.files import ImageField, ImageFieldFile
+
+# Répertoire commun : un même contenu est partagé entre recettes, catégories et profils
+IMAGES_DIRECTORY = 'images/'
+# Caractères hexadécimaux du SHA-256 conservés dans le nom
+HASH_LENGTH = 32
+HASHED_NAME = re.compile(rf'^[0-9a-f]{{{HASH_LENGTH}}}(\.[0-9a-z]+)?$')
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def is_hashed(name):
+    """Le fichier `name` a-t-il été nommé d'après son contenu ?"""
+    return bool(HASHED_NAME.match(posixpath.basename(name)))
+
+
+class HashedImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        # Empreinte calculée pendant la réception (uploads.py), à défaut ici
+        digest = getattr(content, 'content_hash', None) or content_hash(content)
+        extension = posixpath.splitext(name)[1].lower()
+        name = self.field.generate_filename(self.instance, f'{digest[:2]}/{digest}{extension}')
+        if self.storage.exists(name):
+            # Contenu déjà stocké : le fichier est partagé. Retiré du balayage, qui a pu
+            # le supprimer avant que cette ligne ne le référence (voir uploads.py)
+            from .models import ReleasedFile
+            ReleasedFile.objects.filter(name=name).delete()
+        if not self.storage.exists(name):
+            name = self.storage.save(name, content, max_length=self.field.max_length)
+        self.name = name
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+
+class HashedImageField(ImageField):
+    """
+    ImageField dont les fichiers sont enregistrés sous
+    <upload_to>/<2 premiers caractères>/<SHA-256 tronqué>.<extension>, une seule
+    fois par contenu.
+    """
+    attr_class = HashedImageFieldFile
+
+    def __init__(self, *args, upload_to=IMAGES_DIRECTORY, **kwargs):
+        super().__init__(*args, upload_to=upload_to, **kwargs)
@@ -0,0 +1,103 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+
+# Paires (endpoint synchrone DRF, variante asynchrone)
+ENDPOINTS = {
+    'recipes': ('/api/recipes/', '/api/async/recipes/'),
+    'categories': ('/api/recipe-categories/', '/api/async/recipe-categories/'),
+    'statistics': ('/api/statistics/', '/api/async/statistics/'),
+    'history': ('/api/recipes/history/', '/api/async/recipes/history/'),
+}
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': quantiles[49] * 1000,
+        'p95': quantiles[94] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit (requêtes/s) des endpoints de lecture synchrones (WSGI, pool de threads) "
+        "et asynchrones (ASGI, boucle d'événements) à forte concurrence, dans le même processus"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('endpoint', choices=sorted(ENDPOINTS), nargs='?', default='recipes')
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--token', default='', help="Jeton JWT d'accès (endpoints authentifiés)")
+        parser.add_argument('--host', default='localhost')
+
+    def handle(self, *args, endpoint='recipes', concurrency=64, requests=1000, token='', host='localhost', **options):
+        sync_path, async_path = ENDPOINTS[endpoint]
+        headers = {'host': host}
+        if token:
+            headers['authorization'] = f'Bearer {token}'
+
+        self.stdout.write(f"{requests} requêtes, concurrence {concurrency}")
+        for label, result in (
+            (f'sync  {sync_path}', self.run_sync(sync_path, headers, concurrency, requests)),
+            (f'async {async_path}', self.run_async(async_path, headers, concurrency, requests)),
+        ):
+            self.stdout.write(
+                f"{label:<40} {result['rps']:8.1f} req/s   p50 {result['p50']:7.1f} ms   "
+                f"p95 {result['p95']:7.1f} ms   erreurs {result['errors']}"
+            )
+
+    def run_sync(self, path, headers, concurrency, requests):
+        local = threading.local()
+        errors = []
+
+        def call(_):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client(headers=headers, raise_request_exception=False)
+            start = time.perf_counter()
+            response = client.get(path)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+            return time.perf_counter() - start
+
+        def close_connections(_):
+            connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            latencies = list(pool.map(call, range(requests)))
+            elapsed = time.perf_counter() - start
+            list(pool.map(close_connections, range(concurrency)))
+        return dict(summarize(latencies, elapsed), errors=len(errors))
+
+    def run_async(self, path, headers, concurrency, requests):
+        errors = []
+
+        async def run():
+            client = AsyncClient(headers=headers, raise_request_exception=False)
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def call():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+                    return time.perf_counter() - start
+
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*(call() for _ in range(requests)))
+            return latencies, time.perf_counter() - start
+
+        latencies, elapsed = asyncio.run(run())
+        return dict(summarize(latencies, elapsed), errors=len(errors))
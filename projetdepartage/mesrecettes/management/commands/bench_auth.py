@@ -0,0 +1,51 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from mesrecettes.authentication import CachedJWTAuthentication, user_cache
+
+
+class Command(BaseCommand):
+    help = "Compare le coût par requête de JWTAuthentication et de CachedJWTAuthentication"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help="Utilisateur du jeton (par défaut : le premier actif)")
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, username=None, iterations=2000, **options):
+        users = get_user_model().objects.filter(is_active=True).order_by('pk')
+        user = users.filter(username=username).first() if username else users.first()
+        if user is None:
+            raise CommandError("Aucun utilisateur actif")
+
+        token = str(AccessToken.for_user(user))
+        request = RequestFactory().get('/api/recipes/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.stdout.write(f"Jeton de {user.username}, {iterations} requêtes GET\n")
+
+        results = {}
+        for backend_class in (JWTAuthentication, CachedJWTAuthentication):
+            user_cache.invalidate()
+            backend_class().authenticate(request)  # échauffement (et remplissage du cache)
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    # Une instance par requête, comme APIView.get_authenticators()
+                    backend_class().authenticate(request)
+                elapsed = (time.perf_counter() - start) / iterations
+
+            name = backend_class.__name__
+            results[name] = elapsed
+            self.stdout.write(
+                f"{name:<24} {elapsed * 1e6:8.1f} µs/requête   "
+                f"{len(queries) / iterations:4.2f} requête(s) SQL/requête"
+            )
+
+        speedup = results['JWTAuthentication'] / results['CachedJWTAuthentication']
+        self.stdout.write(self.style.SUCCESS(f"Accélération : x{speedup:.1f}"))
@@ -0,0 +1,95 @@
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from mesrecettes.renderers import FastJSONRenderer, orjson
+
+
+def recipe_page(size, ingredients_per_recipe=10, coerce_decimals=True):
+    """Page de recettes au format de RecipeSerializer (valeurs brutes si coerce_decimals=False)"""
+    now = timezone.now()
+
+    def decimal(value):
+        return str(value) if coerce_decimals else value
+
+    def moment(value):
+        return value.isoformat() if coerce_decimals else value
+
+    results = []
+    for i in range(size):
+        created_at = now - timedelta(days=i)
+        results.append({
+            'id': i + 1,
+            'title': f"Recette n°{i + 1} : poulet yassa à l'oignon",
+            'description': "Une recette traditionnelle, généreuse et parfumée. " * 4,
+            'author': {
+                'id': i % 50 + 1, 'username': f'chef{i % 50}', 'email': f'chef{i % 50}@exemple.com',
+                'first_name': 'Awa', 'last_name': 'Diallo', 'profile_picture': None,
+                'bio': 'Cuisinière passionnée', 'culinary_level': 3, 'is_email_verified': True,
+            },
+            'category': {'id': i % 8 + 1, 'name': 'Plat principal', 'description': '', 'icon': '🍲', 'image': None},
+            'prep_time': 20, 'cook_time': 45, 'total_time': 65, 'servings': 4,
+            'difficulty': 2, 'estimated_cost': 2,
+            'instructions': "1. Émincer les oignons.\n2. Mariner le poulet.\n3. Cuire à feu doux.\n" * 3,
+            'tags': ['sénégalais', 'poulet', 'familial'],
+            'main_image': f'/media/recipes/{i + 1}.jpg',
+            'images': [{'id': i * 2 + k, 'image': f'/media/recipes/images/{i}-{k}.jpg', 'order': k} for k in range(2)],
+            'ingredients': [
+                {
+                    'id': i * ingredients_per_recipe + k, 'name': f'Ingrédient {k}',
+                    'quantity': decimal(Decimal('1.50') + k), 'unit': 'g',
+                    'category': {'id': k % 5 + 1, 'name': 'Épicerie', 'description': ''},
+                    'estimated_price': decimal(Decimal('250.00') + k * 10), 'order': k,
+                }
+                for k in range(ingredients_per_recipe)
+            ],
+            'views_count': 1000 - i, 'favorites_count': 100 - i % 100, 'is_favorited': False,
+            'is_published': True,
+            'created_at': moment(created_at), 'updated_at': moment(created_at),
+            'published_at': moment(created_at),
+        })
+    return {'count': size * 10, 'next': '/api/recipes/?page=2', 'previous': None, 'results': results}
+
+
+class Command(BaseCommand):
+    help = "Compare le temps de rendu et le pic mémoire de JSONRenderer et FastJSONRenderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100, help="Nombre de recettes par page")
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--raw', action='store_true',
+                            help="Decimal et datetime bruts (COERCE_DECIMAL_TO_STRING=False)")
+
+    def handle(self, *args, size=100, iterations=200, raw=False, **options):
+        data = recipe_page(size, coerce_decimals=not raw)
+        self.stdout.write(f"Backend rapide : {'orjson ' + orjson.__version__ if orjson else 'json (stdlib)'}")
+        self.stdout.write(f"Page de {size} recettes, {iterations} itérations\n")
+
+        results = {}
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            name = type(renderer).__name__
+            body = renderer.render(data)  # échauffement
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                renderer.render(data)
+            elapsed = (time.perf_counter() - start) / iterations
+
+            tracemalloc.start()
+            renderer.render(data)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[name] = elapsed
+            self.stdout.write(
+                f"{name:<18} {elapsed * 1000:8.3f} ms/rendu   pic mémoire {peak / 1024:8.1f} Kio   "
+                f"taille {len(body) / 1024:7.1f} Kio"
+            )
+
+        speedup = results['JSONRenderer'] / results['FastJSONRenderer']
+        self.stdout.write(self.style.SUCCESS(f"Accélération : x{speedup:.1f}"))
@@ -0,0 +1,195 @@
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from mesrecettes.models import Menu, Recipe, ShoppingList, User
+
+from .seed_bench import DISHES, USERNAME_PREFIX, zipf_weights
+
+# Mélange pondéré par défaut des appels rejoués
+DEFAULT_MIX = {'list': 40, 'search': 20, 'detail': 30, 'favorite': 7, 'from_menu': 3}
+
+
+def parse_mix(value):
+    """'list=40,detail=30' -> {'list': 40, 'detail': 30}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in DEFAULT_MIX:
+            raise CommandError(f"Scénario inconnu : {name.strip()}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(values, n):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[n - 1]
+
+
+class Scenario:
+    """Données utiles aux appels : jetons, recettes par popularité, paires menu / liste"""
+
+    def __init__(self, rng, zipf):
+        self.rng = rng
+        users = list(User.objects.filter(username__startswith=USERNAME_PREFIX, is_active=True).values_list('pk', flat=True))
+        if not users:
+            raise CommandError("Aucun utilisateur bench_ : lancer d'abord `manage.py seed_bench`")
+        self.tokens = {user_id: str(AccessToken.for_user(User(pk=user_id))) for user_id in users}
+        self.recipes = list(
+            Recipe.objects.filter(is_published=True).order_by('-views_count').values_list('pk', flat=True)
+        )
+        self.cum_weights = zipf_weights(len(self.recipes), zipf)
+        self.pages = max(1, len(self.recipes) // 20)
+        menus = {}
+        for menu_id, user_id in Menu.objects.filter(user_id__in=users).values_list('pk', 'user_id'):
+            menus.setdefault(user_id, menu_id)
+        self.menu_pairs = [
+            (user_id, list_id, menus[user_id])
+            for list_id, user_id in ShoppingList.objects.filter(user_id__in=menus).values_list('pk', 'user_id')
+        ]
+
+    def auth(self, user_id=None):
+        user_id = user_id or self.rng.choice(list(self.tokens))
+        return {'HTTP_AUTHORIZATION': f'Bearer {self.tokens[user_id]}'}
+
+    def popular_recipe(self):
+        return self.rng.choices(self.recipes, cum_weights=self.cum_weights)[0]
+
+    def request(self, name):
+        """(méthode, chemin, données, en-têtes) d'un appel du scénario `name`"""
+        rng = self.rng
+        if name == 'list':
+            # Les premières pages sont nettement plus consultées
+            page = min(self.pages, int(rng.paretovariate(1.5)))
+            return 'get', f'/api/recipes/?page={page}', None, self.auth() if rng.random() < 0.5 else {}
+        if name == 'search':
+            term = rng.choice(DISHES).split()[0]
+            return 'get', f'/api/recipes/?search={term}', None, self.auth() if rng.random() < 0.5 else {}
+        if name == 'detail':
+            return 'get', f'/api/recipes/{self.popular_recipe()}/', None, self.auth() if rng.random() < 0.5 else {}
+        if name == 'favorite':
+            method = rng.choice(['post', 'delete'])
+            return method, f'/api/recipes/{self.popular_recipe()}/favorite/', None, self.auth()
+        if name == 'from_menu':
+            if not self.menu_pairs:
+                return None
+            user_id, list_id, menu_id = rng.choice(self.menu_pairs)
+            return 'post', f'/api/shopping-lists/{list_id}/from_menu/', {'menu_id': menu_id}, self.auth(user_id)
+        raise ValueError(name)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue en processus un mélange pondéré d'appels d'API (list, search, detail, favorite, "
+        "from_menu) et mesure débit, latences p50/p95/p99 et requêtes SQL par appel"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                            help="Pondération, ex. list=40,search=20,detail=30,favorite=7,from_menu=3")
+        parser.add_argument('--zipf', type=float, default=1.1)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--output', help="Fichier JSON où enregistrer les résultats")
+        parser.add_argument('--compare', help="Résultats JSON d'une exécution précédente")
+
+    def handle(self, *args, requests=2000, threads=1, mix=DEFAULT_MIX, zipf=1.1, seed=42,
+               host='localhost', output=None, compare=None, **options):
+        rng = random.Random(seed)
+        scenario = Scenario(rng, zipf)
+        names = list(mix)
+        plan = []
+        for name in rng.choices(names, weights=list(mix.values()), k=requests):
+            call = scenario.request(name)
+            if call is not None:
+                plan.append(call + (name,))
+
+        samples = {name: [] for name in names}
+        lock = threading.Lock()
+        local = threading.local()
+
+        def run(call):
+            method, path, data, headers, name = call
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client(HTTP_HOST=host, raise_request_exception=False)
+            # Le journal des requêtes est borné : le vider évite un comptage faussé
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, method)(path, data, content_type='application/json', **headers)
+                elapsed = time.perf_counter() - start
+            with lock:
+                samples[name].append((elapsed, len(queries), response.status_code))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(run, plan))
+            list(pool.map(lambda _: connections.close_all(), range(threads)))
+        duration = time.perf_counter() - started
+
+        results = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'config': {'requests': requests, 'threads': threads, 'mix': mix, 'zipf': zipf, 'seed': seed},
+            'duration': duration,
+            'throughput': len(plan) / duration,
+            'endpoints': {},
+        }
+        for name, values in samples.items():
+            if not values:
+                continue
+            latencies = sorted(elapsed * 1000 for elapsed, _, _ in values)
+            results['endpoints'][name] = {
+                'count': len(values),
+                'throughput': len(values) / duration,
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'queries': statistics.mean(count for _, count, _ in values),
+                'client_errors': sum(1 for _, _, code in values if 400 <= code < 500),
+                'errors': sum(1 for _, _, code in values if code >= 500),
+            }
+
+        previous = {}
+        if compare:
+            with open(compare) as handle:
+                previous = json.load(handle).get('endpoints', {})
+        self.report(results, previous)
+
+        if output:
+            with open(output, 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Résultats enregistrés dans {output}")
+
+    def report(self, results, previous):
+        self.stdout.write(
+            f"{len(results['endpoints'])} scénarios, {results['config']['threads']} thread(s), "
+            f"{results['duration']:.1f} s, {results['throughput']:.1f} req/s ({results['database']})"
+        )
+        self.stdout.write(
+            f"{'Scénario':<10} {'Appels':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'SQL/appel':>10} {'4xx':>5} {'5xx':>5}"
+        )
+        for name, stats in results['endpoints'].items():
+            line = (
+                f"{name:<10} {stats['count']:>7} {stats['throughput']:>8.1f} {stats['p50']:>8.1f} "
+                f"{stats['p95']:>8.1f} {stats['p99']:>8.1f} {stats['queries']:>10.1f} {stats['client_errors']:>5} {stats['errors']:>5}"
+            )
+            before = previous.get(name)
+            if before:
+                line += f"   p95 {stats['p95'] - before['p95']:+.1f} ms, SQL {stats['queries'] - before['queries']:+.1f}"
+            self.stdout.write(line)
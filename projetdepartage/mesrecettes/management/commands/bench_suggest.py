@@ -0,0 +1,101 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from mesrecettes.suggest import SuggestIndex
+
+WORDS = [
+    'poulet', 'yassa', 'mafé', 'thiéboudienne', 'crème', 'brûlée', 'gâteau', 'à', 'la', 'au', 'aux',
+    'citron', 'arachide', 'poisson', 'braisé', 'riz', 'gras', 'sauce', 'feuille', 'manioc', 'attiéké',
+    'alloco', 'banane', 'plantain', 'épinards', 'gombo', 'soupe', 'légumes', 'bœuf', 'agneau', 'rôti',
+    'tarte', 'pâte', 'choux', 'salade', 'niébé', 'fonio', 'ndolé', 'crevettes', 'coco', 'gingembre',
+    'bissap', 'beignets', 'maïs', 'igname', 'pilé', 'fumé', 'épicé', 'doux', 'maison', 'grand-mère',
+]
+TAGS = ['végétarien', 'rapide', 'familial', 'épicé', 'fête', 'économique', 'sans gluten', 'dessert',
+        'entrée', 'plat principal', 'street food', 'léger', 'traditionnel', 'été', 'hiver']
+
+
+def catalog(size, ingredient_names, rng):
+    ingredients = [f'{rng.choice(WORDS)} {rng.choice(WORDS)} {n}' for n in range(ingredient_names)]
+    for pk in range(1, size + 1):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).capitalize()
+        yield (
+            pk, f'{title} {pk}', rng.sample(TAGS, 2), rng.sample(ingredients, 8),
+            (rng.randint(0, 500), rng.randint(0, 50000)),
+        )
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la construction, la mémoire et la latence (p50, p99) de l'index des "
+        "suggestions de saisie sur un catalogue synthétique"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--ingredients', type=int, default=5_000, help="Noms d'ingrédients distincts")
+        parser.add_argument('--queries', type=int, default=5_000)
+        parser.add_argument('--max-keys', type=int, help="SUGGEST_MAX_KEYS")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, recipes=100_000, ingredients=5_000, queries=5_000, max_keys=None, seed=1, **options):
+        rng = random.Random(seed)
+        rows = list(catalog(recipes, ingredients, rng))
+
+        def build():
+            index = SuggestIndex(max_keys=max_keys)
+            for pk, title, tags, names, popularity in rows:
+                index.add(pk, title, tags, names, popularity, bulk=True)
+            index.finish_bulk()
+            return index
+
+        start = time.perf_counter()
+        index = build()
+        built = (time.perf_counter() - start) * 1000
+        # Mémoire mesurée sur une seconde construction : tracemalloc ralentit les allocations
+        del index
+        tracemalloc.start()
+        index = build()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{recipes} recettes, {len(index.terms)} tags et ingrédients, {len(index)} clés : "
+            f"construit en {built:.0f} ms, {memory / 1024 / 1024:.1f} Mio"
+        )
+
+        # Saisies réalistes : débuts de mots (1 à 8 caractères), casse et accents variés
+        typed = []
+        for _ in range(queries):
+            word = rng.choice(WORDS + TAGS)
+            text = word[:rng.randint(1, len(word))]
+            typed.append(text.upper() if rng.random() < 0.1 else text)
+
+        for label, clear in (('sans cache', True), ('avec cache', False)):
+            timings = []
+            for text in typed:
+                if clear:
+                    index.cache.clear()
+                start = time.perf_counter()
+                index.search(text, 10)
+                timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f"{label:<11} p50 {percentile(timings, 0.5):7.3f} ms   p99 {percentile(timings, 0.99):7.3f} ms   "
+                f"max {max(timings):7.3f} ms"
+            )
+
+        # Mise à jour incrémentale (écriture d'une recette)
+        timings = []
+        for pk, title, tags, names, popularity in rows[:200]:
+            start = time.perf_counter()
+            index.add(pk, title + ' modifié', tags, names, popularity)
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"mise à jour p50 {percentile(timings, 0.5):7.3f} ms   p99 {percentile(timings, 0.99):7.3f} ms"
+        )
@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from mesrecettes.purge import purge_deleted
+from mesrecettes.uploads import sweep_released_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime définitivement, par lots, les utilisateurs et les recettes supprimés "
+        "(deleted_at) avec leurs dépendances, puis les fichiers media qui ne sont plus "
+        "référencés ; reprend là où une exécution interrompue s'était arrêtée"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help="Lignes supprimées par DELETE (défaut : PURGE_BATCH_SIZE)")
+        parser.add_argument('--older-than', type=float,
+                            help="Ne purger que les suppressions plus anciennes que N heures "
+                                 "(défaut : PURGE_DELAY_HOURS)")
+        parser.add_argument('--pause', type=float, default=0,
+                            help="Pause en secondes entre deux lots, pour limiter la charge")
+        parser.add_argument('--interval', type=float,
+                            help="Recommencer toutes les N secondes (worker d'arrière-plan)")
+
+    def handle(self, *args, batch_size=None, older_than=None, pause=0, interval=None, **options):
+        if older_than is None:
+            older_than = getattr(settings, 'PURGE_DELAY_HOURS', 0)
+        while True:
+            deleted = purge_deleted(timezone.now() - timedelta(hours=older_than), batch_size, pause)
+            for label, count in sorted(deleted.items()):
+                self.stdout.write(f"{label} : {count}")
+            self.stdout.write(self.style.SUCCESS(f"{sum(deleted.values())} ligne(s) supprimée(s)"))
+            self.stdout.write(self.style.SUCCESS(f"{sweep_released_files()} fichier(s) supprimé(s)"))
+            if interval is None:
+                break
+            time.sleep(interval)
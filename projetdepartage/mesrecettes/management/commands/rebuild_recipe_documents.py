@@ -0,0 +1,37 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from mesrecettes.documents import build_documents
+from mesrecettes.models import Recipe
+
+
+def rebuild_batch(pks):
+    try:
+        return len(build_documents(pks))
+    finally:
+        # Une connexion par thread du pool
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Régénère les documents précalculés du détail des recettes, par lots en parallèle"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipe', type=int, action='append', dest='recipe_ids',
+                            help="Limiter à une ou plusieurs recettes")
+        parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1),
+                            help="Nombre de lots traités en parallèle")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, recipe_ids=None, workers=1, batch_size=200, **options):
+        recipes = Recipe.objects.order_by('pk')
+        if recipe_ids:
+            recipes = recipes.filter(pk__in=recipe_ids)
+        pks = list(recipes.values_list('pk', flat=True))
+        batches = [pks[start:start + batch_size] for start in range(0, len(pks), batch_size)]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            count = sum(pool.map(rebuild_batch, batches))
+        self.stdout.write(self.style.SUCCESS(f"{count} document(s) régénéré(s)"))
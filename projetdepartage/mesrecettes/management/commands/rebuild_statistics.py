@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from mesrecettes.models import User
+from mesrecettes.stats import rebuild_user_statistics
+
+
+class Command(BaseCommand):
+    help = "Recalcule les statistiques utilisateur et les buckets de vues journaliers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help="Limiter à un ou plusieurs identifiants d'utilisateur")
+
+    def handle(self, *args, user_ids=None, **options):
+        users = User.objects.all()
+        if user_ids:
+            users = users.filter(pk__in=user_ids)
+        count = 0
+        for user_id in users.values_list('pk', flat=True).iterator():
+            rebuild_user_statistics(user_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"{count} statistique(s) reconstruite(s)"))
@@ -0,0 +1,248 @@
+import itertools
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from mesrecettes.models import (
+    FavoriteRecipe, Ingredient, IngredientCategory, Menu, MenuRecipe, Recipe,
+    RecipeCategory, RecipeView, ShoppingList, ShoppingListItem, User
+)
+from mesrecettes.ranking import spread
+
+# Les comptes générés sont reconnaissables à ce préfixe (supprimés par --clear)
+USERNAME_PREFIX = 'bench_'
+BENCH_PASSWORD = 'bench-password'
+
+RECIPE_CATEGORIES = ['Entrée', 'Plat principal', 'Dessert', 'Boisson', 'Petit-déjeuner', 'Snack', 'Sauce', 'Soupe']
+INGREDIENT_CATEGORIES = ['Légumes', 'Fruits', 'Viandes', 'Poissons', 'Épicerie', 'Produits laitiers', 'Épices']
+DISHES = ['poulet yassa', 'thiéboudienne', 'mafé', 'attiéké poisson', 'alloco', 'ndolé', 'foutou',
+          'soupe kandia', 'riz gras', 'salade de mangue', 'beignets', 'jus de bissap', 'tarte coco']
+INGREDIENTS = [
+    ('oignon', 'g'), ('poulet', 'g'), ('riz', 'g'), ('tomate', 'g'), ('arachide', 'g'), ('poisson', 'g'),
+    ('piment', 'pièce'), ('ail', 'gousse'), ('huile', 'ml'), ('citron', 'pièce'), ('manioc', 'g'),
+    ('banane plantain', 'pièce'), ('gombo', 'g'), ('carotte', 'g'), ('chou', 'g'), ('lait', 'ml'),
+    ('farine', 'g'), ('sucre', 'g'), ('bissap', 'g'), ('gingembre', 'g'), ('noix de coco', 'pièce'),
+]
+TAGS = ['végétarien', 'sans gluten', 'rapide', 'familial', 'épicé', 'économique', 'fête']
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+
+
+def zipf_weights(size, exponent):
+    """Poids cumulés d'une loi de Zipf : le rang r est tiré avec une probabilité ∝ 1 / r^s"""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données synthétique (utilisateurs, recettes, ingrédients, favoris, vues, "
+        "menus, listes de courses) avec bulk_create et une popularité Zipfienne"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--ingredients', type=int, default=8, help="Nombre moyen d'ingrédients par recette")
+        parser.add_argument('--favorites', type=int, default=10000)
+        parser.add_argument('--views', type=int, default=50000)
+        parser.add_argument('--menus', type=int, default=100)
+        parser.add_argument('--shopping-lists', type=int, default=100)
+        parser.add_argument('--zipf', type=float, default=1.1, help="Exposant de la loi de popularité")
+        parser.add_argument('--days', type=int, default=30, help="Fenêtre de dates des vues et des recettes")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help="Supprimer d'abord les données bench_ existantes")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+        started = time.perf_counter()
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            self.stdout.write(f"{deleted} objets supprimés")
+
+        with transaction.atomic():
+            categories, ingredient_categories = self.reference_data()
+            users = self.step('utilisateurs', self.create_users, options['users'])
+            recipes = self.step('recettes', self.create_recipes, users, categories, options['recipes'])
+            # Rang de popularité indépendant de l'ordre de création
+            self.popularity = recipes[:]
+            self.rng.shuffle(self.popularity)
+            self.cum_weights = zipf_weights(len(self.popularity), options['zipf'])
+            self.step('ingrédients', self.create_ingredients, recipes, ingredient_categories, options['ingredients'])
+            self.step('favoris', self.create_favorites, users, options['favorites'])
+            self.step('vues', self.create_views, users, options['views'])
+            self.step('compteurs', self.update_counters, recipes)
+            self.step('menus', self.create_menus, users, options['menus'])
+            self.step('listes de courses', self.create_shopping_lists, users, options['shopping_lists'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Jeu de données généré en {time.perf_counter() - started:.1f} s "
+            f"(mot de passe des comptes {USERNAME_PREFIX}* : {BENCH_PASSWORD})"
+        ))
+
+    def step(self, label, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        count = len(result) if result is not None else 0
+        self.stdout.write(f"{label:<20} {count:>8}   {time.perf_counter() - start:6.2f} s")
+        return result
+
+    def popular_recipes(self, count):
+        return self.rng.choices(self.popularity, cum_weights=self.cum_weights, k=count)
+
+    def random_moment(self):
+        return self.now - timedelta(seconds=self.rng.randrange(self.days * 86400))
+
+    def backdate(self, model, field, objects):
+        """auto_now_add impose la date courante à la création : réécriture par jour, en lots"""
+        by_day = {}
+        for obj in objects:
+            day = self.rng.randrange(self.days)
+            by_day.setdefault(day, []).append(obj.pk)
+        for day, pks in by_day.items():
+            moment = self.now - timedelta(days=day, seconds=self.rng.randrange(86400))
+            for start in range(0, len(pks), self.batch_size):
+                model.objects.filter(pk__in=pks[start:start + self.batch_size]).update(**{field: moment})
+
+    def reference_data(self):
+        categories = [RecipeCategory.objects.get_or_create(name=name)[0] for name in RECIPE_CATEGORIES]
+        ingredient_categories = [
+            IngredientCategory.objects.get_or_create(name=name)[0] for name in INGREDIENT_CATEGORIES
+        ]
+        return categories, ingredient_categories
+
+    def create_users(self, count):
+        start = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+        # Un seul hachage (coûteux) partagé par tous les comptes
+        password = make_password(BENCH_PASSWORD)
+        users = [
+            User(
+                username=f'{USERNAME_PREFIX}{start + i}', email=f'{USERNAME_PREFIX}{start + i}@exemple.com',
+                password=password, culinary_level=self.rng.randint(1, 5), is_email_verified=True,
+            )
+            for i in range(count)
+        ]
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def create_recipes(self, users, categories, count):
+        # Quelques auteurs prolifiques, beaucoup d'auteurs occasionnels
+        authors = self.rng.choices(users, cum_weights=zipf_weights(len(users), 1.0), k=count)
+        recipes = []
+        for i, author in enumerate(authors):
+            dish = self.rng.choice(DISHES)
+            recipes.append(Recipe(
+                author=author,
+                title=f"{dish.capitalize()} n°{i + 1}",
+                description=f"Recette de {dish} préparée à la maison.",
+                category=self.rng.choice(categories),
+                prep_time=self.rng.randint(5, 60),
+                cook_time=self.rng.choice([0, 10, 20, 30, 45, 60, 90, 120]),
+                servings=self.rng.randint(1, 8),
+                difficulty=self.rng.randint(1, 5),
+                estimated_cost=self.rng.randint(1, 3),
+                instructions="1. Préparer les ingrédients.\n2. Cuire.\n3. Servir chaud.",
+                tags=self.rng.sample(TAGS, self.rng.randint(0, 3)),
+                is_published=self.rng.random() < 0.9,
+            ))
+        recipes = Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+        self.backdate(Recipe, 'created_at', recipes)
+        return recipes
+
+    def create_ingredients(self, recipes, ingredient_categories, mean):
+        ingredients = []
+        for recipe in recipes:
+            count = max(1, min(len(INGREDIENTS), round(self.rng.gauss(mean, 2))))
+            for order, ((name, unit), rank) in enumerate(zip(self.rng.sample(INGREDIENTS, count), spread(count))):
+                ingredients.append(Ingredient(
+                    recipe=recipe, name=name, unit=unit, order=order, rank=rank,
+                    quantity=Decimal(self.rng.randint(1, 500)),
+                    estimated_price=Decimal(self.rng.randint(50, 3000)) / 100,
+                    category=self.rng.choice(ingredient_categories),
+                ))
+        return Ingredient.objects.bulk_create(ingredients, batch_size=self.batch_size)
+
+    def create_favorites(self, users, count):
+        pairs = set()
+        attempts = 0
+        while len(pairs) < count and attempts < count * 3:
+            attempts += 1
+            user = self.rng.choice(users)
+            recipe = self.popular_recipes(1)[0]
+            pairs.add((user.pk, recipe.pk))
+        favorites = [FavoriteRecipe(user_id=user_id, recipe_id=recipe_id) for user_id, recipe_id in pairs]
+        favorites = FavoriteRecipe.objects.bulk_create(favorites, batch_size=self.batch_size)
+        self.favorites = pairs
+        return favorites
+
+    def create_views(self, users, count):
+        views = [
+            RecipeView(
+                recipe=recipe,
+                # Environ un tiers des vues sont anonymes
+                user=self.rng.choice(users) if self.rng.random() < 0.7 else None,
+                ip_address=f'10.{self.rng.randrange(256)}.{self.rng.randrange(256)}.{self.rng.randrange(1, 255)}',
+            )
+            for recipe in self.popular_recipes(count)
+        ]
+        views = RecipeView.objects.bulk_create(views, batch_size=self.batch_size)
+        self.backdate(RecipeView, 'viewed_at', views)
+        self.views = views
+        return views
+
+    def update_counters(self, recipes):
+        views, favorites = {}, {}
+        for view in self.views:
+            views[view.recipe_id] = views.get(view.recipe_id, 0) + 1
+        for _, recipe_id in self.favorites:
+            favorites[recipe_id] = favorites.get(recipe_id, 0) + 1
+        for recipe in recipes:
+            recipe.views_count = views.get(recipe.pk, 0)
+            recipe.favorites_count = favorites.get(recipe.pk, 0)
+        Recipe.objects.bulk_update(recipes, ['views_count', 'favorites_count'], batch_size=self.batch_size)
+        return recipes
+
+    def create_menus(self, users, count):
+        menus = []
+        for i in range(count):
+            start = timezone.localdate() + timedelta(days=self.rng.randint(-14, 14))
+            menus.append(Menu(
+                user=self.rng.choice(users), name=f"Menu de la semaine {i + 1}",
+                start_date=start, end_date=start + timedelta(days=6),
+            ))
+        menus = Menu.objects.bulk_create(menus, batch_size=self.batch_size)
+        entries = []
+        for menu in menus:
+            slots = [
+                (menu.start_date + timedelta(days=day), meal_type)
+                for day in range(7) for meal_type in MEAL_TYPES[:3]
+            ]
+            for (date, meal_type), recipe in zip(slots, self.popular_recipes(len(slots))):
+                if self.rng.random() < 0.8:
+                    entries.append(MenuRecipe(menu=menu, recipe=recipe, date=date, meal_type=meal_type))
+        MenuRecipe.objects.bulk_create(entries, batch_size=self.batch_size)
+        return menus
+
+    def create_shopping_lists(self, users, count):
+        lists = ShoppingList.objects.bulk_create(
+            [ShoppingList(user=self.rng.choice(users), name=f"Courses {i + 1}") for i in range(count)],
+            batch_size=self.batch_size,
+        )
+        items = []
+        for shopping_list in lists:
+            count = self.rng.randint(3, 15)
+            for order, ((name, unit), rank) in enumerate(zip(self.rng.sample(INGREDIENTS, count), spread(count))):
+                items.append(ShoppingListItem(
+                    shopping_list=shopping_list, ingredient_name=name, unit=unit, order=order, rank=rank,
+                    quantity=Decimal(self.rng.randint(1, 500)), is_checked=self.rng.random() < 0.3,
+                ))
+        ShoppingListItem.objects.bulk_create(items, batch_size=self.batch_size)
+        return lists
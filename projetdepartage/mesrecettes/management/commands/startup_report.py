@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Code exécuté dans un interpréteur neuf lancé avec -X importtime
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from projetdepartage.{target} import application
+loaded = time.perf_counter()
+timings = []
+if {warm_up}:
+    from mesrecettes import startup
+    timings = startup.warm_up()
+print(json.dumps({{
+    'load_ms': (loaded - start) * 1000,
+    'warm_up': timings,
+    'modules': len(sys.modules),
+    'social_backends_loaded': 'social_core.backends.google' in sys.modules,
+}}))
+"""
+
+
+def parse_importtime(output):
+    """[(module, self µs, cumulé µs, profondeur)] à partir de la sortie de -X importtime"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # en-tête
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps d'import par module au démarrage d'un worker (python -X importtime)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--limit', type=int, default=25, help="Nombre de modules affichés")
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative')
+        parser.add_argument('--by-package', action='store_true',
+                            help="Regrouper le temps propre par paquet de premier niveau")
+        parser.add_argument('--no-warm-up', action='store_true',
+                            help="Ne pas exécuter le préchauffage de mesrecettes.startup")
+
+    def handle(self, *args, target='wsgi', limit=25, sort='cumulative', by_package=False,
+               no_warm_up=False, **options):
+        code = STARTUP_SCRIPT.format(target=target, warm_up=not no_warm_up)
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE
+        ))
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if process.returncode != 0:
+            raise CommandError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else 'Échec')
+
+        summary = json.loads(process.stdout.strip().splitlines()[-1])
+        rows = parse_importtime(process.stderr)
+        total_ms = sum(row[1] for row in rows) / 1000
+
+        self.stdout.write(
+            f"projetdepartage.{target} : {summary['load_ms']:.0f} ms, {len(rows)} modules importés "
+            f"({total_ms:.0f} ms d'import), {summary['modules']} modules en mémoire\n"
+        )
+
+        if by_package:
+            packages = {}
+            for name, self_us, _, _ in rows:
+                package = name.split('.')[0]
+                packages[package] = packages.get(package, 0) + self_us
+            self.stdout.write(f"{'Temps propre':>14}  Paquet")
+            for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:limit]:
+                self.stdout.write(f"{self_us / 1000:11.1f} ms  {package}")
+        else:
+            index = 2 if sort == 'cumulative' else 1
+            self.stdout.write(f"{'Propre':>10} {'Cumulé':>10}  Module")
+            for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[index])[:limit]:
+                self.stdout.write(f"{self_us / 1000:7.1f} ms {cumulative_us / 1000:7.1f} ms  {name}")
+
+        if summary['warm_up']:
+            self.stdout.write('\nPréchauffage :')
+            for name, ms in summary['warm_up']:
+                self.stdout.write(f"{ms:11.1f} ms  {name}")
+
+        state = 'chargés' if summary['social_backends_loaded'] else 'non chargés'
+        self.stdout.write(self.style.SUCCESS(f"\nBackends OAuth : {state}"))
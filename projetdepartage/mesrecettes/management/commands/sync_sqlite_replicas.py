@@ -0,0 +1,36 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copie la base SQLite principale vers les réplicas SQLite (DATABASE_REPLICA_URLS) "
+        "pour tester le routage lecture/écriture en local"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help="Répéter la copie toutes les N secondes (simule le retard de réplication)")
+
+    def handle(self, *args, interval=None, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        replicas = [connections[alias] for alias in getattr(settings, 'DATABASE_REPLICAS', [])]
+        if primary.vendor != 'sqlite' or not replicas:
+            raise CommandError("Nécessite une base principale SQLite et au moins un réplica")
+        if any(replica.vendor != 'sqlite' for replica in replicas):
+            raise CommandError("Tous les réplicas doivent être des bases SQLite")
+
+        while True:
+            with sqlite3.connect(primary.settings_dict['NAME']) as source:
+                for replica in replicas:
+                    replica.close()
+                    with sqlite3.connect(replica.settings_dict['NAME']) as target:
+                        source.backup(target)
+                    self.stdout.write(f"{primary.settings_dict['NAME']} -> {replica.settings_dict['NAME']}")
+            if interval is None:
+                break
+            time.sleep(interval)
@@ -0,0 +1,244 @@
+"""
+Distribution des fichiers media (MEDIA_URL).
+
+Les images envoyées (recettes, images supplémentaires, photos de profil,
+catégories) sont nommées d'après le SHA-256 de leur contenu (fields.py) : une
+URL désigne toujours le même contenu et peut être mise en cache indéfiniment
+(Cache-Control: immutable). Les fichiers nommés avant ce changement gardent
+une durée de cache de MEDIA_MAX_AGE secondes.
+
+media_file vérifie que le fichier est visible par le demandeur (image d'une
+recette publiée ou de ses propres recettes, photo d'un compte actif, image de
+catégorie ; un fichier partagé est visible si l'un de ses objets l'est),
+puis délègue l'envoi au serveur web selon MEDIA_ACCEL :
+- 'x-accel-redirect' (nginx) : redirection interne vers MEDIA_ACCEL_PREFIX,
+  servie par une location interne :
+      location /protected-media/ { internal; alias /chemin/vers/media/; }
+- 'x-sendfile' (Apache mod_xsendfile, lighttpd) : chemin absolu du fichier ;
+- vide : envoi par Django (FileResponse), requêtes Range et conditionnelles
+  comprises.
+
+Les images d'une recette non publiée sont chargées par le navigateur (<img
+src>) sans en-tête Authorization : les serializers (SignedMediaMixin) en
+émettent l'URL signée, avec son propriétaire et une date d'expiration. Cette
+date est arrondie à MEDIA_URL_LIFETIME secondes pour que l'URL reste stable
+(cache du navigateur) ; une URL reste valable entre une et deux périodes.
+"""
+import mimetypes
+import posixpath
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.db.models import F, IntegerField, Value
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .authentication import CachedJWTAuthentication
+from .fields import is_hashed
+from .models import Recipe, RecipeCategory, RecipeImage, User
+
+# Un an : durée maximale recommandée (RFC 9111)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+SIGNATURE_SALT = 'mesrecettes.media'
+
+
+# ---------------------------------------------------------------------------
+# Contrôle d'accès
+# ---------------------------------------------------------------------------
+
+def file_access(name):
+    """
+    [(public, id du propriétaire)] des objets référençant le fichier `name`, en
+    une requête : un même contenu peut être partagé entre plusieurs objets (uploads.py)
+    """
+    owner = IntegerField()
+    recipe_images = RecipeImage.objects.filter(image=name, recipe__deleted_at__isnull=True).values_list(
+        'recipe__is_published', 'recipe__author_id'
+    )
+    recipes = Recipe.objects.filter(main_image=name).values_list('is_published', 'author_id')
+    profiles = User.objects.filter(profile_picture=name, deleted_at__isnull=True).annotate(
+        public=Value(True), owner=F('pk')
+    ).values_list('public', 'owner')
+    categories = RecipeCategory.objects.filter(image=name).annotate(
+        public=Value(True), owner=Value(None, output_field=owner)
+    ).values_list('public', 'owner')
+    return list(recipe_images.order_by().union(
+        recipes.order_by(), profiles.order_by(), categories.order_by(), all=True
+    ))
+
+
+def private_owner(instance):
+    """Propriétaire du fichier d'une image de recette non publiée, None si l'image est publique"""
+    if isinstance(instance, RecipeImage):
+        instance = instance.recipe
+    if isinstance(instance, Recipe) and not instance.is_published:
+        return instance.author_id
+    return None
+
+
+def signature_expiry(now=None):
+    """Expiration des URLs signées émises à `now` : identique pendant toute une période"""
+    lifetime = getattr(settings, 'MEDIA_URL_LIFETIME', 6 * 3600)
+    now = int(time.time() if now is None else now)
+    return (now // lifetime + 2) * lifetime
+
+
+def signature(name, owner, expires):
+    return signing.Signer(salt=SIGNATURE_SALT).signature(f'{name}:{owner}:{expires}')
+
+
+def signed_url(url, name, owner):
+    """`url` du fichier `name` complétée d'une signature valable pour le propriétaire `owner`"""
+    expires = signature_expiry()
+    return f"{url}?{urlencode({'owner': owner, 'expires': expires, 'signature': signature(name, owner, expires)})}"
+
+
+def signed_owner(request, name):
+    """Propriétaire désigné par l'URL signée de la requête, None si elle est absente, invalide ou expirée"""
+    try:
+        owner, expires = int(request.GET['owner']), int(request.GET['expires'])
+    except (KeyError, ValueError):
+        return None
+    if expires < time.time():
+        return None
+    if not constant_time_compare(request.GET.get('signature', ''), signature(name, owner, expires)):
+        return None
+    return owner
+
+
+def request_user(request):
+    """Utilisateur du jeton JWT (en-tête Authorization), à défaut de la session (admin)"""
+    result = CachedJWTAuthentication().authenticate(request)
+    if result is not None:
+        return result[0]
+    return getattr(request, 'user', None) or AnonymousUser()
+
+
+# ---------------------------------------------------------------------------
+# Envoi
+# ---------------------------------------------------------------------------
+
+class FileRange:
+    """Lecture limitée à une plage d'un fichier ouvert (FileResponse)"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (début, fin incluse) d'un en-tête Range à une seule plage, None s'il est
+    absent ou ignoré (plusieurs plages, syntaxe invalide) : fichier entier.
+    ValueError si la plage ne recouvre pas le fichier.
+    """
+    match = RANGE.match(header or '')
+    if match is None or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Suffixe : les `end` derniers octets
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def serve_file(request, name, content_type):
+    """FileResponse de `name`, réponses 304, 206 et 416 comprises"""
+    try:
+        size = default_storage.size(name)
+        modified = default_storage.get_modified_time(name)
+    except FileNotFoundError:
+        raise Http404
+    etag = quote_etag(f'{int(modified.timestamp()):x}-{size:x}')
+    last_modified = modified.timestamp()
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    span = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range == etag:
+        try:
+            span = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = default_storage.open(name, 'rb')
+    if span is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = span
+        response = FileResponse(FileRange(file, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+@require_safe
+def media_file(request, path):
+    name = posixpath.normpath(path)
+    if name.startswith(('.', '/')) or '\\' in name:
+        raise Http404
+    try:
+        user = request_user(request)
+    except (InvalidToken, TokenError, AuthenticationFailed) as exc:
+        return HttpResponse(str(getattr(exc, 'detail', exc)), status=401, content_type='text/plain; charset=utf-8')
+
+    # Propriétaire authentifié (jeton, session) ou désigné par une URL signée
+    owners = {signed_owner(request, name)}
+    if user.is_authenticated:
+        owners.add(user.pk)
+    owners.discard(None)
+    access = file_access(name)
+    visible = [public for public, owner in access if public or owner in owners]
+    if not visible:
+        raise Http404
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    accel = getattr(settings, 'MEDIA_ACCEL', '')
+    if accel == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + name)
+    elif accel == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = default_storage.path(name)
+    else:
+        response = serve_file(request, name, content_type)
+
+    # Réponse privée : image d'une recette non publiée, vue par son auteur
+    scope = {'public': True} if any(visible) else {'private': True}
+    if is_hashed(name):
+        patch_cache_control(response, max_age=IMMUTABLE_MAX_AGE, immutable=True, **scope)
+    else:
+        patch_cache_control(response, max_age=getattr(settings, 'MEDIA_MAX_AGE', 3600), **scope)
+    return response
@@ -0,0 +1,237 @@
+"""
+Métriques Prometheus sans service externe.
+
+Chaque processus (worker gunicorn) écrit ses compteurs dans son propre
+fichier METRICS_DIR/<pid>.db, projeté en mémoire (mmap) : une incrémentation
+est une écriture en mémoire, sans verrou entre processus. La vue /metrics
+additionne les fichiers de tous les processus, y compris ceux des workers
+terminés (les compteurs restent monotones). gunicorn.conf.py crée un
+répertoire neuf à chaque démarrage du maître ; sans METRICS_DIR, aucune
+métrique n'est collectée.
+
+Format d'un fichier : entier 32 bits (octets utilisés), puis des entrées
+[longueur 32 bits][clé UTF-8 complétée à 8 octets][valeur double].
+
+Métriques exposées :
+- http_request_duration_seconds (histogramme) par route nommée, méthode et statut ;
+- http_request_sql_queries (histogramme) par route nommée ;
+- django_cache_requests_total par cache et résultat (hit / miss), et le ratio
+  django_cache_hit_ratio calculé à la lecture (voir cache_backends.py).
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+METRICS = {
+    'http_request_duration_seconds': ('histogram', "Durée des requêtes HTTP par route"),
+    'http_request_sql_queries': ('histogram', "Requêtes SQL par requête HTTP"),
+    'django_cache_requests_total': ('counter', "Lectures du cache Django par résultat"),
+}
+
+_HEADER = struct.Struct('i')
+_VALUE = struct.Struct('d')
+_INITIAL_SIZE = 64 * 1024
+
+
+class MmapValues:
+    """Compteurs nommés (clé -> float) dans un fichier projeté en mémoire"""
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._positions = {}
+        self._lock = threading.Lock()
+        self._used = _HEADER.unpack_from(self._map, 0)[0]
+        if self._used == 0:
+            self._used = 8
+            _HEADER.pack_into(self._map, 0, self._used)
+        for key, _, position in iter_entries(self._map, self._used):
+            self._positions[key] = position
+
+    def add(self, key, amount=1.0):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._append(key)
+            value = _VALUE.unpack_from(self._map, position)[0]
+            _VALUE.pack_into(self._map, position, value + amount)
+
+    def _append(self, key):
+        encoded = key.encode('utf-8')
+        padding = -(_HEADER.size + len(encoded)) % 8
+        entry = _HEADER.pack(len(encoded)) + encoded + b' ' * padding + _VALUE.pack(0.0)
+        if self._used + len(entry) > len(self._map):
+            size = len(self._map)
+            while self._used + len(entry) > size:
+                size *= 2
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        self._map[self._used:self._used + len(entry)] = entry
+        position = self._used + len(entry) - _VALUE.size
+        # L'en-tête n'avance qu'une fois l'entrée écrite : un lecteur ne voit jamais d'entrée partielle
+        self._used += len(entry)
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+
+def iter_entries(data, used):
+    """(clé, valeur, position de la valeur) des entrées d'un fichier"""
+    offset = 8
+    while offset < used:
+        length = _HEADER.unpack_from(data, offset)[0]
+        start = offset + _HEADER.size
+        key = bytes(data[start:start + length]).decode('utf-8')
+        offset = start + length + (-(_HEADER.size + length) % 8)
+        yield key, _VALUE.unpack_from(data, offset)[0], offset
+        offset += _VALUE.size
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def store():
+    """Fichier du processus courant (rouvert après un fork)"""
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store_pid != pid:
+        with _store_lock:
+            if _store_pid != pid:
+                os.makedirs(metrics_dir(), exist_ok=True)
+                _store = MmapValues(os.path.join(metrics_dir(), f'{pid}.db'))
+                _store_pid = pid
+    return _store
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', True) and bool(metrics_dir())
+
+
+def make_key(name, **labels):
+    return json.dumps([name, labels], sort_keys=True, separators=(',', ':'))
+
+
+def inc(name, amount=1.0, **labels):
+    if enabled():
+        store().add(make_key(name, **labels), amount)
+
+
+def observe(name, value, buckets, **labels):
+    """Histogramme : compte par intervalle (cumulé à la lecture), somme et nombre"""
+    if not enabled():
+        return
+    values = store()
+    bucket = next((str(bound) for bound in buckets if value <= bound), '+Inf')
+    values.add(make_key(f'{name}_bucket', le=bucket, **labels))
+    values.add(make_key(f'{name}_sum', **labels), value)
+    values.add(make_key(f'{name}_count', **labels))
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # Les chemins non résolus (404) partagent une étiquette : cardinalité bornée
+    return match.view_name if match and match.view_name else 'unmatched'
+
+
+def observe_request(request, response, total_ms, sql_count):
+    if not enabled():
+        return
+    route = route_name(request)
+    observe('http_request_duration_seconds', total_ms / 1000, LATENCY_BUCKETS,
+            route=route, method=request.method, status=str(response.status_code))
+    observe('http_request_sql_queries', sql_count, SQL_BUCKETS, route=route)
+
+
+def record_cache(alias, hit):
+    inc('django_cache_requests_total', cache=alias, result='hit' if hit else 'miss')
+
+
+# ---------------------------------------------------------------------------
+# Lecture et format texte Prometheus
+# ---------------------------------------------------------------------------
+
+def collect():
+    """{(nom, étiquettes triées): valeur} additionné sur tous les processus"""
+    totals = {}
+    for path in glob.glob(os.path.join(metrics_dir(), '*.db')):
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+        except FileNotFoundError:
+            continue
+        if len(data) < 8:
+            continue
+        for key, value, _ in iter_entries(data, min(_HEADER.unpack_from(data, 0)[0], len(data))):
+            name, labels = json.loads(key)
+            sample = (name, tuple(sorted(labels.items())))
+            totals[sample] = totals.get(sample, 0.0) + value
+    return totals
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def render():
+    totals = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (sample, labels), value in sorted(totals.items()):
+                if sample == name:
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+            continue
+        buckets = LATENCY_BUCKETS if name == 'http_request_duration_seconds' else SQL_BUCKETS
+        by_series = {}
+        for (sample, labels), value in totals.items():
+            if sample == f'{name}_bucket':
+                bound = dict(labels)['le']
+                by_series.setdefault(tuple(label for label in labels if label[0] != 'le'), {})[bound] = value
+        for labels in sorted({labels for sample, labels in totals if sample == f'{name}_count'}):
+            counts = by_series.get(labels, {})
+            cumulative = 0.0
+            for bound in [str(bound) for bound in buckets] + ['+Inf']:
+                cumulative += counts.get(bound, 0.0)
+                bucket_labels = tuple(sorted(labels + (('le', bound),)))
+                lines.append(f'{name}_bucket{format_labels(bucket_labels)} {format_value(cumulative)}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(totals.get((f"{name}_sum", labels), 0.0))}')
+            lines.append(f'{name}_count{format_labels(labels)} {format_value(totals[(f"{name}_count", labels)])}')
+
+    lines.append('# HELP django_cache_hit_ratio Part des lectures du cache Django trouvées')
+    lines.append('# TYPE django_cache_hit_ratio gauge')
+    caches = sorted({dict(labels)['cache'] for sample, labels in totals if sample == 'django_cache_requests_total'})
+    for alias in caches:
+        hits = totals.get(('django_cache_requests_total', (('cache', alias), ('result', 'hit'))), 0.0)
+        misses = totals.get(('django_cache_requests_total', (('cache', alias), ('result', 'miss'))), 0.0)
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f'django_cache_hit_ratio{format_labels((("cache", alias),))} {format_value(ratio)}')
+    return '\n'.join(lines) + '\n'
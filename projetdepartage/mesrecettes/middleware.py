@@ -1,8 +1,23 @@
 """
 Middleware personnalisé pour désactiver CSRF pour les endpoints API REST
-tout en le gardant pour l'admin Django
+tout en le gardant pour l'admin Django, pour profiler les requêtes et pour
+router les lectures vers les réplicas
 """
+import logging
+import random
+
 from django.utils.deprecation import MiddlewareMixin
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from . import metrics
+from .db_router import is_pinned, pick_replica, pin_to_primary, read_replica
+from .profiling import (
+    RequestProfile, current_profile, log_request, save_profile, server_timing, server_timing_allowed,
+    start_profiler, stop_profiler
+)
+
+logger = logging.getLogger(__name__)
 
 
 class DisableCSRFForAPI(MiddlewareMixin):
@@ -16,3 +31,84 @@ class DisableCSRFForAPI(MiddlewareMixin):
         if request.path.startswith('/mes-recettes/') or request.path.startswith('/api/'):
             setattr(request, '_dont_enforce_csrf_checks', True)
         return None
+
+
+class RequestProfilingMiddleware(MiddlewareMixin):
+    """
+    Mesure les phases de la requête (voir profiling.py) : en-tête
+    Server-Timing, journal structuré et profil cProfile échantillonné, et
+    métriques Prometheus (metrics.py), actives indépendamment.
+    """
+
+    def process_request(self, request):
+        profiling = getattr(settings, 'PROFILING_ENABLED', True)
+        if not profiling and not metrics.enabled():
+            return None
+        profile = RequestProfile()
+        request._profile = profile
+        current_profile.set(profile)
+        if not profiling:
+            return None
+        sampled = random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if not self.async_mode and (sampled or getattr(settings, 'PROFILING_SLOW_MS', 0)):
+            profile.profiler = start_profiler()
+            profile.sampled = sampled
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            match = request.resolver_match
+            profile.start_view(match.view_name if match else '')
+        return None
+
+    def process_response(self, request, response):
+        profile = getattr(request, '_profile', None)
+        if profile is None:
+            return response
+        if profile.profiler is not None:
+            stop_profiler(profile.profiler)
+        profile.finish_view()
+        timings = profile.timings()
+        current_profile.set(None)
+        metrics.observe_request(request, response, timings['total'], profile.sql_count)
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            return response
+
+        dump = None
+        slow_ms = getattr(settings, 'PROFILING_SLOW_MS', 0)
+        if profile.profiler is not None and (profile.sampled or (slow_ms and timings['total'] >= slow_ms)):
+            try:
+                dump = save_profile(profile.profiler, request, timings['total'])
+            except OSError:
+                logger.warning("Impossible d'enregistrer le profil de %s", request.path, exc_info=True)
+
+        if server_timing_allowed(request):
+            response['Server-Timing'] = server_timing(timings, profile.sql_count)
+        size = None if response.streaming else len(response.content)
+        log_request(request, response, profile, timings, size, dump)
+        return response
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Choisit la base des lectures de la requête (voir db_router.py) : un même
+    réplica sain pour toutes les lectures, primaire pour les écritures, les
+    chemins exclus et les clients ayant écrit récemment.
+    """
+
+    def process_request(self, request):
+        excluded = getattr(settings, 'REPLICA_EXCLUDED_PATHS', ('/admin/', '/auth/'))
+        primary = (
+            request.method not in SAFE_METHODS
+            or request.path.startswith(tuple(excluded))
+            or is_pinned(request)
+        )
+        read_replica.set(None if primary else pick_replica())
+        return None
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 500:
+            pin_to_primary(request)
+        read_replica.set(None)
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesrecettes', '0006_resourceversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('normalized_sql', models.TextField()),
+                ('sample_sql', models.TextField(help_text='Dernière requête observée, paramètres non substitués')),
+                ('params_fingerprint', models.CharField(blank=True, max_length=40)),
+                ('database', models.CharField(max_length=100)),
+                ('view', models.CharField(blank=True, max_length=200)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('last_ms', models.FloatField(default=0)),
+                ('explain', models.TextField(blank=True)),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'requête lente',
+                'verbose_name_plural': 'requêtes lentes',
+                'ordering': ['-total_ms'],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+def assign_ranks(apps, schema_editor):
+    """Clés régulièrement espacées dans l'ordre existant de chaque parent"""
+    alias = schema_editor.connection.alias
+    for model_name, parent, ordering in (
+        ('Ingredient', 'recipe_id', ('order',)),
+        ('RecipeImage', 'recipe_id', ('order',)),
+        ('ShoppingListItem', 'shopping_list_id', ('order', 'ingredient_name')),
+    ):
+        model = apps.get_model('mesrecettes', model_name)
+        rows = model.objects.using(alias).order_by(parent, *ordering, 'pk').only('pk', parent)
+        group, ranked = [], []
+        for row in rows.iterator(chunk_size=2000):
+            if group and getattr(row, parent) != getattr(group[0], parent):
+                ranked += rank_group(group)
+                group = []
+            group.append(row)
+            if len(ranked) >= 1000:
+                model.objects.using(alias).bulk_update(ranked, ['rank'])
+                ranked = []
+        ranked += rank_group(group)
+        model.objects.using(alias).bulk_update(ranked, ['rank'], batch_size=1000)
+
+
+def rank_group(rows):
+    from mesrecettes.ranking import spread
+
+    for row, rank in zip(rows, spread(len(rows))):
+        row.rank = rank
+    return rows
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesrecettes', '0007_slowquery'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'ordering': ['rank', 'order']},
+        ),
+        migrations.AlterModelOptions(
+            name='recipeimage',
+            options={'ordering': ['rank', 'order']},
+        ),
+        migrations.AlterModelOptions(
+            name='shoppinglistitem',
+            options={'ordering': ['rank', 'order', 'ingredient_name']},
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='rank',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='recipeimage',
+            name='rank',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='rank',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.RunPython(assign_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['recipe', 'rank'], name='mesrecettes_recipe__0ed022_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeimage',
+            index=models.Index(fields=['recipe', 'rank'], name='mesrecettes_recipe__4cb2cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglistitem',
+            index=models.Index(fields=['shopping_list', 'rank'], name='mesrecettes_shoppin_975afb_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesrecettes', '0008_ranks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.BigIntegerField()),
+                ('client_id', models.CharField(blank=True, default='', max_length=64)),
+                ('revision', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='revision',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='sync_floor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='client_id',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='revision',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglistitem',
+            index=models.Index(fields=['shopping_list', 'revision'], name='mesrecettes_shoppin_6fa858_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_id', ''), _negated=True), fields=('shopping_list', 'client_id'), name='unique_shopping_list_item_client_id'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglisttombstone',
+            name='shopping_list',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='mesrecettes.shoppinglist'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglisttombstone',
+            index=models.Index(fields=['shopping_list', 'revision'], name='mesrecettes_shoppin_5cb6ef_idx'),
+        ),
+    ]
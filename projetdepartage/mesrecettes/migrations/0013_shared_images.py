@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 20:35
+
+import mesrecettes.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesrecettes', '0012_hashed_media'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='main_image',
+            field=mesrecettes.fields.HashedImageField(blank=True, db_index=True, null=True, upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='recipecategory',
+            name='image',
+            field=mesrecettes.fields.HashedImageField(blank=True, db_index=True, null=True, upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='recipeimage',
+            name='image',
+            field=mesrecettes.fields.HashedImageField(db_index=True, upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='profile_picture',
+            field=mesrecettes.fields.HashedImageField(blank=True, db_index=True, null=True, upload_to='images/'),
+        ),
+    ]
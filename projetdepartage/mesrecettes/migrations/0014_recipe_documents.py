@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-19 21:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesrecettes', '0013_shared_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='mesrecettes.recipe')),
+                ('fingerprint', models.CharField(max_length=32)),
+                ('body', models.BinaryField()),
+                ('generated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -1,15 +1,18 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
+from .fields import HashedImageField
+
 
 class User(AbstractUser):
     """Modèle utilisateur étendu"""
     email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=150, blank=True)
     last_name = models.CharField(max_length=150, blank=True)
-    profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # Nommées d'après leur contenu, indexées : contrôle d'accès (media.py) et références (uploads.py)
+    profile_picture = HashedImageField(blank=True, null=True, db_index=True)
     bio = models.TextField(blank=True)
     culinary_level = models.IntegerField(
         default=1,
@@ -20,6 +23,8 @@ class User(AbstractUser):
     email_verification_token = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Suppression différée (voir purge.py) : compte désactivé, supprimé par purge_deleted
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     def __str__(self):
         return self.username
@@ -61,7 +66,7 @@ class RecipeCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     icon = models.CharField(max_length=50, blank=True)
-    image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    image = HashedImageField(blank=True, null=True, db_index=True)
 
     class Meta:
         ordering = ['name']
@@ -79,6 +84,13 @@ class IngredientCategory(models.Model):
         return self.name
 
 
+class LiveRecipeManager(models.Manager):
+    """Recettes non supprimées (deleted_at vide)"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Recipe(models.Model):
     """Modèle de recette"""
     DIFFICULTY_CHOICES = [
@@ -112,7 +124,7 @@ class Recipe(models.Model):
     tags = models.JSONField(default=list, blank=True)
     
     # Images
-    main_image = models.ImageField(upload_to='recipes/', blank=True, null=True)
+    main_image = HashedImageField(blank=True, null=True, db_index=True)
     
     # Statistiques
     views_count = models.IntegerField(default=0)
@@ -120,9 +132,16 @@ class Recipe(models.Model):
     
     # Dates
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Indexé : relecture des recettes modifiées (suggest.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     published_at = models.DateTimeField(null=True, blank=True)
     is_published = models.BooleanField(default=True)
+    # Suppression différée (voir purge.py) : masquée partout, supprimée par purge_deleted
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = LiveRecipeManager()
+    # Y compris les recettes supprimées (purge, admin)
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ['-created_at']
@@ -138,12 +157,17 @@ class Recipe(models.Model):
 class RecipeImage(models.Model):
     """Images supplémentaires pour les recettes"""
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='recipes/images/')
+    image = HashedImageField(db_index=True)
     order = models.IntegerField(default=0)
+    # Clé de rang fractionnaire (voir ranking.py), attribuée à la création
+    rank = models.CharField(max_length=64, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    RANK_PARENT = 'recipe'
+
     class Meta:
-        ordering = ['order']
+        ordering = ['rank', 'order']
+        indexes = [models.Index(fields=['recipe', 'rank'])]
 
 
 class Ingredient(models.Model):
@@ -155,9 +179,13 @@ class Ingredient(models.Model):
     category = models.ForeignKey(IngredientCategory, on_delete=models.SET_NULL, null=True, blank=True)
     estimated_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     order = models.IntegerField(default=0)
+    rank = models.CharField(max_length=64, blank=True, default='')
+
+    RANK_PARENT = 'recipe'
 
     class Meta:
-        ordering = ['order']
+        ordering = ['rank', 'order']
+        indexes = [models.Index(fields=['recipe', 'rank'])]
 
     def __str__(self):
         return f"{self.name} - {self.quantity} {self.unit}"
@@ -193,6 +221,10 @@ class ShoppingList(models.Model):
     name = models.CharField(max_length=200, default="Ma liste de courses")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Synchronisation (voir sync.py) : incrémenté à chaque modification d'un item
+    revision = models.BigIntegerField(default=0)
+    # Révision jusqu'à laquelle les suppressions ont pu être oubliées
+    sync_floor = models.BigIntegerField(default=0)
 
     def __str__(self):
         return f"{self.user.username} - {self.name}"
@@ -207,13 +239,52 @@ class ShoppingListItem(models.Model):
     category = models.ForeignKey(IngredientCategory, on_delete=models.SET_NULL, null=True, blank=True)
     is_checked = models.BooleanField(default=False)
     order = models.IntegerField(default=0)
+    rank = models.CharField(max_length=64, blank=True, default='')
+    # Révision de la liste lors de la dernière modification, et date de celle-ci
+    # (horloge du client pour les modifications synchronisées)
+    revision = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    # Identifiant attribué hors ligne par le client : rend les créations rejouables
+    client_id = models.CharField(max_length=64, blank=True, default='')
+
+    RANK_PARENT = 'shopping_list'
 
     class Meta:
-        ordering = ['order', 'ingredient_name']
+        ordering = ['rank', 'order', 'ingredient_name']
+        indexes = [
+            models.Index(fields=['shopping_list', 'rank']),
+            models.Index(fields=['shopping_list', 'revision']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['shopping_list', 'client_id'], condition=~models.Q(client_id=''),
+                name='unique_shopping_list_item_client_id',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.ingredient_name} - {self.quantity} {self.unit}"
 
+    def save(self, *args, **kwargs):
+        # La révision de la liste (signal pre_save) et l'item sont validés ensemble
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
+
+
+class ShoppingListTombstone(models.Model):
+    """Item supprimé, transmis aux clients synchronisés (voir sync.py)"""
+    shopping_list = models.ForeignKey(ShoppingList, on_delete=models.CASCADE, related_name='tombstones')
+    item_id = models.BigIntegerField()
+    client_id = models.CharField(max_length=64, blank=True, default='')
+    revision = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['shopping_list', 'revision'])]
+
+    def __str__(self):
+        return f"{self.shopping_list_id} - {self.item_id} (r{self.revision})"
+
 
 class Menu(models.Model):
     """Menu sur plusieurs jours"""
@@ -251,3 +322,88 @@ class MenuRecipe(models.Model):
         return f"{self.menu.name} - {self.recipe.title} - {self.date}"
 
 
+class UserStatistics(models.Model):
+    """Statistiques agrégées d'un utilisateur, maintenues par deltas (voir signals.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='statistics')
+    recipes_count = models.IntegerField(default=0)
+    favorites_given = models.IntegerField(default=0)
+    favorites_received = models.IntegerField(default=0)
+    views_made = models.IntegerField(default=0)
+    views_received = models.IntegerField(default=0)
+    # Listes dénormalisées : [{'id', 'title', 'views_count'}] et [{'id', 'title', 'created_at'}]
+    most_viewed_recipes = models.JSONField(default=list, blank=True)
+    recent_recipes = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Statistiques de {self.user.username}"
+
+
+class DailyRecipeViewCount(models.Model):
+    """Nombre de vues reçues par jour sur les recettes d'un auteur"""
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_view_counts')
+    date = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['author', 'date']
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.author.username} - {self.date} : {self.count}"
+
+
+class ResourceVersion(models.Model):
+    """Compteur de version partagé entre les workers (validateurs HTTP, invalidation de caches)"""
+    name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class ReleasedFile(models.Model):
+    """Fichier media dont une référence a été retirée, supprimé par le balayage s'il n'est plus référencé (uploads.py)"""
+    name = models.CharField(max_length=255, unique=True)
+    released_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeDocument(models.Model):
+    """Représentation JSON précalculée du détail d'une recette (voir documents.py)"""
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE, primary_key=True, related_name='document')
+    # Empreinte des données dont dépend le document : il est périmé si elle diffère
+    fingerprint = models.CharField(max_length=32)
+    body = models.BinaryField()
+    generated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Document de la recette {self.recipe_id}"
+
+
+class SlowQuery(models.Model):
+    """Requête SQL lente, regroupée par empreinte de la requête normalisée (voir slow_queries.py)"""
+    fingerprint = models.CharField(max_length=40, unique=True)
+    normalized_sql = models.TextField()
+    sample_sql = models.TextField(help_text="Dernière requête observée, paramètres non substitués")
+    params_fingerprint = models.CharField(max_length=40, blank=True)
+    database = models.CharField(max_length=100)
+    view = models.CharField(max_length=200, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    last_ms = models.FloatField(default=0)
+    explain = models.TextField(blank=True)
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-total_ms']
+        verbose_name = 'requête lente'
+        verbose_name_plural = 'requêtes lentes'
+
+    def __str__(self):
+        return f"{self.fingerprint[:12]} ({self.count} × {self.max_ms:.0f} ms max)"
@@ -0,0 +1,39 @@
+"""
+Pagination des vues DRF (PageNumberPagination, page évaluée dans la phase
+queryset du profilage), et pagination hors DRF (vues async, réponses
+pré-sérialisées) au même format.
+"""
+from rest_framework import pagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .profiling import phase
+
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    def paginate_queryset(self, queryset, request, view=None):
+        # Comptage, lignes de la page et préchargements
+        with phase('queryset'):
+            return super().paginate_queryset(queryset, request, view)
+
+
+def page_number(request):
+    """Numéro de page demandé (?page=), None s'il est invalide"""
+    try:
+        return int(request.GET.get('page', 1))
+    except ValueError:
+        return None
+
+
+def paginated(request, page_number, count, results, page_size=None):
+    page_size = page_size or api_settings.PAGE_SIZE
+    url = request.build_absolute_uri()
+    last_page = max(1, -(-count // page_size))
+    next_url = replace_query_param(url, 'page', page_number + 1) if page_number < last_page else None
+    previous_url = None
+    if page_number > 1:
+        previous_url = (
+            remove_query_param(url, 'page') if page_number == 2
+            else replace_query_param(url, 'page', page_number - 1)
+        )
+    return {'count': count, 'next': next_url, 'previous': previous_url, 'results': results}
@@ -0,0 +1,226 @@
+"""
+Planification automatique des menus (POST /menus/<id>/autofill/).
+
+Les contraintes propres à chaque recette (allergies, régimes, visibilité) sont
+appliquées en SQL ; les attributs des recettes restantes sont ensuite chargés
+une seule fois dans des tableaux compacts sur lesquels tourne une heuristique
+gloutonne : pour chaque créneau date×repas, on parcourt les catégories les
+moins utilisées et on retient la première recette compatible avec le temps
+quotidien, le budget restant et la fenêtre de non-répétition. Le nombre de
+créneaux est borné par MENU_MAX_DAYS, vérifié par les serializers du menu et
+du remplissage.
+"""
+import random
+from array import array
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+
+from .models import MenuRecipe, Recipe, UserProfile
+
+DEFAULT_MEAL_TYPES = ['breakfast', 'lunch', 'dinner']
+NO_CATEGORY = 0
+# Marge tolérée au-dessus de la part équitable du budget restant
+BUDGET_SLACK = 1.25
+
+
+class RecipeCatalog:
+    """Attributs des recettes candidates, stockés en tableaux parallèles"""
+    __slots__ = ('ids', 'categories', 'times', 'costs', 'by_category', 'min_cost')
+
+    def __init__(self, rows, rng):
+        self.ids = array('q')
+        self.categories = array('q')
+        self.times = array('l')
+        self.costs = array('q')  # centimes
+        self.by_category = {}
+        for recipe_id, category_id, prep_time, cook_time, cost, popularity in rows:
+            index = len(self.ids)
+            category = category_id or NO_CATEGORY
+            self.ids.append(recipe_id)
+            self.categories.append(category)
+            self.times.append(prep_time + cook_time)
+            self.costs.append(int((cost or 0) * 100))
+            self.by_category.setdefault(category, []).append((popularity + rng.random(), index))
+        # Les recettes populaires sont proposées en premier dans chaque catégorie
+        for category, entries in self.by_category.items():
+            entries.sort(reverse=True)
+            self.by_category[category] = array('l', (index for _, index in entries))
+        self.min_cost = min(self.costs) if self.costs else 0
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def candidate_recipes(user, allergies=(), diets=()):
+    """Recettes visibles par l'utilisateur et compatibles avec ses allergies et régimes"""
+    queryset = Recipe.objects.filter(Q(is_published=True) | Q(author=user))
+    for allergy in allergies:
+        queryset = queryset.exclude(
+            Q(ingredients__name__icontains=allergy) | Q(tags__icontains=allergy)
+        )
+    for diet in diets:
+        queryset = queryset.filter(tags__icontains=diet)
+    return queryset
+
+
+def load_catalog(user, allergies=(), diets=(), rng=None):
+    rows = candidate_recipes(user, allergies, diets).order_by().annotate(
+        cost=Coalesce(
+            Sum('ingredients__estimated_price'),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    ).values_list('id', 'category_id', 'prep_time', 'cook_time', 'cost', 'favorites_count')
+    return RecipeCatalog(rows, rng or random.Random())
+
+
+def profile_constraints(user):
+    """Noms des allergies et régimes déclarés dans le profil de l'utilisateur"""
+    profile = UserProfile.objects.filter(user=user).prefetch_related('allergies', 'dietary_restrictions').first()
+    if profile is None:
+        return [], []
+    return (
+        [allergy.name for allergy in profile.allergies.all()],
+        [diet.name for diet in profile.dietary_restrictions.all()],
+    )
+
+
+class MenuPlanner:
+    """Remplit les créneaux libres d'un menu à partir d'un RecipeCatalog"""
+
+    def __init__(self, menu, catalog, meal_types=None, max_daily_time=None,
+                 budget=None, no_repeat_days=7, rng=None):
+        self.menu = menu
+        self.catalog = catalog
+        self.meal_types = meal_types or DEFAULT_MEAL_TYPES
+        self.max_daily_time = max_daily_time
+        self.budget = int(budget * 100) if budget is not None else None
+        self.no_repeat_days = no_repeat_days
+        self.rng = rng or random.Random()
+        self.index_of = {recipe_id: index for index, recipe_id in enumerate(catalog.ids)}
+
+    def days(self):
+        day = self.menu.start_date
+        while day <= self.menu.end_date:
+            yield day
+            day += timedelta(days=1)
+
+    def plan(self, existing=()):
+        """
+        Retourne (entrées MenuRecipe non sauvegardées, créneaux non remplis).
+        `existing` contient les entrées déjà présentes dans le menu, prises en
+        compte pour le temps, le budget, la variété et les répétitions.
+        """
+        catalog = self.catalog
+        start = self.menu.start_date
+        taken = set()
+        day_time = {}
+        last_used = {}
+        category_uses = dict.fromkeys(catalog.by_category, 0)
+        day_categories = {}
+        spent = 0
+
+        for entry in existing:
+            taken.add((entry.date, entry.meal_type))
+            offset = (entry.date - start).days
+            day_time[entry.date] = day_time.get(entry.date, 0) + entry.recipe.total_time
+            index = self.index_of.get(entry.recipe_id)
+            if index is not None:
+                last_used[index] = max(last_used.get(index, offset), offset)
+                category = catalog.categories[index]
+                category_uses[category] += 1
+                day_categories.setdefault(entry.date, []).append(category)
+                spent += catalog.costs[index]
+
+        free_slots = [
+            (day, meal_type) for day in self.days() for meal_type in self.meal_types
+            if (day, meal_type) not in taken
+        ]
+        cursors = dict.fromkeys(catalog.by_category, 0)
+        planned, unfilled = [], []
+
+        for position, (day, meal_type) in enumerate(free_slots):
+            offset = (day - start).days
+            time_left = None
+            if self.max_daily_time is not None:
+                time_left = self.max_daily_time - day_time.get(day, 0)
+            cost_caps = [None]
+            if self.budget is not None:
+                # Plafond strict : garder de quoi remplir les créneaux suivants avec la
+                # recette la moins chère. On vise d'abord une part équitable du reste.
+                remaining_slots = len(free_slots) - position - 1
+                hard_cap = self.budget - spent - catalog.min_cost * remaining_slots
+                fair_share = int((self.budget - spent) * BUDGET_SLACK / (remaining_slots + 1))
+                cost_caps = [min(fair_share, hard_cap), hard_cap]
+
+            today = day_categories.setdefault(day, [])
+            categories = sorted(
+                catalog.by_category,
+                key=lambda c: (today.count(c), category_uses[c], self.rng.random()),
+            )
+            index = None
+            for cost_cap in cost_caps:
+                index = self._pick(categories, cursors, offset, last_used, time_left, cost_cap)
+                if index is not None:
+                    break
+            if index is None:
+                unfilled.append({'date': day.isoformat(), 'meal_type': meal_type})
+                continue
+
+            category = catalog.categories[index]
+            last_used[index] = offset
+            category_uses[category] += 1
+            today.append(category)
+            day_time[day] = day_time.get(day, 0) + catalog.times[index]
+            spent += catalog.costs[index]
+            planned.append(MenuRecipe(
+                menu=self.menu, recipe_id=catalog.ids[index], date=day, meal_type=meal_type
+            ))
+
+        return planned, unfilled
+
+    def _pick(self, categories, cursors, offset, last_used, time_left, cost_cap):
+        catalog = self.catalog
+        for category in categories:
+            indexes = catalog.by_category[category]
+            size = len(indexes)
+            cursor = cursors[category]
+            for step in range(size):
+                index = indexes[(cursor + step) % size]
+                used = last_used.get(index)
+                if used is not None and offset - used <= self.no_repeat_days:
+                    continue
+                if time_left is not None and catalog.times[index] > time_left:
+                    continue
+                if cost_cap is not None and catalog.costs[index] > cost_cap:
+                    continue
+                cursors[category] = (cursor + step + 1) % size
+                return index
+        return None
+
+
+def autofill_menu(menu, meal_types=None, max_daily_time=None, budget=None,
+                  no_repeat_days=7, replace=False, seed=None):
+    """Remplit le menu et enregistre les nouvelles entrées en un seul bulk_create"""
+    rng = random.Random(seed)
+    allergies, diets = profile_constraints(menu.user)
+    catalog = load_catalog(menu.user, allergies, diets, rng)
+    planner = MenuPlanner(
+        menu, catalog, meal_types=meal_types, max_daily_time=max_daily_time,
+        budget=budget, no_repeat_days=no_repeat_days, rng=rng,
+    )
+
+    with transaction.atomic():
+        entries = menu.recipes.filter(date__range=(menu.start_date, menu.end_date))
+        if replace:
+            entries.delete()
+            existing = []
+        else:
+            existing = list(entries.select_related('recipe'))
+        planned, unfilled = planner.plan(existing)
+        MenuRecipe.objects.bulk_create(planned)
+    return planned, unfilled
@@ -0,0 +1,214 @@
+"""
+Profilage des requêtes (RequestProfilingMiddleware, middleware.py).
+
+Pour chaque requête, le middleware mesure :
+- auth : authentification DRF (CachedJWTAuthentication) ;
+- sql : requêtes SQL exécutées (nombre et durée), sur toutes les connexions ;
+- queryset : évaluation explicite des querysets de la vue (page de la
+  pagination, objet du détail), SQL et construction des instances compris ;
+- serialization : temps passé dans la vue hors SQL, hors authentification et
+  hors queryset, essentiellement les serializers ;
+- render : rendu JSON (FastJSONRenderer) ;
+- total, et la taille de la réponse.
+
+Les mesures sont journalisées en JSON sur le logger mesrecettes.profiling,
+et renvoyées dans l'en-tête Server-Timing aux membres du staff, ou à tous
+avec PROFILING_SERVER_TIMING (elles renseignent sur les données et le
+schéma).
+
+Un profil cProfile (pstats) est enregistré dans PROFILING_DIR pour une
+fraction PROFILING_SAMPLE_RATE des requêtes, et pour les requêtes plus lentes
+que PROFILING_SLOW_MS ; seuls les PROFILING_MAX_FILES derniers sont conservés.
+Avec un seuil, toutes les requêtes sont profilées (surcoût notable) et seules
+les lentes sont enregistrées. Un seul profil à la fois par processus, et
+uniquement en WSGI : sous ASGI la vue ne s'exécute pas dans le thread du
+middleware.
+"""
+import cProfile
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Profil de la requête en cours (None hors requête)
+current_profile = ContextVar('current_profile', default=None)
+
+_profiler_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.active_phase = None
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        # SQL exécuté dans la vue, hors authentification et queryset (déduit de serialization)
+        self.view_sql_ms = 0.0
+        self.view_started = None
+        self.view_finished = None
+        self.profiler = None
+        self.sampled = False
+        # Route de la vue (journal des requêtes lentes)
+        self.view = ''
+
+    def add_phase(self, name, ms):
+        self.phases[name] = self.phases.get(name, 0.0) + ms
+
+    def add_sql(self, ms):
+        self.sql_count += 1
+        self.sql_ms += ms
+        if (self.view_started is not None and self.view_finished is None
+                and self.active_phase not in ('auth', 'queryset')):
+            self.view_sql_ms += ms
+
+    def start_view(self, view=''):
+        self.view_started = time.perf_counter()
+        self.view = view
+
+    def finish_view(self):
+        if self.view_started is not None and self.view_finished is None:
+            self.view_finished = time.perf_counter()
+
+    def timings(self):
+        """{phase: durée en ms}"""
+        now = time.perf_counter()
+        auth = self.phases.get('auth', 0.0)
+        queryset = self.phases.get('queryset', 0.0)
+        timings = {'auth': auth, 'sql': self.sql_ms, 'queryset': queryset}
+        if self.view_started is not None:
+            view = ((self.view_finished or now) - self.view_started) * 1000
+            timings['serialization'] = max(0.0, view - auth - queryset - self.view_sql_ms)
+        timings['render'] = self.phases.get('render', 0.0)
+        timings['total'] = (now - self.started) * 1000
+        return timings
+
+
+@contextmanager
+def phase(name):
+    """Chronomètre une phase de la requête en cours (sans effet hors requête profilée)"""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    previous, profile.active_phase = profile.active_phase, name
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_phase(name, (time.perf_counter() - start) * 1000)
+        profile.active_phase = previous
+
+
+def finish_view():
+    """Fin de la vue : appelé au début du rendu de la réponse DRF"""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.finish_view()
+
+
+def record_sql(execute, sql, params, many, context):
+    """execute_wrapper installé sur chaque connexion"""
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_sql((time.perf_counter() - start) * 1000)
+
+
+def install_sql_timer(sender, connection, **kwargs):
+    # connection_created : couvre aussi les connexions des threads des vues asynchrones
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+connection_created.connect(install_sql_timer, dispatch_uid='mesrecettes.profiling')
+
+
+def server_timing_allowed(request):
+    """En-tête Server-Timing : staff uniquement, sauf PROFILING_SERVER_TIMING"""
+    if getattr(settings, 'PROFILING_SERVER_TIMING', False):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff)
+
+
+def server_timing(timings, sql_count):
+    # Les en-têtes HTTP sont en latin-1 : description sans accents
+    parts = []
+    for name, ms in timings.items():
+        part = f'{name};dur={ms:.1f}'
+        if name == 'sql':
+            part += f';desc="{sql_count} queries"'
+        parts.append(part)
+    return ', '.join(parts)
+
+
+# ---------------------------------------------------------------------------
+# cProfile échantillonné
+# ---------------------------------------------------------------------------
+
+def start_profiler():
+    """Profileur démarré, ou None si un autre profil est déjà en cours"""
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # Un autre outil de profilage est actif
+        _profiler_lock.release()
+        return None
+    return profiler
+
+
+def stop_profiler(profiler):
+    profiler.disable()
+    _profiler_lock.release()
+
+
+def save_profile(profiler, request, total_ms):
+    """Écrit le profil pstats dans PROFILING_DIR et supprime les plus anciens"""
+    directory = getattr(settings, 'PROFILING_DIR', None)
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{request.method}-{slug[:80]}-{total_ms:.0f}ms.pstats"
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path)
+
+    keep = getattr(settings, 'PROFILING_MAX_FILES', 100)
+    dumps = sorted(entry for entry in os.listdir(directory) if entry.endswith('.pstats'))
+    for old in dumps[:max(0, len(dumps) - keep)]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except FileNotFoundError:  # Supprimé par un autre worker
+            pass
+    return path
+
+
+def log_request(request, response, profile, timings, size, dump):
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'timings': {name: round(ms, 2) for name, ms in timings.items()},
+        'sql_count': profile.sql_count,
+        'size': size,
+    }
+    if dump:
+        record['profile'] = dump
+    logger.info(json.dumps(record), extra={'profile': record})
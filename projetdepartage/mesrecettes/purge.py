@@ -0,0 +1,199 @@
+"""
+Suppression différée des utilisateurs et des recettes.
+
+Supprimer un utilisateur avec le Collector de Django charge en mémoire tous
+ses objets liés (recettes, ingrédients, images, favoris, vues, menus, listes
+de courses...) puis les supprime en une seule transaction : pour un auteur
+prolifique, elle verrouille une grande partie de la base et peut épuiser la
+mémoire du worker.
+
+La suppression se fait donc en deux temps :
+- soft_delete_user / soft_delete_recipe renseignent deleted_at : le contenu est
+  masqué immédiatement (Recipe.objects exclut les recettes supprimées, le
+  compte est désactivé) ;
+- la commande purge_deleted supprime ensuite les lignes en arrière-plan, des
+  dépendances vers la racine, par lots de PURGE_BATCH_SIZE lignes : un DELETE
+  ensembliste (raw_delete) par lot, dans sa propre transaction, qui inscrit
+  aussi ses fichiers media pour le balayage (uploads.py). Une ligne n'est
+  supprimée qu'après ses dépendances : une purge interrompue reprend
+  simplement là où elle s'était arrêtée.
+
+Les DELETE ensemblistes n'envoient pas de signals : les compteurs dénormalisés
+(favorites_count, UserStatistics) sont corrigés par les fonctions de
+BEFORE_DELETE.
+"""
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import CASCADE, DO_NOTHING, SET_NULL, Count, F, FileField, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import FavoriteRecipe, Recipe, RecipeView, User, UserStatistics
+from .uploads import release_files
+
+
+def soft_delete_recipe(recipe):
+    """Masque une recette ; ses lignes seront supprimées par purge_deleted"""
+    recipe.deleted_at = timezone.now()
+    recipe.save(update_fields=['deleted_at', 'updated_at'])
+    forget_statistics([recipe.author_id])
+    forget_audience_statistics(Q(recipe_id=recipe.pk))
+
+
+def soft_delete_user(user):
+    """Désactive un compte et masque ses recettes ; supprimés par purge_deleted"""
+    now = timezone.now()
+    with transaction.atomic(using=router.db_for_write(User)):
+        user.deleted_at, user.is_active = now, False
+        # save : invalide aussi le cache des utilisateurs authentifiés (signals.py)
+        user.save(update_fields=['deleted_at', 'is_active', 'updated_at'])
+        Recipe.objects.filter(author_id=user.pk).update(deleted_at=now, updated_at=now)
+        forget_statistics([user.pk])
+        forget_audience_statistics(Q(recipe__author_id=user.pk))
+
+
+def forget_statistics(user_ids, using=None):
+    """Statistiques reconstruites au prochain accès (voir stats.py)"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        using = using or router.db_for_write(UserStatistics)
+        UserStatistics.objects.using(using).filter(user_id__in=user_ids).delete()
+
+
+def forget_audience_statistics(condition):
+    """
+    Statistiques des utilisateurs ayant mis en favori ou vu les recettes
+    masquées (`condition` sur FavoriteRecipe et RecipeView) : elles ne sont
+    plus comptées par rebuild_user_statistics.
+    """
+    using = router.db_for_write(UserStatistics)
+    for model in (FavoriteRecipe, RecipeView):
+        UserStatistics.objects.using(using).filter(
+            user_id__in=model.objects.using(using).filter(condition).values('user_id')
+        ).delete()
+
+
+# ---------------------------------------------------------------------------
+# Corrections des compteurs avant suppression
+# ---------------------------------------------------------------------------
+
+def release_favorites(pks, using):
+    favorites = FavoriteRecipe.objects.using(using).filter(pk__in=pks)
+    by_count = defaultdict(list)
+    for recipe_id, count in favorites.order_by().values_list('recipe_id').annotate(count=Count('pk')):
+        by_count[count].append(recipe_id)
+    # Une requête par nombre distinct de favoris retirés, en pratique très peu
+    for count, recipe_ids in by_count.items():
+        Recipe.all_objects.using(using).filter(pk__in=recipe_ids).update(
+            favorites_count=Greatest(F('favorites_count') - count, Value(0))
+        )
+    forget_statistics(
+        {user_id for pair in favorites.values_list('user_id', 'recipe__author_id') for user_id in pair}, using
+    )
+
+
+def release_views(pks, using):
+    views = RecipeView.objects.using(using).filter(pk__in=pks)
+    forget_statistics(
+        {user_id for pair in views.values_list('user_id', 'recipe__author_id') for user_id in pair}, using
+    )
+
+
+BEFORE_DELETE = {
+    FavoriteRecipe: release_favorites,
+    RecipeView: release_views,
+}
+
+
+# ---------------------------------------------------------------------------
+# Purge par lots
+# ---------------------------------------------------------------------------
+
+def dependents(model):
+    """Relations inverses (clés étrangères, tables des ManyToMany) pointant vers `model`"""
+    return [
+        relation for relation in model._meta.get_fields(include_hidden=True)
+        if relation.auto_created and not relation.concrete and (relation.one_to_one or relation.one_to_many)
+    ]
+
+
+def release_row_files(model, pks, using):
+    fields = [field for field in model._meta.concrete_fields if isinstance(field, FileField)]
+    if not fields:
+        return
+    rows = model._base_manager.using(using).filter(pk__in=pks).values_list(*(field.attname for field in fields))
+    # Fichiers partagés (uploads.py) : supprimés par le balayage s'ils ne sont plus référencés
+    release_files({name for row in rows for name in row}, using)
+
+
+def raw_delete(queryset, using):
+    """
+    Supprime les lignes de `queryset` en un seul DELETE ; renvoie leur nombre.
+
+    Contrairement à QuerySet.delete(), ni Collector (objets et cascades chargés
+    en mémoire) ni signals pre_delete / post_delete. L'appelant prend donc à
+    sa charge ce que ces signals auraient fait :
+    - purge : dépendances déjà supprimées, compteurs corrigés par BEFORE_DELETE ;
+    - items de listes de courses (bulk.py, sync.py) : le receiver post_delete
+      créerait une tombstone et une révision par item (signals.py), alors que
+      l'appelant inscrit déjà toutes les tombstones du lot, à une seule
+      révision, en un bulk_create. Aucune clé étrangère ne pointe vers
+      ShoppingListItem.
+
+    QuerySet._raw_delete est une API privée de Django : ses usages passent
+    tous par cette fonction.
+    """
+    return queryset._raw_delete(using)
+
+
+def purge(model, condition, batch_size=None, using=None, pause=0, deleted=None):
+    """
+    Supprime les lignes de `model` vérifiant `condition` (Q) et leurs dépendances,
+    par lots ; renvoie {label du modèle: nombre de lignes supprimées}.
+    """
+    using = using or router.db_for_write(model)
+    batch_size = batch_size or getattr(settings, 'PURGE_BATCH_SIZE', 500)
+    deleted = Counter() if deleted is None else deleted
+    rows = model._base_manager.using(using).filter(condition).order_by('pk')
+    while True:
+        pks = list(rows.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        for relation in dependents(model):
+            related, field = relation.related_model, relation.field
+            on_delete = field.remote_field.on_delete
+            if on_delete is CASCADE:
+                purge(related, Q(**{f'{field.name}__in': pks}), batch_size, using, pause, deleted)
+            elif on_delete is SET_NULL:
+                detach(related, field, pks, batch_size, using)
+            elif on_delete is not DO_NOTHING:
+                raise ValueError(f'{related._meta.label}.{field.name} : on_delete non pris en charge')
+        with transaction.atomic(using=using):
+            if model in BEFORE_DELETE:
+                BEFORE_DELETE[model](pks, using)
+            # Dans la transaction du DELETE : une purge interrompue ne laisse pas de fichiers orphelins
+            release_row_files(model, pks, using)
+            deleted[model._meta.label] += raw_delete(model._base_manager.using(using).filter(pk__in=pks), using)
+        if pause:
+            time.sleep(pause)
+
+
+def detach(model, field, pks, batch_size, using):
+    rows = model._base_manager.using(using).filter(**{f'{field.name}__in': pks}).order_by('pk')
+    while True:
+        batch = list(rows.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return
+        model._base_manager.using(using).filter(pk__in=batch).update(**{field.name: None})
+
+
+def purge_deleted(before=None, batch_size=None, pause=0):
+    """Purge les recettes puis les utilisateurs supprimés avant `before` (par défaut : maintenant)"""
+    before = before or timezone.now()
+    deleted = Counter()
+    purge(Recipe, Q(deleted_at__lte=before), batch_size, pause=pause, deleted=deleted)
+    purge(User, Q(deleted_at__lte=before), batch_size, pause=pause, deleted=deleted)
+    return deleted
@@ -0,0 +1,212 @@
+"""
+Ordre des items de listes de courses, des ingrédients et des images de
+recettes par clés de rang fractionnaires.
+
+Le champ `rank` est une chaîne en base 36 (chiffres et minuscules, triés de la
+même façon quelle que soit la collation) comparée lexicographiquement : une
+nouvelle position est une clé strictement comprise entre celles de ses
+voisins. Déplacer un élément n'écrit donc que sa ligne, sans renuméroter la
+suite ; le signal ranks_changed permet de mettre à jour le parent (updated_at
+des ETags, révision de synchronisation, voir signals.py).
+
+Les clés s'allongent à force d'insertions au même endroit ; au-delà de
+RANK_REBALANCE_LENGTH caractères, les clés du parent sont redistribuées en
+arrière-plan après la transaction. `order` reste un critère de tri secondaire.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(ALPHABET)
+# Longueur du champ rank : au-delà, la redistribution est faite immédiatement
+MAX_LENGTH = 64
+
+# Envoyé (sender : modèle) avec parent_pk et pks, les éléments dont le rang a changé
+ranks_changed = Signal()
+
+
+def key_between(lower='', upper=None, _prefix=''):
+    """
+    Clé strictement comprise entre `lower` ('' : début) et `upper` (None : fin).
+
+    Les clés ne se terminent jamais par '0' (il n'existerait pas toujours de clé
+    plus petite). Aux extrémités, la clé avance d'un seul chiffre pour que les
+    ajouts en fin (ou en tête) de liste allongent les clés le plus tard possible.
+    """
+    if upper is not None and lower >= upper:
+        raise ValueError(f'{lower!r} >= {upper!r}')
+    if upper is not None:
+        # Préfixe commun, lower étant complété par des '0'
+        n = 0
+        while n < len(upper) and (lower[n] if n < len(lower) else '0') == upper[n]:
+            n += 1
+        _prefix, lower, upper = _prefix + upper[:n], lower[n:], upper[n:]
+
+    digit_low = ALPHABET.index(lower[0]) if lower else 0
+    digit_high = ALPHABET.index(upper[0]) if upper is not None else BASE
+    if digit_high - digit_low > 1:
+        if upper is None and lower:
+            digit = digit_low + 1
+        elif not lower and upper is not None and not _prefix.strip('0'):
+            digit = digit_high - 1
+        else:
+            digit = (digit_low + digit_high) // 2
+        return _prefix + ALPHABET[digit]
+    if upper is not None and len(upper) > 1:
+        return _prefix + upper[0]
+    return key_between(lower[1:], None, _prefix + ALPHABET[digit_low])
+
+
+def spread(count):
+    """`count` clés croissantes, régulièrement espacées et aussi courtes que possible"""
+    length = 1
+    while BASE ** length <= count:
+        length += 1
+    step = BASE ** length // (count + 1)
+    keys = []
+    for position in range(1, count + 1):
+        value, digits = position * step, []
+        for _ in range(length):
+            value, digit = divmod(value, BASE)
+            digits.append(ALPHABET[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+# ---------------------------------------------------------------------------
+# Modèles ordonnés
+# ---------------------------------------------------------------------------
+
+def parent_field(model):
+    """Clé étrangère vers le parent dont les enfants sont ordonnés ensemble"""
+    return model.RANK_PARENT
+
+
+def parent_id(instance):
+    return getattr(instance, f'{parent_field(type(instance))}_id')
+
+
+def siblings(model, parent_pk):
+    return model._default_manager.filter(**{f'{parent_field(model)}_id': parent_pk})
+
+
+def last_rank(model, parent_pk):
+    return siblings(model, parent_pk).aggregate(last=Max('rank'))['last'] or ''
+
+
+def append_ranks(instances):
+    """Place en fin de liste des instances à créer (bulk_create) : une requête par modèle"""
+    by_model = {}
+    for instance in instances:
+        if not instance.rank:
+            by_model.setdefault(type(instance), []).append(instance)
+    for model, pending in by_model.items():
+        field = f'{parent_field(model)}_id'
+        last = dict(
+            model._default_manager.filter(**{f'{field}__in': {getattr(instance, field) for instance in pending}})
+            .values_list(field).annotate(last=Max('rank'))
+        )
+        for instance in pending:
+            parent = getattr(instance, field)
+            instance.rank = last[parent] = key_between(last.get(parent) or '', None)
+
+
+# Voisin non précisé (move)
+UNSET = object()
+
+
+def move(instance, after=UNSET, before=UNSET, _retried=False):
+    """
+    Place `instance` après `after` et/ou avant `before` (frères de la même liste ;
+    None : respectivement en tête et en fin). Un voisin non précisé est le
+    frère adjacent à l'autre. Écrit uniquement la ligne déplacée ; renvoie la
+    nouvelle clé. ValueError si after suit before.
+    """
+    if after is UNSET and before is UNSET:
+        raise ValueError('after ou before est obligatoire')
+    model = type(instance)
+    others = siblings(model, parent_id(instance)).exclude(pk=instance.pk)
+    lower = after.rank if after not in (None, UNSET) else ''
+    upper = before.rank if before not in (None, UNSET) else None
+    # Voisin manquant : le frère suivant (ou précédent), y compris à clé égale,
+    # pour détecter les clés identiques
+    if before is UNSET:
+        following = others.filter(rank__gte=lower).exclude(pk=getattr(after, 'pk', None))
+        upper = following.order_by('rank').values_list('rank', flat=True).first()
+    elif after is UNSET:
+        previous = others.filter(rank__lte=upper) if upper is not None else others
+        previous = previous.exclude(pk=getattr(before, 'pk', None))
+        lower = previous.order_by('-rank').values_list('rank', flat=True).first() or ''
+
+    rank = None if upper is not None and lower >= upper else key_between(lower, upper)
+    if rank is None or len(rank) > MAX_LENGTH:
+        if _retried or (after not in (None, UNSET) and before not in (None, UNSET) and after.rank > before.rank):
+            raise ValueError('after doit précéder before')
+        # Clés identiques (ajouts concurrents) ou trop longues : redistribuer puis recommencer
+        rebalance(model, parent_id(instance))
+        after, before = (
+            others.get(pk=neighbour.pk) if neighbour not in (None, UNSET) else neighbour
+            for neighbour in (after, before)
+        )
+        return move(instance, after, before, _retried=True)
+
+    with transaction.atomic(using=router.db_for_write(model)):
+        model._default_manager.filter(pk=instance.pk).update(rank=rank)
+        ranks_changed.send(sender=model, parent_pk=parent_id(instance), pks=[instance.pk])
+        if len(rank) > getattr(settings, 'RANK_REBALANCE_LENGTH', 24):
+            schedule_rebalance(model, parent_id(instance))
+    instance.rank = rank
+    return rank
+
+
+# ---------------------------------------------------------------------------
+# Redistribution
+# ---------------------------------------------------------------------------
+
+def rebalance(model, parent_pk):
+    """Redistribue les clés des enfants d'un parent, dans leur ordre actuel"""
+    using = router.db_for_write(model)
+    with transaction.atomic(using=using):
+        children = list(
+            siblings(model, parent_pk).using(using).select_for_update()
+            .order_by(*model._meta.ordering, 'pk').only('pk', 'rank')
+        )
+        for child, rank in zip(children, spread(len(children))):
+            child.rank = rank
+        model._default_manager.db_manager(using).bulk_update(children, ['rank'], batch_size=500)
+        ranks_changed.send(sender=model, parent_pk=parent_pk, pks=[child.pk for child in children])
+
+
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def schedule_rebalance(model, parent_pk):
+    """Redistribution en arrière-plan, après la validation de la transaction courante"""
+    key = (model._meta.label, parent_pk)
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+
+    def run():
+        try:
+            rebalance(model, parent_pk)
+        except Exception:
+            logger.warning('Redistribution des rangs impossible pour %s %s', *key, exc_info=True)
+        finally:
+            with _pending_lock:
+                _pending.discard(key)
+            connections.close_all()
+
+    transaction.on_commit(
+        lambda: threading.Thread(target=run, name='rank-rebalance', daemon=True).start(),
+        using=router.db_for_write(model),
+    )
@@ -0,0 +1,142 @@
+"""
+Filtres de recettes partagés entre RecipeViewSet (DRF) et les vues asynchrones.
+"""
+from django.db.models import F, Q
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+
+from .models import Recipe
+
+RECIPE_SEARCH_FIELDS = ['title', 'description', 'tags', 'ingredients__name']
+RECIPE_ORDERING_FIELDS = ['created_at', 'views_count', 'favorites_count', 'total_time']
+
+# Nombre maximal d'identifiants de ?ids=
+MAX_IDS = 100
+
+
+def visible_recipes(user):
+    # Si l'utilisateur n'est pas authentifié, ne montrer que les recettes publiées
+    if not user.is_authenticated:
+        return Recipe.objects.filter(is_published=True)
+    # Si l'utilisateur est authentifié, montrer toutes les recettes publiées
+    # et les recettes non publiées de l'utilisateur
+    return Recipe.objects.filter(Q(is_published=True) | Q(author=user))
+
+
+# Tranches de temps total (préparation + cuisson, en minutes) : clé -> (min exclu, max inclus)
+TIME_BUCKETS = {
+    '0-15': (None, 15),
+    '15-30': (15, 30),
+    '30-60': (30, 60),
+    '60-120': (60, 120),
+    '120+': (120, None),
+}
+
+
+def time_bucket_condition(key):
+    low, high = TIME_BUCKETS[key]
+    total_time = F('prep_time') + F('cook_time')
+    condition = Q()
+    if low is not None:
+        condition &= Q(GreaterThan(total_time, low))
+    if high is not None:
+        condition &= Q(LessThanOrEqual(total_time, high))
+    return condition
+
+
+def filter_conditions(params):
+    """
+    Conditions des filtres de la liste des recettes (`params` : QueryDict de la
+    requête), par paramètre. Les facettes (facets.py) écartent celle de leur
+    propre dimension.
+    """
+    conditions = {}
+    category = params.get('category', None)
+    difficulty = params.get('difficulty', None)
+    estimated_cost = params.get('estimated_cost', None)
+    total_time = params.get('total_time', None)
+    max_time = params.get('max_time', None)
+    min_servings = params.get('min_servings', None)
+    tags = params.getlist('tags', None)
+    ingredient = params.get('ingredient', None)
+
+    if category:
+        conditions['category'] = Q(category_id=category)
+    if difficulty:
+        conditions['difficulty'] = Q(difficulty=difficulty)
+    if estimated_cost:
+        conditions['estimated_cost'] = Q(estimated_cost=estimated_cost)
+    if total_time:
+        if total_time not in TIME_BUCKETS:
+            raise ValidationError({'total_time': f'Valeurs possibles : {", ".join(TIME_BUCKETS)}.'})
+        conditions['total_time'] = time_bucket_condition(total_time)
+    if max_time:
+        conditions['max_time'] = Q(prep_time__lte=max_time, cook_time__lte=max_time)
+    if min_servings:
+        conditions['min_servings'] = Q(servings__gte=min_servings)
+    if tags:
+        conditions['tags'] = Q()
+        for tag in tags:
+            conditions['tags'] &= Q(tags__icontains=tag)
+    if ingredient:
+        conditions['ingredient'] = Q(ingredients__name__icontains=ingredient)
+    return conditions
+
+
+def filter_recipes(queryset, params):
+    """Filtres de la liste des recettes (`params` : QueryDict de la requête)"""
+    return queryset.filter(*filter_conditions(params).values())
+
+
+def parse_ids(value):
+    """Identifiants de ?ids=1,2,3, dans l'ordre demandé et sans doublons"""
+    ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            pk = int(part)
+        except ValueError:
+            raise ValidationError({'ids': f'"{part}" n\'est pas un identifiant valide.'})
+        if pk not in ids:
+            ids.append(pk)
+    if len(ids) > MAX_IDS:
+        raise ValidationError({'ids': f'{MAX_IDS} identifiants au maximum.'})
+    return ids
+
+
+def search_recipes(queryset, search):
+    """Même sémantique que SearchFilter : chaque terme doit correspondre à l'un des champs"""
+    for term in search.replace(',', ' ').split():
+        condition = Q()
+        for field in RECIPE_SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def order_recipes(queryset, ordering, default='-created_at'):
+    fields = []
+    for field in (ordering or '').split(','):
+        field = field.strip()
+        if field.lstrip('-') in RECIPE_ORDERING_FIELDS:
+            fields.append(field)
+    if any(field.lstrip('-') == 'total_time' for field in fields):
+        queryset = queryset.annotate(total_time_value=F('prep_time') + F('cook_time'))
+        fields = [field.replace('total_time', 'total_time_value') for field in fields]
+    return queryset.order_by(*(fields or [default]))
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """OrderingFilter acceptant total_time (propriété calculée, annotée pour le tri)"""
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering:
+            return order_recipes(queryset, ','.join(ordering))
+        return queryset
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        return [field for field in fields if field.lstrip('-') in RECIPE_ORDERING_FIELDS]
@@ -0,0 +1,212 @@
+"""
+Données de référence (catégories de recettes et d'ingrédients, régimes,
+allergies) servies depuis un instantané en mémoire propre à chaque processus.
+
+Chaque table est chargée une fois, sérialisée, puis figée dans un Snapshot ;
+les corps JSON des pages et des détails sont mis en cache sous forme d'octets.
+Un instantané est reconstruit lorsque son compteur ResourceVersion (incrémenté
+par les signals à chaque save/delete, donc partagé entre workers) change. Les
+compteurs sont relus au plus toutes les REFERENCE_DATA_TTL secondes ; une
+modification faite dans le processus courant est visible immédiatement.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+
+from .conditional import (
+    ALLERGIES, DIETARY_RESTRICTIONS, INGREDIENT_CATEGORIES, RECIPE_CATEGORIES,
+    VersionedConditionalGetMixin, get_versions, make_etag
+)
+from .models import Allergy, DietaryRestriction, IngredientCategory, RecipeCategory
+from .pagination import page_number, paginated
+from .renderers import FastJSONRenderer
+
+# nom -> (modèle, serializer, champs contenant une URL de média)
+RESOURCES = {
+    RECIPE_CATEGORIES: (RecipeCategory, 'RecipeCategorySerializer', ('image',)),
+    INGREDIENT_CATEGORIES: (IngredientCategory, 'IngredientCategorySerializer', ()),
+    DIETARY_RESTRICTIONS: (DietaryRestriction, 'DietaryRestrictionSerializer', ()),
+    ALLERGIES: (Allergy, 'AllergySerializer', ()),
+}
+
+# Nombre maximal de corps pré-sérialisés conservés par instantané
+MAX_CACHED_BODIES = 256
+
+_lock = threading.Lock()
+_snapshots = {}
+_versions = {}
+_checked_at = None
+
+
+class Snapshot:
+    """Contenu figé d'une table de référence à une version donnée"""
+
+    def __init__(self, name, version, updated_at, items, url_fields=()):
+        self.name = name
+        self.version = version
+        self.updated_at = updated_at
+        self.items = tuple(items)
+        self.url_fields = url_fields
+        self.index = {item['id']: position for position, item in enumerate(self.items)}
+        self._bodies = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, pk):
+        return pk in self.index
+
+    def _absolute(self, item, request):
+        if request is None or not self.url_fields:
+            return item
+        item = dict(item)
+        for field in self.url_fields:
+            if item.get(field):
+                item[field] = request.build_absolute_uri(item[field])
+        return item
+
+    def get(self, pk, request=None):
+        """Représentation sérialisée de l'objet `pk`, None s'il est absent"""
+        position = self.index.get(pk)
+        if position is None:
+            return None
+        return self._absolute(self.items[position], request)
+
+    def all(self, request=None):
+        return [self._absolute(item, request) for item in self.items]
+
+    def _cached_body(self, key, build):
+        body = self._bodies.get(key)
+        if body is None:
+            body = build()
+            if len(self._bodies) < MAX_CACHED_BODIES:
+                self._bodies[key] = body
+        return body
+
+    def _base_url(self, request):
+        return request.build_absolute_uri('/') if self.url_fields else ''
+
+    def page_body(self, request, number, page_size):
+        """Corps JSON d'une page au format PageNumberPagination, None si elle n'existe pas"""
+        count = len(self.items)
+        if number is None or number < 1 or (number > 1 and (number - 1) * page_size >= count):
+            return None
+        start = (number - 1) * page_size
+
+        def build():
+            items = self.items[start:start + page_size]
+            return FastJSONRenderer().render([self._absolute(item, request) for item in items])
+
+        results = self._cached_body(('page', self._base_url(request), number, page_size), build)
+        # L'enveloppe (liens next/previous absolus) dépend de l'URL de la requête ;
+        # rendue sans results, auxquels les octets en cache sont ajoutés explicitement
+        envelope = paginated(request, number, count, None, page_size)
+        del envelope['results']
+        return FastJSONRenderer().render(envelope)[:-1] + b',"results":' + results + b'}'
+
+    def detail_body(self, request, pk):
+        if pk not in self.index:
+            return None
+        return self._cached_body(
+            ('detail', self._base_url(request), pk),
+            lambda: FastJSONRenderer().render(self.get(pk, request)),
+        )
+
+
+def build_snapshot(name, version, updated_at):
+    from . import serializers
+
+    model, serializer_name, url_fields = RESOURCES[name]
+    queryset = model.objects.all()
+    if not queryset.ordered:
+        queryset = queryset.order_by('pk')
+    serializer_class = getattr(serializers, serializer_name)
+    # Sans requête dans le contexte : URLs de médias relatives, rendues absolues à la lecture
+    items = serializer_class(list(queryset), many=True, context={}).data
+    return Snapshot(name, version, updated_at, [dict(item) for item in items], url_fields)
+
+
+def reference_versions():
+    """{nom: (version, updated_at)} des données de référence, relus au plus toutes les REFERENCE_DATA_TTL s"""
+    global _versions, _checked_at
+    now = time.monotonic()
+    if _checked_at is None or now - _checked_at >= getattr(settings, 'REFERENCE_DATA_TTL', 5):
+        _versions = get_versions(*RESOURCES)
+        _checked_at = now
+    return _versions
+
+
+def get_snapshot(name):
+    version, updated_at = reference_versions()[name]
+    snapshot = _snapshots.get(name)
+    if snapshot is None or snapshot.version != version:
+        with _lock:
+            snapshot = _snapshots.get(name)
+            if snapshot is None or snapshot.version != version:
+                snapshot = _snapshots[name] = build_snapshot(name, version, updated_at)
+    return snapshot
+
+
+def get_snapshots(*names):
+    return {name: get_snapshot(name) for name in names or RESOURCES}
+
+
+def invalidate():
+    """Force la relecture des versions à la prochaine lecture (modification locale)"""
+    global _checked_at
+    _checked_at = None
+
+
+def reset():
+    """Oublie instantanés et versions (tests : les données sont annulées entre deux tests)"""
+    global _versions, _checked_at
+    _snapshots.clear()
+    _versions = {}
+    _checked_at = None
+
+
+class ReferenceDataMixin(VersionedConditionalGetMixin):
+    """
+    list et retrieve servis depuis l'instantané en octets pré-sérialisés ; le
+    chemin DRF classique reste utilisé pour l'API navigable et les cas limites
+    (page invalide, objet absent de l'instantané).
+    """
+    cache_max_age = getattr(settings, 'REFERENCE_DATA_MAX_AGE', 3600)
+
+    def get_snapshot(self):
+        return get_snapshot(self.version_key)
+
+    def get_validators(self):
+        snapshot = self.get_snapshot()
+        etag = make_etag(self.version_key, snapshot.version, self.request.get_full_path())
+        return etag, snapshot.updated_at
+
+    def serves_json(self):
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return renderer is not None and renderer.format == 'json'
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.list_from_snapshot, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(self.retrieve_from_snapshot, request, *args, **kwargs)
+
+    def list_from_snapshot(self, request, *args, **kwargs):
+        body = None
+        if self.serves_json() and self.paginator is not None:
+            body = self.get_snapshot().page_body(request, page_number(request), self.paginator.page_size)
+        if body is None:
+            return ListModelMixin.list(self, request, *args, **kwargs)
+        return HttpResponse(body, content_type='application/json')
+
+    def retrieve_from_snapshot(self, request, *args, **kwargs):
+        body = None
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+        if self.serves_json() and str(lookup).isdigit():
+            body = self.get_snapshot().detail_body(request, int(lookup))
+        if body is None:
+            return RetrieveModelMixin.retrieve(self, request, *args, **kwargs)
+        return HttpResponse(body, content_type='application/json')
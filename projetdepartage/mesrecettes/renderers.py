@@ -0,0 +1,66 @@
+"""
+Renderer et parser JSON rapides pour l'API.
+
+Si orjson est installé, il est utilisé pour l'encodage et le décodage ;
+sinon on retombe sur les classes JSON standard de DRF (module json de la
+bibliothèque standard). Les dates et datetimes sont encodés nativement par
+orjson, les Decimal et les autres types passent par l'encodeur de DRF pour
+garder une sortie identique à celle de JSONRenderer.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from .profiling import finish_view, phase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer utilisant orjson lorsqu'il est disponible"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Sans renderer_context : rendu direct dans une vue (async_views, reference_data)
+        if renderer_context:
+            finish_view()
+        with phase('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type=None, renderer_context=None):
+        # orjson produit toujours de l'UTF-8 : avec UNICODE_JSON=False on garde le rendu standard
+        if orjson is None or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        options = ORJSON_OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            options |= orjson.OPT_INDENT_2
+
+        # Decimal, timedelta, UUID, chaînes paresseuses, QuerySet... comme JSONRenderer
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=options)
+        # Comme JSONRenderer : U+2028 et U+2029 toujours échappés (sous-ensemble JavaScript strict)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser utilisant orjson lorsqu'il est disponible"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -1,5 +1,9 @@
+import logging
+from decimal import Decimal
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import models, transaction
 from django.contrib.auth.password_validation import validate_password
 from .models import (
     User, UserProfile, Recipe, RecipeImage, Ingredient,
@@ -7,10 +11,58 @@ from .models import (
     Allergy, FavoriteRecipe, RecipeView, ShoppingList,
     ShoppingListItem, Menu, MenuRecipe
 )
+from . import ranking
+from .conditional import INGREDIENT_CATEGORIES, RECIPE_CATEGORIES
+from .media import private_owner, signed_url
+from .reference_data import get_snapshot
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
 
+class ReferenceField(serializers.Field):
+    """
+    Objet de référence (catégorie...) lu depuis l'instantané en mémoire de
+    reference_data à partir de sa clé étrangère, sans jointure. Les vues
+    asynchrones fournissent les instantanés via context['reference_snapshots'].
+    """
+
+    def __init__(self, resource, attribute=None, **kwargs):
+        kwargs['read_only'] = True
+        self.resource = resource
+        self.attribute = attribute
+        super().__init__(**kwargs)
+
+    def to_representation(self, pk):
+        snapshot = self.context.get('reference_snapshots', {}).get(self.resource)
+        if snapshot is None:
+            snapshot = get_snapshot(self.resource)
+        data = snapshot.get(pk, self.context.get('request'))
+        if data is not None and self.attribute:
+            return data[self.attribute]
+        return data
+
+
+class MediaImageField(serializers.ImageField):
+    """ImageField dont l'URL est signée lorsque l'image n'est pas publique (voir media.py)"""
+
+    def to_representation(self, value):
+        url = super().to_representation(value)
+        owner = private_owner(value.instance) if url else None
+        if owner is not None:
+            url = signed_url(url, value.name, owner)
+        return url
+
+
+class SignedMediaMixin:
+    """ModelSerializer dont les champs d'images sont des MediaImageField"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: MediaImageField,
+    }
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -85,7 +137,7 @@ class IngredientCategorySerializer(serializers.ModelSerializer):
 
 
 class IngredientSerializer(serializers.ModelSerializer):
-    category = IngredientCategorySerializer(read_only=True)
+    category = ReferenceField(INGREDIENT_CATEGORIES, source='category_id')
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=IngredientCategory.objects.all(), write_only=True, required=False, allow_null=True
     )
@@ -94,6 +146,8 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ['id', 'name', 'quantity', 'unit', 'category', 'category_id',
                   'estimated_price', 'order']
+        # Position donnée par l'ordre de la liste envoyée, puis par les déplacements (ranking.py)
+        read_only_fields = ['order']
 
     def create(self, validated_data):
         category_id = validated_data.pop('category_id', None)
@@ -108,10 +162,11 @@ class IngredientSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(SignedMediaMixin, serializers.ModelSerializer):
     class Meta:
         model = RecipeImage
         fields = ['id', 'image', 'order']
+        read_only_fields = ['order']
 
 
 class RecipeCategorySerializer(serializers.ModelSerializer):
@@ -120,9 +175,9 @@ class RecipeCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'icon', 'image']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SignedMediaMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
-    category = RecipeCategorySerializer(read_only=True)
+    category = ReferenceField(RECIPE_CATEGORIES, source='category_id')
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=RecipeCategory.objects.all(), write_only=True, required=False, allow_null=True
     )
@@ -140,6 +195,10 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'is_published', 'created_at', 'updated_at', 'published_at']
 
     def get_is_favorited(self, obj):
+        # Ensemble précalculé par la vue (une requête pour toute la page)
+        favorited_ids = self.context.get('favorited_ids')
+        if favorited_ids is not None:
+            return obj.pk in favorited_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return FavoriteRecipe.objects.filter(user=request.user, recipe=obj).exists()
@@ -148,8 +207,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         # S'assurer que les ingrédients sont chargés
         # Précharger les ingrédients pour éviter les requêtes N+1
-        if not hasattr(instance, '_prefetched_objects_cache') or 'ingredients' not in getattr(instance._prefetched_objects_cache, 'ingredients', {}):
-            instance = Recipe.objects.prefetch_related('ingredients', 'ingredients__category').get(pk=instance.pk)
+        if 'ingredients' not in getattr(instance, '_prefetched_objects_cache', {}):
+            instance = Recipe.objects.prefetch_related('ingredients').get(pk=instance.pk)
         representation = super().to_representation(instance)
         # Vérifier que les ingrédients sont bien présents
         if 'ingredients' not in representation or representation['ingredients'] is None:
@@ -157,7 +216,68 @@ class RecipeSerializer(serializers.ModelSerializer):
         return representation
 
 
-class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
+def build_ingredient(recipe, ingredient_data):
+    """Ingrédient à créer depuis des données nettoyées et validées ; None s'il est incomplet"""
+    # Nettoyer et valider le nom
+    ingredient_name = ingredient_data.get('name', '').strip()
+    ingredient_quantity = ingredient_data.get('quantity')
+
+    # S'assurer que les champs requis sont présents
+    if not ingredient_name or ingredient_quantity is None or str(ingredient_quantity).strip() == '':
+        return None
+
+    # Convertir quantity en Decimal si c'est une string
+    quantity = ingredient_quantity
+    try:
+        if isinstance(quantity, str):
+            quantity = quantity.strip()
+            if not quantity:
+                return None
+        quantity = Decimal(str(quantity))
+    except (ValueError, TypeError, Exception):
+        return None
+
+    ingredient = Ingredient(
+        recipe=recipe,
+        name=ingredient_name,
+        quantity=quantity,
+        unit=ingredient_data.get('unit', '').strip(),
+    )
+
+    # Gérer category_id si présent
+    category_id = ingredient_data.get('category_id')
+    if isinstance(category_id, IngredientCategory):
+        ingredient.category = category_id
+    elif category_id:
+        ingredient.category_id = category_id
+
+    # Gérer estimated_price si présent
+    estimated_price = ingredient_data.get('estimated_price', 0)
+    try:
+        ingredient.estimated_price = Decimal(str(estimated_price)) if estimated_price else 0
+    except (ValueError, TypeError, Exception):
+        ingredient.estimated_price = 0
+    return ingredient
+
+
+def save_in_order(instances):
+    """
+    Enregistre des ingrédients ou images dans l'ordre de la liste envoyée :
+    rangs calculés en une requête (ranking.append_ranks), puis une sauvegarde
+    par instance pour les signaux (suggestions, documents).
+    """
+    for position, instance in enumerate(instances):
+        instance.order = position
+    ranking.append_ranks(instances)
+    for instance in instances:
+        try:
+            instance.save()
+        except Exception as e:
+            # Logger l'erreur mais continuer avec les autres éléments
+            logger.error(f"Erreur lors de l'enregistrement de {instance!r}: {e}")
+
+
+class RecipeCreateUpdateSerializer(SignedMediaMixin, serializers.ModelSerializer):
     ingredients = IngredientSerializer(many=True, required=False)
     images = serializers.ListField(
         child=serializers.ImageField(),
@@ -176,9 +296,13 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         import json
         from django.http import QueryDict
         
-        # Convertir QueryDict en dict mutable si nécessaire
+        # Convertir QueryDict en dict mutable si nécessaire ; copie superficielle :
+        # les fichiers reçus sur disque (voir uploads.py) ne peuvent pas être copiés
         if isinstance(data, QueryDict):
-            data = data.copy()
+            mutable = QueryDict(mutable=True)
+            for key, values in data.lists():
+                mutable.setlist(key, values)
+            data = mutable
         
         # Parser les ingrédients
         ingredients_value = data.get('ingredients')
@@ -267,71 +391,18 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             from django.utils import timezone
             validated_data['published_at'] = timezone.now()
 
-        recipe = Recipe.objects.create(**validated_data)
-
-        # Créer les ingrédients avec validation
-        if ingredients_data:
-            for idx, ingredient_data in enumerate(ingredients_data):
-                # Nettoyer et valider le nom
-                ingredient_name = ingredient_data.get('name', '').strip()
-                ingredient_quantity = ingredient_data.get('quantity')
-                
-                # S'assurer que les champs requis sont présents
-                if not ingredient_name or ingredient_quantity is None or str(ingredient_quantity).strip() == '':
-                    continue
-                
-                # Convertir quantity en Decimal si c'est une string
-                quantity = ingredient_quantity
-                try:
-                    from decimal import Decimal
-                    if isinstance(quantity, str):
-                        quantity = quantity.strip()
-                        if not quantity:
-                            continue
-                    quantity = Decimal(str(quantity))
-                except (ValueError, TypeError, Exception):
-                    continue
-                
-                # Préparer les données de l'ingrédient
-                ingredient_kwargs = {
-                    'recipe': recipe,
-                    'name': ingredient_name,
-                    'quantity': quantity,
-                    'unit': ingredient_data.get('unit', '').strip(),
-                    'order': ingredient_data.get('order', idx),
-                }
-                
-                # Gérer category_id si présent
-                category_id_ing = ingredient_data.get('category_id')
-                if category_id_ing:
-                    ingredient_kwargs['category_id'] = category_id_ing
-                
-                # Gérer estimated_price si présent
-                estimated_price = ingredient_data.get('estimated_price', 0)
-                if estimated_price:
-                    if isinstance(estimated_price, str):
-                        try:
-                            from decimal import Decimal
-                            ingredient_kwargs['estimated_price'] = Decimal(str(estimated_price))
-                        except (ValueError, TypeError):
-                            ingredient_kwargs['estimated_price'] = 0
-                    else:
-                        from decimal import Decimal
-                        ingredient_kwargs['estimated_price'] = Decimal(str(estimated_price))
-                else:
-                    ingredient_kwargs['estimated_price'] = 0
-                
-                try:
-                    Ingredient.objects.create(**ingredient_kwargs)
-                except Exception as e:
-                    # Logger l'erreur mais continuer avec les autres ingrédients
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Erreur lors de la création de l'ingrédient: {e}, données: {ingredient_data}")
-                    continue
+        # Une transaction : updated_at avancé et document régénéré une seule fois (documents.py)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+
+            # Créer les ingrédients avec validation
+            if ingredients_data:
+                save_in_order([
+                    ingredient for ingredient in (build_ingredient(recipe, data) for data in ingredients_data)
+                    if ingredient is not None
+                ])
 
-        for idx, image in enumerate(images_data[:5]):  # Max 5 images
-            RecipeImage.objects.create(recipe=recipe, image=image, order=idx)
+            save_in_order([RecipeImage(recipe=recipe, image=image) for image in images_data[:5]])  # Max 5 images
 
         return recipe
 
@@ -349,79 +420,26 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             if instance.author != request.user:
                 raise serializers.ValidationError("Vous n'êtes pas autorisé à modifier cette recette.")
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        # Mettre à jour les ingrédients avec la même validation que dans create
-        if ingredients_data is not None:
-            # Si ingredients_data est une liste vide, supprimer tous les ingrédients
-            # Si c'est une liste avec des éléments, remplacer les ingrédients
-            instance.ingredients.all().delete()
-            if isinstance(ingredients_data, list) and len(ingredients_data) > 0:
-                for idx, ingredient_data in enumerate(ingredients_data):
-                    # Nettoyer et valider le nom
-                    ingredient_name = ingredient_data.get('name', '').strip()
-                    ingredient_quantity = ingredient_data.get('quantity')
-                    
-                    # S'assurer que les champs requis sont présents
-                    if not ingredient_name or ingredient_quantity is None or str(ingredient_quantity).strip() == '':
-                        continue
-                    
-                    # Convertir quantity en Decimal si c'est une string
-                    quantity = ingredient_quantity
-                    try:
-                        from decimal import Decimal
-                        if isinstance(quantity, str):
-                            quantity = quantity.strip()
-                            if not quantity:
-                                continue
-                        quantity = Decimal(str(quantity))
-                    except (ValueError, TypeError, Exception):
-                        continue
-                    
-                    # Préparer les données de l'ingrédient
-                    ingredient_kwargs = {
-                        'recipe': instance,
-                        'name': ingredient_name,
-                        'quantity': quantity,
-                        'unit': ingredient_data.get('unit', '').strip(),
-                        'order': ingredient_data.get('order', idx),
-                    }
-                    
-                    # Gérer category_id si présent
-                    category_id_ing = ingredient_data.get('category_id')
-                    if category_id_ing:
-                        ingredient_kwargs['category_id'] = category_id_ing
-                    
-                    # Gérer estimated_price si présent
-                    estimated_price = ingredient_data.get('estimated_price', 0)
-                    if estimated_price:
-                        if isinstance(estimated_price, str):
-                            try:
-                                from decimal import Decimal
-                                ingredient_kwargs['estimated_price'] = Decimal(str(estimated_price))
-                            except (ValueError, TypeError):
-                                ingredient_kwargs['estimated_price'] = 0
-                        else:
-                            from decimal import Decimal
-                            ingredient_kwargs['estimated_price'] = Decimal(str(estimated_price))
-                    else:
-                        ingredient_kwargs['estimated_price'] = 0
-                    
-                    try:
-                        Ingredient.objects.create(**ingredient_kwargs)
-                    except Exception as e:
-                        # Logger l'erreur mais continuer avec les autres ingrédients
-                        import logging
-                        logger = logging.getLogger(__name__)
-                        logger.error(f"Erreur lors de la mise à jour de l'ingrédient: {e}, données: {ingredient_data}")
-                        continue
-
-        if images_data is not None:
-            instance.images.all().delete()
-            for idx, image in enumerate(images_data[:5]):
-                RecipeImage.objects.create(recipe=instance, image=image, order=idx)
+        # Une transaction : updated_at avancé et document régénéré une seule fois (documents.py)
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            # Mettre à jour les ingrédients avec la même validation que dans create
+            if ingredients_data is not None:
+                # Si ingredients_data est une liste vide, supprimer tous les ingrédients
+                # Si c'est une liste avec des éléments, remplacer les ingrédients
+                instance.ingredients.all().delete()
+                if isinstance(ingredients_data, list) and len(ingredients_data) > 0:
+                    save_in_order([
+                        ingredient for ingredient in (build_ingredient(instance, data) for data in ingredients_data)
+                        if ingredient is not None
+                    ])
+
+            if images_data is not None:
+                instance.images.all().delete()
+                save_in_order([RecipeImage(recipe=instance, image=image) for image in images_data[:5]])
 
         return instance
 
@@ -435,7 +453,7 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
 
 
 class ShoppingListItemSerializer(serializers.ModelSerializer):
-    category = IngredientCategorySerializer(read_only=True)
+    category = ReferenceField(INGREDIENT_CATEGORIES, source='category_id')
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=IngredientCategory.objects.all(), write_only=True, required=False, allow_null=True
     )
@@ -444,6 +462,8 @@ class ShoppingListItemSerializer(serializers.ModelSerializer):
         model = ShoppingListItem
         fields = ['id', 'ingredient_name', 'quantity', 'unit', 'category', 'category_id',
                   'is_checked', 'order']
+        # Position modifiée par les déplacements (ranking.py)
+        read_only_fields = ['order']
 
     def create(self, validated_data):
         category_id = validated_data.pop('category_id', None)
@@ -452,6 +472,82 @@ class ShoppingListItemSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+def validate_ingredient_category_id(value):
+    """Catégorie vérifiée dans l'instantané des données de référence, sans requête"""
+    if value is not None and value not in get_snapshot(INGREDIENT_CATEGORIES):
+        raise serializers.ValidationError(f'Pk "{value}" non valide - l\'objet n\'existe pas.')
+    return value
+
+
+class BulkShoppingListItemSerializer(ShoppingListItemSerializer):
+    """Champs d'un item dans un lot (voir bulk.py), validés sans requête par opération"""
+    category_id = serializers.IntegerField(write_only=True, required=False, allow_null=True,
+                                           validators=[validate_ingredient_category_id])
+
+
+class ShoppingListItemOperationSerializer(serializers.Serializer):
+    """Opération d'un lot : create (shopping_list, data), update (id, data) ou delete (id)"""
+    op = serializers.ChoiceField(choices=['create', 'update', 'delete'])
+    id = serializers.IntegerField(required=False)
+    shopping_list = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'create' and 'shopping_list' not in attrs:
+            raise serializers.ValidationError({'shopping_list': 'Ce champ est obligatoire.'})
+        if attrs['op'] != 'create' and 'id' not in attrs:
+            raise serializers.ValidationError({'id': 'Ce champ est obligatoire.'})
+        return attrs
+
+
+class ShoppingListItemBulkSerializer(serializers.Serializer):
+    operations = ShoppingListItemOperationSerializer(many=True, allow_empty=False, max_length=200)
+
+
+class ShoppingListItemSyncSerializer(serializers.ModelSerializer):
+    """Item synchronisé (voir sync.py) : catégorie par identifiant, rang et révision"""
+    category_id = serializers.IntegerField(required=False, allow_null=True,
+                                           validators=[validate_ingredient_category_id])
+    # Clé de rang calculée par le client (voir ranking.py) pour les réordonnancements hors ligne
+    rank = serializers.RegexField(r'^[0-9a-z]*[1-9a-z]$', max_length=64, required=False)
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ['id', 'client_id', 'ingredient_name', 'quantity', 'unit', 'category_id',
+                  'is_checked', 'order', 'rank', 'revision', 'updated_at']
+        read_only_fields = ['id', 'client_id', 'order', 'revision', 'updated_at']
+
+
+class ShoppingListSyncChangeSerializer(serializers.Serializer):
+    """Modification faite hors ligne : item désigné par id, ou par client_id s'il a été créé hors ligne"""
+    op = serializers.ChoiceField(choices=['upsert', 'delete'])
+    id = serializers.IntegerField(required=False)
+    client_id = serializers.CharField(max_length=64, required=False)
+    modified_at = serializers.DateTimeField()
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if 'id' not in attrs and 'client_id' not in attrs:
+            raise serializers.ValidationError('Indiquer id ou client_id.')
+        return attrs
+
+
+class ShoppingListSyncSerializer(serializers.Serializer):
+    since = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    changes = ShoppingListSyncChangeSerializer(many=True, required=False, default=list, max_length=500)
+
+
+class MoveSerializer(serializers.Serializer):
+    """Nouvelle position (voir ranking.py) : après `after` et/ou avant `before`, null pour la tête ou la fin"""
+    after = serializers.IntegerField(required=False, allow_null=True)
+    before = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('Indiquer after ou before.')
+        return attrs
+
+
 class ShoppingListSerializer(serializers.ModelSerializer):
     items = ShoppingListItemSerializer(many=True, read_only=True)
     
@@ -475,8 +571,19 @@ class ShoppingListCreateUpdateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class RecipeCardSerializer(SignedMediaMixin, serializers.ModelSerializer):
+    """Représentation compacte d'une recette (menus, listes), sans ingrédients ni images"""
+    category_name = ReferenceField(RECIPE_CATEGORIES, attribute='name', source='category_id')
+    total_time = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Recipe
+        fields = ['id', 'title', 'main_image', 'category_id', 'category_name', 'prep_time',
+                  'cook_time', 'total_time', 'servings', 'difficulty', 'estimated_cost']
+
+
 class MenuRecipeSerializer(serializers.ModelSerializer):
-    recipe = RecipeSerializer(read_only=True)
+    recipe = RecipeCardSerializer(read_only=True)
     recipe_id = serializers.PrimaryKeyRelatedField(
         queryset=Recipe.objects.all(), write_only=True
     )
@@ -491,11 +598,75 @@ class MenuRecipeSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+def validate_menu_dates(start_date, end_date):
+    """Période d'un menu : end_date après start_date, au plus MENU_MAX_DAYS jours"""
+    if end_date < start_date:
+        raise serializers.ValidationError({'end_date': "La date de fin précède la date de début."})
+    max_days = getattr(settings, 'MENU_MAX_DAYS', 31)
+    if (end_date - start_date).days + 1 > max_days:
+        raise serializers.ValidationError({'end_date': f"Un menu couvre au plus {max_days} jours."})
+
+
 class MenuSerializer(serializers.ModelSerializer):
     recipes = MenuRecipeSerializer(many=True, read_only=True)
+    aggregates = serializers.SerializerMethodField()
 
     class Meta:
         model = Menu
-        fields = ['id', 'name', 'start_date', 'end_date', 'recipes', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'start_date', 'end_date', 'recipes', 'aggregates',
+                  'created_at', 'updated_at']
 
+    def validate(self, attrs):
+        # Mise à jour partielle : dates manquantes lues sur le menu
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date:
+            validate_menu_dates(start_date, end_date)
+        return attrs
 
+    def get_aggregates(self, obj):
+        """
+        Agrégats calculés à partir des entrées préchargées (voir MenuViewSet.get_queryset) :
+        ingredients_cost et ingredients_count sont annotés sur chaque MenuRecipe.
+        """
+        days = {}
+        total_cost = Decimal('0')
+        ingredients_count = 0
+        for entry in obj.recipes.all():
+            recipe = entry.recipe
+            day = days.setdefault(entry.date, {
+                'date': entry.date.isoformat(), 'recipes_count': 0,
+                'prep_time': 0, 'cook_time': 0, 'total_time': 0,
+            })
+            day['recipes_count'] += 1
+            day['prep_time'] += recipe.prep_time
+            day['cook_time'] += recipe.cook_time
+            day['total_time'] += recipe.total_time
+            total_cost += getattr(entry, 'ingredients_cost', None) or Decimal('0')
+            ingredients_count += getattr(entry, 'ingredients_count', 0)
+        return {
+            'days': [days[date] for date in sorted(days)],
+            'total_cost': str(total_cost.quantize(Decimal('0.01'))),
+            'ingredients_count': ingredients_count,
+        }
+
+
+class MenuAutofillSerializer(serializers.Serializer):
+    """Paramètres du remplissage automatique d'un menu"""
+    meal_types = serializers.ListField(
+        child=serializers.ChoiceField(choices=MenuRecipe._meta.get_field('meal_type').choices),
+        required=False, allow_empty=False
+    )
+    max_daily_time = serializers.IntegerField(required=False, min_value=1, allow_null=True)
+    budget = serializers.DecimalField(max_digits=10, decimal_places=2, required=False,
+                                      min_value=Decimal('0'), allow_null=True)
+    no_repeat_days = serializers.IntegerField(required=False, min_value=0, default=7)
+    replace = serializers.BooleanField(required=False, default=False)
+    seed = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        # Menu créé avant la limite de MENU_MAX_DAYS : pas de planification sur toute sa période
+        menu = self.context.get('menu')
+        if menu is not None:
+            validate_menu_dates(menu.start_date, menu.end_date)
+        return attrs
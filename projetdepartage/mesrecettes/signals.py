@@ -1,8 +1,18 @@
 from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete, pre_save
 from django_rest_passwordreset.signals import reset_password_token_created
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import (
+    Recipe, FavoriteRecipe, RecipeView, RecipeCategory, IngredientCategory,
+    DietaryRestriction, Allergy, ShoppingListItem, ShoppingListTombstone, Ingredient,
+    RecipeImage
+)
+from . import conditional, documents, ranking, reference_data, stats, suggest, sync, uploads
+from .authentication import user_cache
 
 
 @receiver(reset_password_token_created)
@@ -136,3 +146,218 @@ L'équipe de la Plateforme de Recettes
     msg.attach_alternative(email_html_message, "text/html")
     # Envoyer
     msg.send()
+
+
+# ---------------------------------------------------------------------------
+# Statistiques utilisateur : mise à jour par deltas
+# ---------------------------------------------------------------------------
+
+def _recipe_author_id(instance):
+    try:
+        return instance.recipe.author_id
+    except Recipe.DoesNotExist:
+        return None
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved_update_statistics(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        stats.apply_delta(instance.author_id, recipes_count=1)
+        stats.refresh_recipe_lists(instance.author_id)
+    elif update_fields is not None and set(update_fields) <= {'views_count', 'favorites_count'}:
+        if 'views_count' in update_fields:
+            stats.record_views_count_change(instance)
+    else:
+        # Le titre a pu changer
+        stats.refresh_recipe_lists(instance.author_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted_update_statistics(sender, instance, **kwargs):
+    stats.apply_delta(instance.author_id, recipes_count=-1)
+    stats.refresh_recipe_lists(instance.author_id)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def favorite_saved_update_statistics(sender, instance, created, **kwargs):
+    if created:
+        stats.apply_delta(instance.user_id, favorites_given=1)
+        stats.apply_delta(_recipe_author_id(instance), favorites_received=1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def favorite_deleted_update_statistics(sender, instance, **kwargs):
+    stats.apply_delta(instance.user_id, favorites_given=-1)
+    stats.apply_delta(_recipe_author_id(instance), favorites_received=-1)
+
+
+@receiver(post_save, sender=RecipeView)
+def recipe_view_saved_update_statistics(sender, instance, created, **kwargs):
+    if not created:
+        return
+    stats.apply_delta(instance.user_id, views_made=1)
+    author_id = _recipe_author_id(instance)
+    if author_id is not None:
+        stats.apply_delta(author_id, views_received=1)
+        stats.add_daily_view(author_id, timezone.localdate(instance.viewed_at))
+
+
+@receiver(post_delete, sender=RecipeView)
+def recipe_view_deleted_update_statistics(sender, instance, **kwargs):
+    stats.apply_delta(instance.user_id, views_made=-1)
+    author_id = _recipe_author_id(instance)
+    if author_id is not None:
+        stats.apply_delta(author_id, views_received=-1)
+        stats.add_daily_view(author_id, timezone.localdate(instance.viewed_at), delta=-1)
+
+
+# ---------------------------------------------------------------------------
+# Cache des utilisateurs authentifiés par JWT
+# ---------------------------------------------------------------------------
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    # Une requête concurrente a pu remettre l'ancienne ligne en cache avant le commit
+    transaction.on_commit(lambda: user_cache.invalidate(instance.pk))
+
+
+# ---------------------------------------------------------------------------
+# Validateurs HTTP : compteurs de version et dates de modification
+# ---------------------------------------------------------------------------
+
+REFERENCE_DATA_VERSIONS = {
+    RecipeCategory: conditional.RECIPE_CATEGORIES,
+    IngredientCategory: conditional.INGREDIENT_CATEGORIES,
+    DietaryRestriction: conditional.DIETARY_RESTRICTIONS,
+    Allergy: conditional.ALLERGIES,
+}
+
+
+def reference_data_changed(sender, **kwargs):
+    conditional.bump_version(REFERENCE_DATA_VERSIONS[sender])
+    # Les autres processus verront la nouvelle version après REFERENCE_DATA_TTL
+    transaction.on_commit(reference_data.invalidate)
+
+
+for _model in REFERENCE_DATA_VERSIONS:
+    post_save.connect(reference_data_changed, sender=_model, dispatch_uid=f'version-{_model.__name__}-save')
+    post_delete.connect(reference_data_changed, sender=_model, dispatch_uid=f'version-{_model.__name__}-delete')
+
+
+@receiver(pre_save, sender=ShoppingListItem)
+def shopping_list_item_changed(sender, instance, **kwargs):
+    # Nouvelle révision de la liste (et updated_at, utilisé par les ETags) : voir sync.py
+    instance.revision = sync.bump(instance.shopping_list_id)
+    instance.updated_at = timezone.now()
+
+
+@receiver(post_delete, sender=ShoppingListItem)
+def shopping_list_item_deleted(sender, instance, origin=None, **kwargs):
+    # Suppression en cascade de la liste (ou de son propriétaire) : pas de tombstone
+    if not isinstance(origin, ShoppingListItem) and getattr(origin, 'model', None) is not ShoppingListItem:
+        return
+    ShoppingListTombstone.objects.create(
+        shopping_list_id=instance.shopping_list_id, item_id=instance.pk, client_id=instance.client_id,
+        revision=sync.bump(instance.shopping_list_id),
+    )
+
+
+@receiver(pre_save, sender=ShoppingListItem)
+@receiver(pre_save, sender=Ingredient)
+@receiver(pre_save, sender=RecipeImage)
+def append_rank(sender, instance, **kwargs):
+    # Nouvel élément sans rang : en fin de liste (bulk_create : ranking.append_ranks)
+    if not instance.rank:
+        instance.rank = ranking.key_between(ranking.last_rank(sender, ranking.parent_id(instance)), None)
+
+
+@receiver(ranking.ranks_changed, sender=ShoppingListItem)
+def shopping_list_items_moved(sender, parent_pk, pks, **kwargs):
+    ShoppingListItem.objects.filter(pk__in=pks).update(revision=sync.bump(parent_pk), updated_at=timezone.now())
+
+
+@receiver(ranking.ranks_changed, sender=Ingredient)
+@receiver(ranking.ranks_changed, sender=RecipeImage)
+def recipe_children_moved(sender, parent_pk, **kwargs):
+    # updated_at de la recette avancé : ETag et document du détail
+    documents.recipe_changed(parent_pk)
+
+
+# ---------------------------------------------------------------------------
+# Index des suggestions de saisie
+# ---------------------------------------------------------------------------
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved_update_suggestions(sender, instance, update_fields=None, **kwargs):
+    # Compteurs seuls : la popularité est relue à la reconstruction de l'index
+    if update_fields is not None and set(update_fields) <= {'views_count', 'favorites_count'}:
+        return
+    suggest.recipe_changed(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def recipe_content_changed_update_suggestions(sender, instance, **kwargs):
+    suggest.recipe_changed(instance.pk if sender is Recipe else instance.recipe_id)
+
+
+# Fichiers partagés entre objets (uploads.py) : inscrits pour le balayage dans la
+# transaction qui retire leur référence, supprimés s'ils ne sont plus référencés
+
+def images_deleted(sender, instance, using, **kwargs):
+    names = [getattr(instance, field.attname).name for model, field in uploads.image_fields() if model is sender]
+    uploads.release_files(names, using)
+
+
+def images_replacing(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    attnames = [
+        field.attname for model, field in uploads.image_fields()
+        if model is sender and (update_fields is None or field.name in update_fields)
+    ]
+    if not attnames:
+        return
+    stored = sender._base_manager.using(using).filter(pk=instance.pk).values_list(*attnames).first()
+    if stored is not None:
+        instance._replaced_images = [
+            name for attname, name in zip(attnames, stored) if name and name != getattr(instance, attname).name
+        ]
+
+
+def images_replaced(sender, instance, using, **kwargs):
+    names = instance.__dict__.pop('_replaced_images', None)
+    if names:
+        uploads.release_files(names, using)
+
+
+for _model in {model for model, _ in uploads.image_fields()}:
+    post_delete.connect(images_deleted, sender=_model, dispatch_uid=f'images-{_model.__name__}-delete')
+    pre_save.connect(images_replacing, sender=_model, dispatch_uid=f'images-{_model.__name__}-replacing')
+    post_save.connect(images_replaced, sender=_model, dispatch_uid=f'images-{_model.__name__}-replaced')
+
+
+# ---------------------------------------------------------------------------
+# Documents du détail des recettes
+# ---------------------------------------------------------------------------
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved_update_document(sender, instance, using, update_fields=None, **kwargs):
+    # Compteurs seuls : ajoutés au document à la lecture
+    if update_fields is not None and set(update_fields) <= {'views_count', 'favorites_count'}:
+        return
+    # updated_at n'est enregistré par auto_now que s'il fait partie des champs enregistrés
+    documents.recipe_changed(
+        instance.pk, touch=update_fields is not None and 'updated_at' not in update_fields, using=using
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=RecipeImage)
+@receiver(post_delete, sender=RecipeImage)
+def recipe_children_changed_update_document(sender, instance, using, **kwargs):
+    documents.recipe_changed(instance.recipe_id, using=using)
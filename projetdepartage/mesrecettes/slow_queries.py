@@ -0,0 +1,199 @@
+"""
+Journal des requêtes SQL lentes.
+
+Un execute_wrapper, installé sur chaque connexion, mesure les requêtes ; au-delà
+de SLOW_QUERY_MS, la requête est journalisée (logger mesrecettes.slow_queries)
+avec son SQL normalisé, une empreinte des paramètres (pas leurs valeurs) et la
+vue d'origine, puis confiée à un thread d'arrière-plan qui :
+- capture le plan d'exécution (EXPLAIN) sur sa propre connexion, sans toucher
+  à la transaction de la requête, au plus une fois par SLOW_QUERY_EXPLAIN_INTERVAL
+  et par empreinte ;
+- met à jour le tableau SlowQuery (une ligne par empreinte, visible dans
+  l'admin), limité aux SLOW_QUERY_TOP_N empreintes les plus coûteuses.
+
+La file d'attente est bornée : en cas d'afflux, les requêtes en trop sont
+seulement journalisées.
+"""
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .profiling import current_profile
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,)*\s*%s\s*\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+_local = threading.local()
+
+
+def normalize(sql):
+    """SQL sans littéraux, listes IN (...) réduites : même texte pour la même forme de requête"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(*parts):
+    return hashlib.sha1('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+
+def params_fingerprint(params):
+    if params is None:
+        return ''
+    return fingerprint(repr(params))[:16]
+
+
+def record_slow_query(execute, sql, params, many, context):
+    """execute_wrapper installé sur chaque connexion"""
+    threshold = getattr(settings, 'SLOW_QUERY_MS', 0)
+    if not threshold or getattr(_local, 'recording', False):
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        if elapsed >= threshold:
+            # Le journal ne doit jamais faire échouer (ni masquer l'erreur de) la requête
+            try:
+                report(context['connection'].alias, sql, params, many, elapsed)
+            except Exception:
+                logger.warning("Impossible de journaliser une requête lente", exc_info=True)
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    if record_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_slow_query)
+
+
+connection_created.connect(install_slow_query_log, dispatch_uid='mesrecettes.slow_queries')
+
+
+def report(alias, sql, params, many, elapsed):
+    profile = current_profile.get()
+    if many:
+        # executemany : le plan est celui d'une seule ligne ; un itérateur est déjà consommé
+        params = params[0] if isinstance(params, (list, tuple)) and params else None
+    entry = {
+        'database': alias,
+        'fingerprint': fingerprint(alias, normalize(sql)),
+        'normalized_sql': normalize(sql),
+        'sql': sql,
+        'params': params,
+        'params_fingerprint': params_fingerprint(params),
+        'view': getattr(profile, 'view', '') or '',
+        'ms': elapsed,
+    }
+    logger.warning(
+        'Requête lente (%.0f ms) %s [%s] vue=%s params=%s',
+        elapsed, entry['normalized_sql'], entry['fingerprint'][:12], entry['view'] or '-',
+        entry['params_fingerprint'] or '-',
+    )
+    worker().submit(entry)
+
+
+# ---------------------------------------------------------------------------
+# Thread d'arrière-plan : EXPLAIN et tableau SlowQuery
+# ---------------------------------------------------------------------------
+
+class SlowQueryWorker:
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=getattr(settings, 'SLOW_QUERY_QUEUE_SIZE', 100))
+        self.explained = {}
+        self.thread = threading.Thread(target=self.run, name='slow-queries', daemon=True)
+        self.thread.start()
+
+    def submit(self, entry):
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            pass
+
+    def run(self):
+        # Les requêtes de ce thread (EXPLAIN, tableau) ne sont pas elles-mêmes mesurées
+        _local.recording = True
+        while True:
+            entry = self.queue.get()
+            try:
+                self.store(entry, self.explain(entry))
+            except Exception:
+                logger.warning("Impossible d'enregistrer la requête lente %s", entry['fingerprint'], exc_info=True)
+            finally:
+                for connection in connections.all(initialized_only=True):
+                    connection.close_if_unusable_or_obsolete()
+
+    def explain(self, entry):
+        """Plan d'exécution, ou None s'il est récent ou que la requête n'est pas un SELECT"""
+        interval = timedelta(seconds=getattr(settings, 'SLOW_QUERY_EXPLAIN_INTERVAL', 3600))
+        last = self.explained.get(entry['fingerprint'])
+        if not _EXPLAINABLE.match(entry['sql']) or (last and timezone.now() - last < interval):
+            return None
+        connection = connections[entry['database']]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {entry['sql']}", entry['params'])
+                plan = '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+        except Exception as exc:
+            plan = f'EXPLAIN impossible : {exc}'
+        self.explained[entry['fingerprint']] = timezone.now()
+        return plan
+
+    def store(self, entry, plan):
+        from .models import SlowQuery
+
+        now = timezone.now()
+        updates = {
+            'sample_sql': entry['sql'],
+            'params_fingerprint': entry['params_fingerprint'],
+            'view': entry['view'][:200],
+            'count': F('count') + 1,
+            'total_ms': F('total_ms') + entry['ms'],
+            'max_ms': Greatest('max_ms', Value(entry['ms'])),
+            'last_ms': entry['ms'],
+            'last_seen': now,
+        }
+        if plan is not None:
+            updates['explain'] = plan
+        if not SlowQuery.objects.filter(fingerprint=entry['fingerprint']).update(**updates):
+            SlowQuery.objects.create(
+                fingerprint=entry['fingerprint'], normalized_sql=entry['normalized_sql'],
+                sample_sql=entry['sql'], params_fingerprint=entry['params_fingerprint'],
+                database=entry['database'], view=entry['view'][:200], count=1,
+                total_ms=entry['ms'], max_ms=entry['ms'], last_ms=entry['ms'],
+                explain=plan or '', first_seen=now, last_seen=now,
+            )
+            # Nouvelle empreinte : ne garder que les plus coûteuses
+            top_n = getattr(settings, 'SLOW_QUERY_TOP_N', 200)
+            keep = SlowQuery.objects.order_by('-total_ms').values_list('pk', flat=True)[:top_n]
+            SlowQuery.objects.exclude(pk__in=list(keep)).delete()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def worker():
+    """Thread d'arrière-plan du processus courant (recréé après un fork)"""
+    global _worker
+    if _worker is None or not _worker.thread.is_alive():
+        with _worker_lock:
+            if _worker is None or not _worker.thread.is_alive():
+                _worker = SlowQueryWorker()
+    return _worker
@@ -0,0 +1,113 @@
+"""
+Préchauffage des processus (workers gunicorn, voir gunicorn.conf.py).
+
+Chaque étape est enregistrée avec @warm_up_step et une portée :
+- SHARED : sans état propre au processus (imports, regex des routes,
+  introspection des serializers). Exécutée dans le maître quand l'application
+  est préchargée, et donc partagée par les workers après le fork.
+- WORKER : connexions et caches locaux, exécutée dans chaque worker après le
+  fork, avant la première requête.
+
+Une étape en échec est journalisée sans empêcher le démarrage du worker.
+"""
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SHARED = 'shared'
+WORKER = 'worker'
+
+_steps = []
+
+
+def warm_up_step(name, scope=WORKER):
+    """Enregistre une fonction de préchauffage"""
+    def decorator(func):
+        _steps.append((name, scope, func))
+        return func
+    return decorator
+
+
+def warm_up(scopes=(SHARED, WORKER)):
+    """Exécute les étapes des portées demandées, retourne [(nom, durée en ms)]"""
+    if not getattr(settings, 'STARTUP_WARM_UP', True):
+        return []
+    timings = []
+    for name, scope, func in _steps:
+        if scope not in scopes:
+            continue
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            logger.exception("Échec de l'étape de préchauffage %s", name)
+            continue
+        timings.append((name, (time.perf_counter() - start) * 1000))
+    if timings:
+        logger.info('Préchauffage : %s', ', '.join(f'{name} {ms:.1f} ms' for name, ms in timings))
+    return timings
+
+
+def _iter_patterns(patterns):
+    from django.urls import URLResolver
+
+    for pattern in patterns:
+        yield pattern
+        if isinstance(pattern, URLResolver):
+            yield from _iter_patterns(pattern.url_patterns)
+
+
+@warm_up_step('urls', scope=SHARED)
+def compile_routes():
+    """Importe les URLconfs et compile les expressions régulières de chaque route"""
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    for pattern in _iter_patterns(resolver.url_patterns):
+        pattern.pattern.regex
+
+
+@warm_up_step('serializers', scope=SHARED)
+def build_serializer_fields():
+    """Introspection des modèles par les ModelSerializer (et imports différés de DRF)"""
+    from rest_framework import serializers as drf_serializers
+    from . import serializers
+
+    for value in vars(serializers).values():
+        if (isinstance(value, type) and issubclass(value, drf_serializers.Serializer)
+                and value.__module__ == serializers.__name__):
+            for field in value(context={}).fields.values():
+                if isinstance(field, drf_serializers.BaseSerializer):
+                    getattr(field, 'child', field).fields
+
+    # ImageField importe Pillow à la première validation
+    from PIL import Image  # noqa: F401
+
+
+@warm_up_step('database')
+def open_connections():
+    """Ouvre les connexions persistantes (CONN_MAX_AGE) avant la première requête"""
+    from django.db import connections
+
+    for connection in connections.all():
+        if connection.settings_dict.get('CONN_MAX_AGE'):
+            connection.ensure_connection()
+
+
+@warm_up_step('reference-data')
+def load_reference_data():
+    """Charge les instantanés des données de référence (catégories, régimes, allergies)"""
+    from .reference_data import get_snapshots
+
+    get_snapshots()
+
+
+@warm_up_step('suggest-index')
+def build_suggest_index():
+    """Construit l'index de préfixes des suggestions de saisie"""
+    from .suggest import get_index
+
+    get_index()
@@ -0,0 +1,164 @@
+"""
+Statistiques utilisateur maintenues de manière incrémentale.
+
+Les compteurs de UserStatistics et les buckets journaliers de
+DailyRecipeViewCount sont mis à jour par deltas depuis les signals
+(voir signals.py). Une ligne absente est reconstruite entièrement depuis
+la base au premier accès (ou via la commande rebuild_statistics) ; les
+recettes supprimées (deleted_at, voir purge.py) n'y sont pas comptées.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    DailyRecipeViewCount, FavoriteRecipe, Recipe, RecipeView, UserStatistics
+)
+
+TOP_RECIPES_LIMIT = 5
+VIEWS_WINDOW_DAYS = 30
+
+
+def _most_viewed_entry(recipe):
+    return {'id': recipe['id'], 'title': recipe['title'], 'views_count': recipe['views_count']}
+
+
+def _recent_entry(recipe):
+    return {'id': recipe['id'], 'title': recipe['title'], 'created_at': recipe['created_at'].isoformat()}
+
+
+def _recipe_lists(user_id):
+    recipes = Recipe.objects.filter(author_id=user_id)
+    most_viewed = recipes.order_by('-views_count', '-id')[:TOP_RECIPES_LIMIT].values('id', 'title', 'views_count')
+    recent = recipes.order_by('-created_at')[:TOP_RECIPES_LIMIT].values('id', 'title', 'created_at')
+    return [_most_viewed_entry(r) for r in most_viewed], [_recent_entry(r) for r in recent]
+
+
+def rebuild_user_statistics(user_id):
+    """Recalcule entièrement les statistiques et les buckets récents d'un utilisateur"""
+    most_viewed, recent = _recipe_lists(user_id)
+    values = {
+        'recipes_count': Recipe.objects.filter(author_id=user_id).count(),
+        'favorites_given': FavoriteRecipe.objects.filter(user_id=user_id, recipe__deleted_at__isnull=True).count(),
+        'favorites_received': FavoriteRecipe.objects.filter(
+            recipe__author_id=user_id, recipe__deleted_at__isnull=True
+        ).count(),
+        'views_made': RecipeView.objects.filter(user_id=user_id, recipe__deleted_at__isnull=True).count(),
+        'views_received': RecipeView.objects.filter(
+            recipe__author_id=user_id, recipe__deleted_at__isnull=True
+        ).count(),
+        'most_viewed_recipes': most_viewed,
+        'recent_recipes': recent,
+    }
+
+    start = timezone.localdate() - timedelta(days=VIEWS_WINDOW_DAYS - 1)
+    per_day = (
+        RecipeView.objects.filter(
+            recipe__author_id=user_id, recipe__deleted_at__isnull=True, viewed_at__date__gte=start
+        )
+        .annotate(day=TruncDate('viewed_at'))
+        .values('day')
+        .annotate(total=Count('id'))
+    )
+
+    with transaction.atomic():
+        stats, _ = UserStatistics.objects.update_or_create(user_id=user_id, defaults=values)
+        DailyRecipeViewCount.objects.filter(author_id=user_id, date__gte=start).delete()
+        DailyRecipeViewCount.objects.bulk_create([
+            DailyRecipeViewCount(author_id=user_id, date=row['day'], count=row['total'])
+            for row in per_day
+        ])
+    return stats
+
+
+def apply_delta(user_id, **deltas):
+    """
+    Applique des deltas atomiques (F expressions) aux compteurs d'un utilisateur.
+    Sans ligne existante, rien n'est fait : elle sera reconstruite au prochain accès.
+    """
+    if user_id is None:
+        return
+    UserStatistics.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def refresh_recipe_lists(user_id):
+    """Recalcule les listes dénormalisées (plus vues, plus récentes) d'un auteur"""
+    if not UserStatistics.objects.filter(user_id=user_id).exists():
+        return
+    most_viewed, recent = _recipe_lists(user_id)
+    UserStatistics.objects.filter(user_id=user_id).update(
+        most_viewed_recipes=most_viewed, recent_recipes=recent
+    )
+
+
+def record_views_count_change(recipe):
+    """Fusionne le nouveau views_count d'une recette dans le top de son auteur"""
+    with transaction.atomic():
+        stats = UserStatistics.objects.select_for_update().filter(user_id=recipe.author_id).first()
+        if stats is None:
+            return
+        entries = [e for e in stats.most_viewed_recipes if e['id'] != recipe.pk]
+        entries.append({'id': recipe.pk, 'title': recipe.title, 'views_count': recipe.views_count})
+        entries.sort(key=lambda e: (-e['views_count'], -e['id']))
+        entries = entries[:TOP_RECIPES_LIMIT]
+        if entries != stats.most_viewed_recipes:
+            stats.most_viewed_recipes = entries
+            stats.save(update_fields=['most_viewed_recipes', 'updated_at'])
+
+
+def add_daily_view(author_id, day, delta=1):
+    """Incrémente (ou décrémente) le bucket de vues journalier d'un auteur"""
+    buckets = DailyRecipeViewCount.objects.filter(author_id=author_id, date=day)
+    if buckets.update(count=F('count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            DailyRecipeViewCount.objects.create(author_id=author_id, date=day, count=delta)
+    except IntegrityError:
+        # Création concurrente du même bucket
+        buckets.update(count=F('count') + delta)
+
+
+def get_statistics_row(user_id):
+    """Ligne de statistiques, reconstruite si elle n'existe pas encore"""
+    stats = UserStatistics.objects.filter(user_id=user_id).first()
+    if stats is None:
+        stats = rebuild_user_statistics(user_id)
+    return stats
+
+
+def get_daily_view_counts(user_id):
+    """{date: nombre de vues} pour la fenêtre des VIEWS_WINDOW_DAYS derniers jours"""
+    start = timezone.localdate() - timedelta(days=VIEWS_WINDOW_DAYS - 1)
+    return dict(
+        DailyRecipeViewCount.objects.filter(author_id=user_id, date__gte=start).values_list('date', 'count')
+    )
+
+
+def format_statistics(stats, counts):
+    start = timezone.localdate() - timedelta(days=VIEWS_WINDOW_DAYS - 1)
+    views_per_day = [
+        {'date': day.isoformat(), 'count': counts.get(day, 0)}
+        for day in (start + timedelta(days=i) for i in range(VIEWS_WINDOW_DAYS))
+    ]
+
+    return {
+        'total_recipes': stats.recipes_count,
+        'total_favorites': stats.favorites_given,
+        'total_views': stats.views_made,
+        'favorites_received': stats.favorites_received,
+        'views_received': stats.views_received,
+        'most_viewed_recipes': stats.most_viewed_recipes,
+        'recent_recipes': stats.recent_recipes,
+        'views_per_day': views_per_day,
+    }
+
+
+def get_user_statistics(user):
+    """Lecture d'une seule ligne de statistiques et des buckets journaliers"""
+    return format_statistics(get_statistics_row(user.pk), get_daily_view_counts(user.pk))
@@ -0,0 +1,389 @@
+"""
+Suggestions de saisie (GET /recipes/suggest/?q=) : titres de recettes, tags et
+noms d'ingrédients commençant par la saisie, les plus populaires d'abord.
+
+Servies depuis un index de préfixes en mémoire, propre à chaque processus :
+une liste triée de clés normalisées (minuscules, sans accents ni ponctuation)
+parcourue par bisect. Chaque mot ouvre une clé : « poulet » trouve « Yassa au
+poulet ». Seules les recettes publiées et non supprimées sont indexées ; la
+popularité est favorites_count puis views_count pour un titre, le nombre de
+recettes pour un tag ou un ingrédient.
+
+L'index est construit au démarrage des workers (startup.py) ou à la première
+requête, puis mis à jour recette par recette :
+- dans le processus qui modifie une recette, à la fin de la requête (signals.py) ;
+- dans les autres, par un thread qui relit toutes les SUGGEST_REFRESH_SECONDS
+  les recettes modifiées depuis (updated_at) ;
+- il est reconstruit toutes les SUGGEST_REBUILD_SECONDS (popularité,
+  suppressions définitives faites par un autre processus).
+
+Les résultats sont mis en cache par saisie jusqu'à la modification suivante :
+les préfixes courts, qui couvrent une grande partie de l'index, ne sont
+parcourus qu'une fois. Au-delà de SUGGEST_MAX_KEYS clés, seuls les débuts des
+titres, tags et ingrédients sont indexés (voir la commande bench_suggest).
+"""
+import heapq
+import logging
+import re
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections
+from django.utils import timezone
+
+from .models import Ingredient, Recipe
+
+logger = logging.getLogger(__name__)
+
+# Mots indexés par titre, tag ou ingrédient (une clé par mot)
+MAX_WORDS = 8
+MAX_LIMIT = 20
+# Recettes modifiées au-delà desquelles une reconstruction complète est plus rapide
+MAX_INCREMENTAL = 1000
+# Chevauchement des relectures : transactions validées après leur updated_at
+REFRESH_OVERLAP = timedelta(seconds=60)
+CACHE_SIZE = 4096
+# Au-delà de SCAN_LIMIT clés pour un préfixe, recherche d'abord parmi les
+# POPULAR_SIZE recettes (et termes) les plus populaires
+SCAN_LIMIT = 2000
+POPULAR_SIZE = 2000
+
+_WORD = re.compile(r'\w+')
+_LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ß': 'ss'})
+_SEPARATOR = '\x00'
+# Borne supérieure des clés commençant par un préfixe
+_LAST = '\U0010ffff'
+
+RECIPE, TAG, INGREDIENT = 'recipe', 'tag', 'ingredient'
+KINDS = (RECIPE, TAG, INGREDIENT)
+
+
+def normalize(text):
+    """Minuscules, sans accents ni ponctuation : « Crème brûlée ! » -> « creme brulee »"""
+    text = unicodedata.normalize('NFKD', str(text).casefold().translate(_LIGATURES))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_WORD.findall(text))
+
+
+class SuggestIndex:
+    """
+    Index de préfixes : par type (recettes, tags, ingrédients), clés triées
+    « texte normalisé \\x00 référence ».
+
+    Un préfixe court couvre une grande partie des clés d'un type : au-delà de
+    SCAN_LIMIT clés, la recherche parcourt d'abord `popular`, les clés des
+    POPULAR_SIZE recettes (ou termes) les plus populaires. Le résultat est exact
+    dès qu'elle y trouve `limit` éléments, les autres étant moins populaires ;
+    sinon la plage complète est parcourue.
+    """
+
+    def __init__(self, max_keys=None):
+        self.keys = {kind: [] for kind in KINDS}
+        self.popular = {kind: [] for kind in KINDS}
+        # Popularité minimale des éléments de `popular` (absente : pas encore calculée)
+        self.floors = {}
+        self.max_keys = max_keys or getattr(settings, 'SUGGEST_MAX_KEYS', 2_000_000)
+        # pk -> (titre, popularité, nombre de clés, tags normalisés, ingrédients normalisés)
+        self.recipes = {}
+        # (type, texte normalisé) -> [texte affiché, nombre de recettes, nombre de clés]
+        self.terms = {}
+        self.cache = {}
+        self.lock = threading.RLock()
+        self.built_at = time.monotonic()
+        self.watermark = None
+
+    def __len__(self):
+        return sum(len(keys) for keys in self.keys.values())
+
+    def _key_count(self, text):
+        return 1 if len(self) >= self.max_keys else min(len(text.split()), MAX_WORDS)
+
+    @staticmethod
+    def _keys(text, ref, count):
+        words = text.split()
+        return [f"{' '.join(words[start:])}{_SEPARATOR}{ref}" for start in range(count)]
+
+    def _insert(self, kind, keys, popularity, bulk):
+        if bulk:
+            self.keys[kind].extend(keys)
+            return
+        targets = [self.keys[kind]]
+        if kind in self.floors and popularity >= self.floors[kind]:
+            targets.append(self.popular[kind])
+        for target in targets:
+            for key in keys:
+                insort(target, key)
+
+    def _discard(self, kind, keys):
+        for source in (self.keys[kind], self.popular[kind]):
+            for key in keys:
+                position = bisect_left(source, key)
+                if position < len(source) and source[position] == key:
+                    del source[position]
+
+    def add(self, pk, title, tags, ingredients, popularity, bulk=False):
+        """Indexe une recette (bulk : clés triées ensuite par finish_bulk)"""
+        with self.lock:
+            if not bulk:
+                self.remove(pk)
+            text = normalize(title)
+            count = self._key_count(text) if text else 0
+            self._insert(RECIPE, self._keys(text, pk, count), popularity, bulk)
+            terms = {}
+            for kind, values in ((TAG, tags), (INGREDIENT, ingredients)):
+                normalized = {}
+                for value in values:
+                    value = str(value).strip()
+                    term = normalize(value)
+                    if term:
+                        normalized.setdefault(sys.intern(term), value)
+                for term, display in normalized.items():
+                    self._add_term(kind, term, display, bulk)
+                terms[kind] = tuple(normalized)
+            self.recipes[pk] = (title, popularity, count, terms[TAG], terms[INGREDIENT])
+            self.cache.clear()
+
+    def _add_term(self, kind, term, display, bulk):
+        entry = self.terms.get((kind, term))
+        if entry is None:
+            entry = self.terms[(kind, term)] = [display, 1, self._key_count(term)]
+            self._insert(kind, self._keys(term, term, entry[2]), 1, bulk)
+            return
+        entry[1] += 1
+        if not bulk and entry[1] == self.floors.get(kind):
+            # Terme devenu populaire
+            for key in self._keys(term, term, entry[2]):
+                insort(self.popular[kind], key)
+
+    def finish_bulk(self):
+        """Trie les clés et sélectionne les plus populaires de chaque type"""
+        with self.lock:
+            popularity = {RECIPE: {pk: recipe[1] for pk, recipe in self.recipes.items()}}
+            for (kind, term), entry in self.terms.items():
+                popularity.setdefault(kind, {})[term] = entry[1]
+            for kind in KINDS:
+                keys = self.keys[kind]
+                keys.sort()
+                values = popularity.get(kind, {})
+                top = heapq.nlargest(POPULAR_SIZE, values.values())
+                floor = self.floors[kind] = top[-1] if top else 0
+                self.popular[kind] = [key for key in keys if values[self._ref(kind, key)] >= floor]
+            self.cache.clear()
+
+    @staticmethod
+    def _ref(kind, key):
+        ref = key[key.index(_SEPARATOR) + 1:]
+        return int(ref) if kind == RECIPE else ref
+
+    def remove(self, pk):
+        with self.lock:
+            recipe = self.recipes.pop(pk, None)
+            if recipe is None:
+                return
+            self._discard(RECIPE, self._keys(normalize(recipe[0]), pk, recipe[2]))
+            for kind, terms in ((TAG, recipe[3]), (INGREDIENT, recipe[4])):
+                for term in terms:
+                    entry = self.terms[(kind, term)]
+                    entry[1] -= 1
+                    if not entry[1]:
+                        del self.terms[(kind, term)]
+                        self._discard(kind, self._keys(term, term, entry[2]))
+            self.cache.clear()
+
+    def _scan(self, kind, keys, prefix):
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + _LAST, lo)
+        return hi - lo, {self._ref(kind, key) for key in keys[lo:hi]}
+
+    def _matches(self, kind, prefix, limit):
+        """Références des clés de `kind` commençant par `prefix`, les `limit` plus populaires comprises"""
+        keys = self.keys[kind]
+        lo = bisect_left(keys, prefix)
+        if kind in self.floors and bisect_left(keys, prefix + _LAST, lo) - lo > SCAN_LIMIT:
+            _, found = self._scan(kind, self.popular[kind], prefix)
+            if len(found) >= limit:
+                return found
+        return self._scan(kind, keys, prefix)[1]
+
+    def top_terms(self, kind, limit):
+        """Textes affichés des `limit` termes de `kind` présents dans le plus de recettes"""
+        with self.lock:
+            entries = [entry for (term_kind, _), entry in self.terms.items() if term_kind == kind]
+            return [entry[0] for entry in heapq.nsmallest(limit, entries, key=lambda entry: (-entry[1], entry[0]))]
+
+    def search(self, query, limit=10):
+        """{'recipes': [...], 'tags': [...], 'ingredients': [...]}, `limit` de chaque"""
+        prefix = normalize(query)
+        if not prefix:
+            return {'recipes': [], 'tags': [], 'ingredients': []}
+        with self.lock:
+            cached = self.cache.get((prefix, limit))
+            if cached is not None:
+                return cached
+            recipes = heapq.nlargest(
+                limit, self._matches(RECIPE, prefix, limit), key=lambda pk: (self.recipes[pk][1], -pk)
+            )
+            result = {'recipes': [{'id': pk, 'title': self.recipes[pk][0]} for pk in recipes]}
+            for kind, name in ((TAG, 'tags'), (INGREDIENT, 'ingredients')):
+                entries = [self.terms[(kind, term)] for term in self._matches(kind, prefix, limit)]
+                result[name] = [
+                    {'name': entry[0], 'count': entry[1]}
+                    for entry in heapq.nsmallest(limit, entries, key=lambda entry: (-entry[1], entry[0]))
+                ]
+            if len(self.cache) >= CACHE_SIZE:
+                self.cache.clear()
+            self.cache[(prefix, limit)] = result
+            return result
+
+
+# ---------------------------------------------------------------------------
+# Chargement depuis la base
+# ---------------------------------------------------------------------------
+
+def indexed_recipes():
+    return Recipe.objects.filter(is_published=True)
+
+
+def load(index, pks=None):
+    """Indexe les recettes `pks` (toutes si None) ; retire celles qui ne sont plus visibles"""
+    recipes = indexed_recipes()
+    ingredients = Ingredient.objects.filter(recipe__in=recipes)
+    if pks is not None:
+        recipes = recipes.filter(pk__in=pks)
+        ingredients = ingredients.filter(recipe_id__in=pks)
+    names = {}
+    for recipe_id, name in ingredients.order_by().values_list('recipe_id', 'name').iterator(chunk_size=5000):
+        names.setdefault(recipe_id, []).append(name)
+    rows = recipes.order_by().values_list('pk', 'title', 'tags', 'favorites_count', 'views_count')
+    seen = set()
+    for pk, title, tags, favorites_count, views_count in rows.iterator(chunk_size=5000):
+        seen.add(pk)
+        tags = tags if isinstance(tags, list) else []
+        index.add(pk, title, tags, names.pop(pk, ()), (favorites_count, views_count), bulk=pks is None)
+    if pks is None:
+        index.finish_bulk()
+    else:
+        for pk in set(pks) - seen:
+            index.remove(pk)
+
+
+def build():
+    index = SuggestIndex()
+    index.watermark = timezone.now()
+    start = time.perf_counter()
+    load(index)
+    logger.info(
+        "Index de suggestions : %d recettes, %d clés en %.0f ms",
+        len(index.recipes), len(index), (time.perf_counter() - start) * 1000,
+    )
+    return index
+
+
+def refresh(index):
+    """Relit les recettes modifiées depuis la dernière relecture"""
+    started = timezone.now()
+    pks = list(
+        Recipe.all_objects.filter(updated_at__gte=index.watermark - REFRESH_OVERLAP)
+        .order_by().values_list('pk', flat=True)[:MAX_INCREMENTAL + 1]
+    )
+    if len(pks) > MAX_INCREMENTAL:
+        return build()
+    if pks:
+        load(index, pks)
+    index.watermark = started
+    return index
+
+
+_index = None
+_index_lock = threading.Lock()
+_refresher = None
+# Recettes modifiées par la requête en cours
+_local = threading.local()
+
+
+def get_index():
+    """Index du processus courant, construit au premier appel"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build()
+    start_refresher()
+    return _index
+
+
+def reset():
+    """Oublie l'index du processus (tests : les données sont annulées entre deux tests)"""
+    global _index
+    _index = None
+    _local.pending = None
+
+
+def search(query, limit=10):
+    return get_index().search(query, limit)
+
+
+def top_tags(limit):
+    return get_index().top_terms(TAG, limit)
+
+
+def start_refresher():
+    """Thread de relecture du processus courant (recréé après un fork)"""
+    global _refresher
+    interval = getattr(settings, 'SUGGEST_REFRESH_SECONDS', 30)
+    if not interval or (_refresher is not None and _refresher.is_alive()):
+        return
+    with _index_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=run_refresher, args=(interval,), name='suggest-refresh', daemon=True)
+            _refresher.start()
+
+
+def run_refresher(interval):
+    global _index
+    rebuild = getattr(settings, 'SUGGEST_REBUILD_SECONDS', 3600)
+    while True:
+        time.sleep(interval)
+        try:
+            if rebuild and time.monotonic() - _index.built_at >= rebuild:
+                _index = build()
+            else:
+                _index = refresh(_index)
+        except Exception:
+            logger.warning("Relecture de l'index de suggestions impossible", exc_info=True)
+        finally:
+            connections.close_all()
+
+
+# ---------------------------------------------------------------------------
+# Mises à jour après écriture (signals.py)
+# ---------------------------------------------------------------------------
+
+def recipe_changed(pk):
+    """Recette à réindexer à la fin de la requête (sans effet avant la construction de l'index)"""
+    if _index is None:
+        return
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = set()
+    pending.add(pk)
+
+
+def flush(**kwargs):
+    """Réindexe les recettes modifiées par la requête : une fois, ingrédients compris"""
+    pending = getattr(_local, 'pending', None)
+    _local.pending = None
+    if pending and _index is not None:
+        try:
+            load(_index, pending)
+        except Exception:
+            logger.warning("Mise à jour de l'index de suggestions impossible", exc_info=True)
+
+
+request_finished.connect(flush, dispatch_uid='mesrecettes.suggest')
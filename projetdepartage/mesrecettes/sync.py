@@ -0,0 +1,205 @@
+"""
+Synchronisation différentielle des listes de courses (clients hors ligne).
+
+Chaque liste a un compteur `revision`, incrémenté à chaque modification d'un
+de ses items ; l'item modifié reçoit la nouvelle révision (index
+shopping_list, revision), un item supprimé laisse une ShoppingListTombstone.
+L'incrémentation verrouille la ligne de la liste jusqu'à la fin de la
+transaction : les révisions d'une liste sont attribuées dans l'ordre des
+validations, et un client ne manque jamais une modification.
+
+GET /shopping-lists/<id>/sync/?since=<jeton> renvoie les items modifiés et
+les identifiants supprimés depuis le jeton, et le nouveau jeton. Sans jeton,
+ou si les suppressions de la période ont été oubliées (plus anciennes que
+SYNC_TOMBSTONE_DAYS), la liste complète est renvoyée (`full`).
+
+POST sur la même URL applique d'abord les modifications faites hors ligne
+(upsert / delete, identifiées par id ou par client_id pour les créations),
+en une transaction et une seule révision, puis répond comme GET. Les conflits
+sont résolus par la dernière écriture (modified_at du client comparé à
+updated_at de l'item) ; une suppression est définitive.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import ShoppingList, ShoppingListItem, ShoppingListTombstone
+from .purge import raw_delete
+from .ranking import append_ranks
+from .serializers import ShoppingListItemSyncSerializer
+
+
+def bump(list_pk):
+    """Nouvelle révision de la liste (verrouille sa ligne jusqu'à la fin de la transaction)"""
+    lists = ShoppingList.objects.using(router.db_for_write(ShoppingList)).filter(pk=list_pk)
+    lists.update(revision=F('revision') + 1, updated_at=timezone.now())
+    return lists.values_list('revision', flat=True).first()
+
+
+def parse_token(value):
+    if value in (None, ''):
+        return None
+    try:
+        token = int(value)
+    except (TypeError, ValueError):
+        token = -1
+    if token < 0:
+        raise ValidationError({'since': 'Jeton de synchronisation invalide.'})
+    return token
+
+
+def changes_since(shopping_list, since, context=None):
+    """Items modifiés et supprimés depuis la révision `since` (None : liste complète)"""
+    # Primaire, une transaction : jeton, items et suppressions lus sur la même base
+    # (deux réplicas au retard différent donneraient un jeton au-delà des items reçus)
+    using = router.db_for_write(ShoppingList)
+    with transaction.atomic(using=using):
+        # Révision lue avant les items : un item plus récent serait renvoyé deux fois, jamais manqué
+        revision, floor = ShoppingList.objects.using(using).filter(pk=shopping_list.pk).values_list(
+            'revision', 'sync_floor'
+        ).get()
+        full = since is None or since < floor or since > revision
+        items = ShoppingListItem.objects.using(using).filter(shopping_list_id=shopping_list.pk)
+        deleted = []
+        if not full:
+            items = items.filter(revision__gt=since)
+            deleted = list(ShoppingListTombstone.objects.using(using).filter(
+                shopping_list_id=shopping_list.pk, revision__gt=since
+            ).values_list('item_id', flat=True))
+        items = list(items)
+    return {
+        'token': str(revision),
+        'full': full,
+        'items': ShoppingListItemSyncSerializer(items, many=True, context=context).data,
+        'deleted': deleted,
+    }
+
+
+def apply_changes(shopping_list, changes, context=None):
+    """
+    Applique les modifications validées par ShoppingListSyncSerializer.
+
+    Renvoie un résultat par modification : applied, conflict (l'item a été
+    modifié plus récemment), deleted (item supprimé), not_found ou error.
+    """
+    if not changes:
+        return []
+    using = router.db_for_write(ShoppingListItem)
+    with transaction.atomic(using=using):
+        revision = bump(shopping_list.pk)
+        now = timezone.now()
+        ids = {change['id'] for change in changes if 'id' in change}
+        client_ids = {change['client_id'] for change in changes if 'id' not in change}
+        items = ShoppingListItem.objects.using(using).filter(shopping_list_id=shopping_list.pk).filter(
+            Q(pk__in=ids) | Q(client_id__in=client_ids)
+        )
+        by_id = {item.pk: item for item in items}
+        by_client = {item.client_id: item for item in by_id.values() if item.client_id}
+        tombstones = ShoppingListTombstone.objects.using(using).filter(
+            shopping_list_id=shopping_list.pk
+        ).filter(Q(item_id__in=ids) | Q(client_id__in=client_ids - {''}))
+        gone_ids, gone_clients = set(), set()
+        for item_id, client_id in tombstones.values_list('item_id', 'client_id'):
+            gone_ids.add(item_id)
+            if client_id:
+                gone_clients.add(client_id)
+
+        results, created, updated, deleted = [], {}, {}, {}
+        fields = {'revision', 'updated_at'}
+        for change in changes:
+            result = {'id': change.get('id'), 'client_id': change.get('client_id', '')}
+            results.append(result)
+            if 'id' in change:
+                item = by_id.get(change['id'])
+            else:
+                item = by_client.get(change['client_id'])
+
+            if item is None:
+                if change.get('id') in gone_ids or change.get('client_id') in gone_clients:
+                    result['status'] = 'deleted'
+                elif 'id' in change:
+                    result['status'] = 'not_found'
+                elif change['op'] == 'delete':
+                    # Créé puis supprimé hors ligne : rien à faire
+                    result['status'] = 'applied'
+                else:
+                    item = create_item(shopping_list, change, revision, result, context)
+                    if item is not None:
+                        by_client[item.client_id] = item
+                        created[item.client_id] = item
+                continue
+
+            result['id'] = item.pk
+            # Égalité : la même modification rejouée (réseau coupé avant la réponse)
+            if change['modified_at'] < item.updated_at:
+                result['status'] = 'conflict'
+                continue
+            result['status'] = 'applied'
+            if change['op'] == 'delete':
+                by_id.pop(item.pk, None)
+                by_client.pop(item.client_id, None)
+                gone_ids.add(item.pk)
+                if item.client_id:
+                    gone_clients.add(item.client_id)
+                if item.pk is None:
+                    del created[item.client_id]
+                else:
+                    deleted[item.pk] = item
+                    updated.pop(item.pk, None)
+                continue
+            serializer = ShoppingListItemSyncSerializer(item, data=change['data'], partial=True, context=context)
+            if not serializer.is_valid():
+                result.update(status='error', errors=serializer.errors)
+                continue
+            for field, value in serializer.validated_data.items():
+                setattr(item, field, value)
+                fields.add(field)
+            item.revision, item.updated_at = revision, change['modified_at']
+            if item.pk is not None:
+                updated[item.pk] = item
+
+        if deleted:
+            ShoppingListTombstone.objects.using(using).bulk_create([
+                ShoppingListTombstone(
+                    shopping_list_id=shopping_list.pk, item_id=item.pk, client_id=item.client_id,
+                    revision=revision, deleted_at=now,
+                ) for item in deleted.values()
+            ])
+            # Tombstones déjà inscrites ci-dessus : sans le receiver post_delete
+            raw_delete(ShoppingListItem.objects.using(using).filter(pk__in=list(deleted)), using)
+        if updated:
+            ShoppingListItem.objects.using(using).bulk_update(updated.values(), sorted(fields))
+        if created:
+            append_ranks(created.values())
+            ShoppingListItem.objects.using(using).bulk_create(created.values())
+            for result in results:
+                if result['id'] is None and result['client_id'] in created:
+                    result['id'] = created[result['client_id']].pk
+        prune_tombstones(shopping_list.pk, using)
+    return results
+
+
+def create_item(shopping_list, change, revision, result, context):
+    serializer = ShoppingListItemSyncSerializer(data=change['data'], context=context)
+    if not serializer.is_valid():
+        result.update(status='error', errors=serializer.errors)
+        return None
+    result['status'] = 'applied'
+    return ShoppingListItem(
+        shopping_list_id=shopping_list.pk, client_id=change['client_id'], revision=revision,
+        updated_at=change['modified_at'], **serializer.validated_data
+    )
+
+
+def prune_tombstones(list_pk, using):
+    """Oublie les suppressions anciennes ; les clients plus en retard repartent de la liste complète"""
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30))
+    old = ShoppingListTombstone.objects.using(using).filter(shopping_list_id=list_pk, deleted_at__lt=cutoff)
+    floor = old.aggregate(floor=Max('revision'))['floor']
+    if floor is not None:
+        old.delete()
+        ShoppingList.objects.using(using).filter(pk=list_pk, sync_floor__lt=floor).update(sync_floor=floor)
@@ -1,3 +1,1344 @@
-from django.test import TestCase
+"""
+Tests de non-régression des performances de l'API.
 
-# Create your tests here.
+Chaque route de mesrecettes/urls.py est appelée en anonyme et en authentifié,
+sur un petit jeu de données puis sur un jeu 50 fois plus grand : le nombre de
+requêtes SQL doit rester identique (pas de N+1) et la latence sous le plafond
+de la route. En cas d'échec, les requêtes SQL exécutées sont affichées.
+
+Les plafonds se règlent par PERF_CEILING_MS (défaut) et PERF_CEILING_SCALE
+(multiplicateur, utile sur une machine d'intégration lente).
+
+    python manage.py test mesrecettes
+"""
+import io
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest import mock
+from decimal import Decimal
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import serializers
+from django_rest_passwordreset.models import ResetPasswordToken
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import documents, media, pagination, purge, reference_data, suggest, sync, uploads, urls
+from .authentication import user_cache
+from .reference_data import ReferenceDataMixin
+from .models import (
+    Allergy, DietaryRestriction, FavoriteRecipe, Ingredient, IngredientCategory, Menu,
+    MenuRecipe, Recipe, RecipeCategory, RecipeDocument, RecipeImage, RecipeView, ShoppingList,
+    ShoppingListItem, ShoppingListTombstone, User, UserProfile, UserStatistics
+)
+from .purge import purge_deleted, soft_delete_recipe, soft_delete_user
+from .stats import get_daily_view_counts, get_statistics_row, rebuild_user_statistics
+from .ranking import key_between, spread
+
+SMALL, LARGE = 1, 50
+PASSWORD = 'mot-de-passe-test'
+
+DEFAULT_CEILING_MS = float(os.environ.get('PERF_CEILING_MS', 250))
+CEILING_SCALE = float(os.environ.get('PERF_CEILING_SCALE', 1))
+# Plafonds propres aux routes plus coûteuses (ms, avant PERF_CEILING_SCALE)
+CEILINGS_MS = {
+    'menu-autofill': 500,
+    'shopping-list-from-menu': 500,
+}
+
+
+# Statuts attendus (anonyme, authentifié) d'une route réservée aux utilisateurs authentifiés
+PRIVATE = (401, 200)
+
+
+class Route:
+    """
+    Appel d'une route nommée. `kwargs`, `data` et `query` peuvent être des fonctions du
+    cas de test (les objets n'existent qu'une fois le jeu de données créé). `status` est
+    le statut attendu, ou le couple (anonyme, authentifié).
+    """
+
+    def __init__(self, name, method='get', kwargs=None, data=None, query='', status=200):
+        self.name = name
+        self.method = method
+        self.kwargs = kwargs
+        self.data = data
+        self.query = query
+        self.status = status
+
+    def expected_status(self, authenticated):
+        if isinstance(self.status, tuple):
+            return self.status[authenticated]
+        return self.status
+
+    def resolve(self, value, case):
+        return value(case) if callable(value) else value
+
+    def path(self, case):
+        return reverse(self.name, kwargs=self.resolve(self.kwargs, case)) + self.resolve(self.query, case)
+
+    def __str__(self):
+        return f'{self.method.upper()} {self.name}'
+
+
+def pk(attribute):
+    return lambda case: {'pk': getattr(case, attribute).pk}
+
+
+ROUTES = [
+    Route('api-root', status=PRIVATE),
+    Route('user-list', status=PRIVATE),
+    Route('user-me', status=PRIVATE),
+    Route('user-update-me', 'patch', data={'first_name': 'Awa'}, status=PRIVATE),
+    Route('user-detail', kwargs=pk('user'), status=PRIVATE),
+    Route('profile-list', status=PRIVATE),
+    Route('profile-me', status=PRIVATE),
+    Route('profile-detail', kwargs=pk('profile'), status=PRIVATE),
+    Route('recipe-list'),
+    Route('recipe-list', query='?search=yassa&ordering=-views_count'),
+    Route('recipe-list', query='?facets=1&difficulty=2&total_time=30-60'),
+    Route('recipe-list', query=lambda case: f'?ids={case.other_recipe.pk},{case.recipe.pk}'),
+    Route('recipe-favorites', status=PRIVATE),
+    Route('recipe-history', status=PRIVATE),
+    Route('recipe-suggest', query='?q=yas'),
+    Route('recipe-my-recipes', status=PRIVATE),
+    Route('recipe-detail', kwargs=pk('recipe')),
+    # Recette de l'auteur : jamais mise en favori par grow()
+    Route('recipe-favorite', 'post', kwargs=pk('recipe'), status=PRIVATE),
+    Route('recipe-move-ingredient', 'post', data={'after': None}, status=PRIVATE, kwargs=lambda case: {
+        'pk': case.other_recipe.pk, 'ingredient_id': case.other_recipe.ingredients.last().pk}),
+    Route('recipe-move-image', 'post', data={'before': None}, status=PRIVATE, kwargs=lambda case: {
+        'pk': case.other_recipe.pk, 'image_id': case.other_recipe.images.get().pk}),
+    Route('recipe-category-list'),
+    Route('recipe-category-detail', kwargs=pk('category')),
+    Route('ingredient-category-list'),
+    Route('ingredient-category-detail', kwargs=pk('ingredient_category')),
+    Route('dietary-restriction-list'),
+    Route('dietary-restriction-detail', kwargs=pk('restriction')),
+    Route('allergy-list'),
+    Route('allergy-detail', kwargs=pk('allergy')),
+    Route('shopping-list-list', status=PRIVATE),
+    Route('shopping-list-detail', kwargs=pk('shopping_list'), status=PRIVATE),
+    Route('shopping-list-add-item', 'post', kwargs=pk('shopping_list'),
+          data={'ingredient_name': 'sel', 'quantity': '1.00', 'unit': 'g'}, status=(401, 201)),
+    Route('shopping-list-from-menu', 'post', kwargs=pk('shopping_list'),
+          data=lambda case: {'menu_id': case.menu.pk}, status=PRIVATE),
+    Route('shopping-list-from-recipe', 'post', kwargs=pk('shopping_list'),
+          data=lambda case: {'recipe_id': case.recipe.pk}, status=PRIVATE),
+    Route('shopping-list-sync', kwargs=pk('shopping_list'), query='?since=0', status=PRIVATE),
+    Route('shopping-list-sync', 'post', kwargs=pk('shopping_list'), data=lambda case: {
+        'since': str(case.shopping_list.revision), 'changes': [
+            {'op': 'upsert', 'client_id': 'hors-ligne-1', 'modified_at': '2030-01-01T10:00:00Z',
+             'data': {'ingredient_name': 'sel', 'quantity': '1.00'}},
+            {'op': 'upsert', 'id': case.shopping_list_item.pk, 'modified_at': '2030-01-01T10:00:00Z',
+             'data': {'is_checked': True}},
+            {'op': 'delete', 'id': case.shopping_list.items.latest('pk').pk, 'modified_at': '2030-01-01T10:00:00Z'},
+        ]}, status=PRIVATE),
+    Route('shopping-list-item-list', status=PRIVATE),
+    Route('shopping-list-item-detail', kwargs=pk('shopping_list_item'), status=PRIVATE),
+    Route('shopping-list-item-move', 'post', kwargs=pk('shopping_list_item'),
+          data=lambda case: {'after': case.shopping_list.items.last().pk}, status=PRIVATE),
+    Route('shopping-list-item-bulk', 'post', data=lambda case: {'operations': [
+        {'op': 'create', 'shopping_list': case.shopping_list.pk,
+         'data': {'ingredient_name': 'sel', 'quantity': '1.00', 'category_id': case.ingredient_category.pk}},
+        {'op': 'update', 'id': case.shopping_list_item.pk, 'data': {'is_checked': True}},
+        {'op': 'delete', 'id': case.shopping_list.items.latest('pk').pk},
+    ]}, status=PRIVATE),
+    Route('menu-list', status=PRIVATE),
+    Route('menu-detail', kwargs=pk('menu'), status=PRIVATE),
+    Route('menu-add-recipe', 'post', kwargs=pk('menu'),
+          data=lambda case: {'recipe_id': case.other_recipe.pk, 'date': str(case.menu.start_date),
+                             'meal_type': 'lunch'}, status=(401, 201)),
+    Route('menu-autofill', 'post', kwargs=pk('menu'), data={}, status=PRIVATE),
+    Route('register', 'post', data={'username': 'nouveau', 'email': 'nouveau@exemple.com',
+                                    'password': 'Xy7!motdepasse', 'password2': 'Xy7!motdepasse'}, status=201),
+    Route('token_obtain_pair', 'post', data=lambda case: {'username': case.user.username, 'password': PASSWORD}),
+    Route('token_refresh', 'post', data=lambda case: {'refresh': str(RefreshToken.for_user(case.user))}),
+    Route('password-reset', 'post', data=lambda case: {'email': case.user.email}),
+    Route('password-reset-confirm', 'post',
+          data=lambda case: {'token': case.reset_token(), 'password': 'Xy7!motdepasse'}),
+    Route('password-reset-validate-token', 'post', data=lambda case: {'token': case.reset_token()}),
+    Route('social-auth-callback', status=302),
+    Route('statistics', status=PRIVATE),
+    Route('async-recipe-list'),
+    Route('async-recipe-list', query='?facets=1&difficulty=2&total_time=30-60'),
+    Route('async-recipe-history', status=PRIVATE),
+    Route('async-recipe-detail', kwargs=pk('recipe')),
+    Route('async-recipe-category-list'),
+    Route('async-reference-data'),
+    Route('async-statistics', status=PRIVATE),
+]
+
+
+def url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+def format_queries(queries):
+    return '\n'.join(f"  {i}. {query['sql']}" for i, query in enumerate(queries, 1))
+
+
+def reset_process_caches():
+    """Caches propres au processus : ils survivraient au rollback de chaque test"""
+    reference_data.reset()
+    suggest.reset()
+    documents.reset()
+    user_cache.invalidate()
+    cache.clear()
+
+
+@override_settings(
+    ASYNC_PARALLEL_QUERIES=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    # Les versions des données de référence ne doivent pas expirer en cours de mesure
+    REFERENCE_DATA_TTL=3600,
+    # Pas de thread de relecture de l'index des suggestions pendant les mesures
+    SUGGEST_REFRESH_SECONDS=0,
+)
+class QueryCountRegressionTests(TestCase):
+    """Nombre de requêtes constant et latence bornée, pour chaque route"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.created = 0
+        self.category = RecipeCategory.objects.create(name='Plat principal')
+        self.ingredient_category = IngredientCategory.objects.create(name='Légumes')
+        self.restriction = DietaryRestriction.objects.create(name='Végétarien')
+        self.allergy = Allergy.objects.create(name='Arachide')
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.author = User.objects.create_user('auteur', 'auteur@exemple.com', PASSWORD)
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.profile.dietary_restrictions.add(self.restriction)
+        self.profile.allergies.add(self.allergy)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.grow(SMALL)
+        self.recipe = Recipe.objects.filter(author=self.author).earliest('pk')
+        self.other_recipe = Recipe.objects.filter(author=self.user).earliest('pk')
+        self.menu = Menu.objects.filter(user=self.user).earliest('pk')
+        self.shopping_list = ShoppingList.objects.filter(user=self.user).earliest('pk')
+        self.shopping_list_item = self.shopping_list.items.earliest('pk')
+
+    def grow(self, size):
+        """Complète le jeu de données jusqu'à `size` objets de chaque sorte"""
+        start, self.created = self.created, size
+        today = date.today()
+        for i in range(start, size):
+            user = User.objects.create_user(f'membre{i}', f'membre{i}@exemple.com', PASSWORD)
+            profile = UserProfile.objects.create(user=user)
+            profile.dietary_restrictions.add(self.restriction)
+            profile.allergies.add(self.allergy)
+            for author in (self.author, self.user):
+                recipe = Recipe.objects.create(
+                    author=author, title=f'Poulet yassa {author.username} {i}', description='Recette',
+                    category=self.category, prep_time=10, cook_time=30, servings=4,
+                    instructions='Cuire.', tags=['familial'],
+                )
+                Ingredient.objects.bulk_create([
+                    Ingredient(recipe=recipe, name=name, quantity=Decimal(100), unit='g',
+                               category=self.ingredient_category, order=order, rank=rank)
+                    for order, (name, rank) in enumerate(zip(['oignon', 'poulet', 'citron'], spread(3)))
+                ])
+                RecipeImage.objects.create(recipe=recipe, image=f'recipes/images/{recipe.pk}.jpg')
+            FavoriteRecipe.objects.create(user=self.user, recipe=recipe)
+            RecipeView.objects.create(user=self.user, recipe=recipe, ip_address='127.0.0.1')
+            menu = Menu.objects.create(user=self.user, name=f'Semaine {i}', start_date=today,
+                                       end_date=today + timedelta(days=6))
+            MenuRecipe.objects.create(menu=menu, recipe=recipe, date=today, meal_type='dinner')
+            shopping_list = ShoppingList.objects.create(user=self.user, name=f'Courses {i}')
+            ShoppingListItem.objects.bulk_create([
+                ShoppingListItem(shopping_list=shopping_list, ingredient_name=name, quantity=Decimal(1),
+                                 unit='kg', category=self.ingredient_category, order=order, rank=rank)
+                for order, (name, rank) in enumerate(zip(['riz', 'tomate'], spread(2)))
+            ])
+        Recipe.objects.update(views_count=size, favorites_count=1)
+
+    def reset_token(self):
+        """Jeton de réinitialisation valide (consommé par password-reset-confirm)"""
+        return ResetPasswordToken.objects.create(user=self.user).key
+
+    def call(self, route, authenticated):
+        """
+        Appelle la route sur des caches de processus chauds (régime établi d'un
+        worker), dans une transaction annulée : les écritures ne s'accumulent pas.
+        Renvoie (réponse, requêtes SQL, durée en ms).
+        """
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'} if authenticated else {}
+        if authenticated:
+            user_cache.set(self.user.pk, User.objects.get(pk=self.user.pk))
+        reference_data.get_snapshots()
+        suggest.get_index()
+        documents.build_documents(Recipe.objects.values_list('pk', flat=True))
+        path = route.path(self)
+        data = route.resolve(route.data, self)
+        with transaction.atomic():
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(self.client, route.method)(path, data, content_type='application/json', **headers)
+                elapsed = (time.perf_counter() - start) * 1000
+            transaction.set_rollback(True)
+        reset_process_caches()
+        self.assertEqual(
+            response.status_code, route.expected_status(authenticated),
+            f"{route} ({'authentifié' if authenticated else 'anonyme'}) : HTTP {response.status_code}\n"
+            f"{response.content[:500]!r}"
+        )
+        return response, list(queries), elapsed
+
+    def test_every_route_is_covered(self):
+        covered = {route.name for route in ROUTES}
+        missing = sorted(set(url_names(urls.urlpatterns)) - covered)
+        self.assertFalse(missing, f"Routes sans test de performance : {', '.join(missing)}")
+
+    def test_query_count_is_constant_and_latency_bounded(self):
+        modes = (False, True)
+        small = {(i, mode): self.call(route, mode)[1] for i, route in enumerate(ROUTES) for mode in modes}
+        self.grow(LARGE)
+        for i, route in enumerate(ROUTES):
+            for authenticated in modes:
+                label = f"{route} ({'authentifié' if authenticated else 'anonyme'})"
+                with self.subTest(route=label):
+                    response, queries, elapsed = self.call(route, authenticated)
+                    before = small[i, authenticated]
+                    self.assertEqual(
+                        len(queries), len(before),
+                        f"{label} : {len(before)} requêtes pour {SMALL} objet(s), {len(queries)} pour {LARGE}\n"
+                        f"--- {SMALL} :\n{format_queries(before)}\n--- {LARGE} :\n{format_queries(queries)}"
+                    )
+                    ceiling = CEILINGS_MS.get(route.name, DEFAULT_CEILING_MS) * CEILING_SCALE
+                    self.assertLess(
+                        elapsed, ceiling,
+                        f"{label} : {elapsed:.0f} ms > {ceiling:.0f} ms\n{format_queries(queries)}"
+                    )
+
+
+class ShoppingListSyncTests(TestCase):
+    """Synchronisation différentielle des listes de courses (sync.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.shopping_list = ShoppingList.objects.create(user=self.user, name='Courses')
+        self.rice = ShoppingListItem.objects.create(shopping_list=self.shopping_list, ingredient_name='riz',
+                                                    quantity=Decimal(1), unit='kg')
+        self.tomato = ShoppingListItem.objects.create(shopping_list=self.shopping_list, ingredient_name='tomate',
+                                                      quantity=Decimal(2), unit='kg')
+        self.path = reverse('shopping-list-sync', kwargs={'pk': self.shopping_list.pk})
+
+    def get(self, since=None):
+        response = self.client.get(self.path, {} if since is None else {'since': since}, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def post(self, changes, since=None):
+        response = self.client.post(self.path, {'since': since, 'changes': changes},
+                                    content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_deletions_are_sent_as_tombstones(self):
+        token = self.get()['token']
+        tomato_pk = self.tomato.pk
+        self.tomato.delete()
+        data = self.post([{'op': 'delete', 'id': self.rice.pk, 'modified_at': '2030-01-01T10:00:00Z'}], token)
+        self.assertEqual(data['results'][0]['status'], 'applied')
+        self.assertFalse(data['full'])
+        self.assertEqual(data['items'], [])
+        self.assertEqual(sorted(data['deleted']), sorted([self.rice.pk, tomato_pk]))
+        # Une modification d'un item supprimé ne le recrée pas
+        data = self.post([{'op': 'upsert', 'id': self.rice.pk, 'modified_at': '2030-01-02T10:00:00Z',
+                           'data': {'is_checked': True}}], data['token'])
+        self.assertEqual(data['results'][0]['status'], 'deleted')
+        self.assertFalse(ShoppingListItem.objects.filter(pk=self.rice.pk).exists())
+
+    def test_forgotten_tombstones_fall_back_to_full_list(self):
+        token = self.get()['token']
+        self.tomato.delete()
+        ShoppingListTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=365))
+        sync.prune_tombstones(self.shopping_list.pk, 'default')
+        self.assertFalse(ShoppingListTombstone.objects.exists())
+        data = self.get(token)
+        self.assertTrue(data['full'])
+        self.assertEqual([item['id'] for item in data['items']], [self.rice.pk])
+        # Un client à jour reste en différentiel
+        self.assertFalse(self.get(data['token'])['full'])
+
+    def test_last_writer_wins(self):
+        updated_at = ShoppingListItem.objects.get(pk=self.rice.pk).updated_at
+        earlier = (updated_at - timedelta(minutes=5)).isoformat()
+        later = (updated_at + timedelta(minutes=5)).isoformat()
+        data = self.post([{'op': 'upsert', 'id': self.rice.pk, 'modified_at': earlier, 'data': {'unit': 'g'}}])
+        self.assertEqual(data['results'][0]['status'], 'conflict')
+        self.assertEqual(ShoppingListItem.objects.get(pk=self.rice.pk).unit, 'kg')
+        data = self.post([{'op': 'upsert', 'id': self.rice.pk, 'modified_at': later, 'data': {'unit': 'g'}}])
+        self.assertEqual(data['results'][0]['status'], 'applied')
+        self.assertEqual(ShoppingListItem.objects.get(pk=self.rice.pk).unit, 'g')
+
+    def test_replayed_creation_is_idempotent(self):
+        change = {'op': 'upsert', 'client_id': 'hors-ligne-1', 'modified_at': '2030-01-01T10:00:00Z',
+                  'data': {'ingredient_name': 'sel', 'quantity': '1.00'}}
+        first = self.post([change])['results'][0]
+        # Réponse perdue : le client renvoie la même modification
+        second = self.post([change])['results'][0]
+        self.assertEqual(first['status'], 'applied')
+        self.assertEqual(second['status'], 'applied')
+        self.assertEqual(first['id'], second['id'])
+        self.assertEqual(ShoppingListItem.objects.filter(client_id='hors-ligne-1').count(), 1)
+
+
+class ShoppingListBulkTests(TestCase):
+    """Opérations groupées sur les items de listes de courses (bulk.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.shopping_list = ShoppingList.objects.create(user=self.user, name='Courses')
+        self.rice, self.tomato, self.onion = (
+            ShoppingListItem.objects.create(shopping_list=self.shopping_list, ingredient_name=name,
+                                            quantity=Decimal(1), unit='kg')
+            for name in ('riz', 'tomate', 'oignon')
+        )
+        other = User.objects.create_user('voisin', 'voisin@exemple.com', PASSWORD)
+        other_list = ShoppingList.objects.create(user=other, name='Courses')
+        self.other_item = ShoppingListItem.objects.create(shopping_list=other_list, ingredient_name='sel',
+                                                          quantity=Decimal(1), unit='kg')
+        self.path = reverse('shopping-list-item-bulk')
+
+    def post(self, operations):
+        return self.client.post(self.path, {'operations': operations}, content_type='application/json',
+                                **self.headers)
+
+    def test_mixed_batch(self):
+        response = self.post([
+            {'op': 'create', 'shopping_list': self.shopping_list.pk,
+             'data': {'ingredient_name': 'lait', 'quantity': '1', 'unit': 'l'}},
+            {'op': 'update', 'id': self.rice.pk, 'data': {'is_checked': True}},
+            {'op': 'delete', 'id': self.tomato.pk},
+            {'op': 'delete', 'id': self.onion.pk},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([(result['op'], result['status']) for result in results],
+                         [('create', 'ok'), ('update', 'ok'), ('delete', 'ok'), ('delete', 'ok')])
+        created = ShoppingListItem.objects.get(ingredient_name='lait')
+        self.assertEqual(results[0]['id'], created.pk)
+        self.assertEqual(results[0]['item']['ingredient_name'], 'lait')
+        self.assertTrue(results[1]['item']['is_checked'])
+        self.assertEqual([result['id'] for result in results[2:]], [self.tomato.pk, self.onion.pk])
+        self.assertTrue(ShoppingListItem.objects.get(pk=self.rice.pk).is_checked)
+        self.assertFalse(ShoppingListItem.objects.filter(pk__in=[self.tomato.pk, self.onion.pk]).exists())
+        # Une tombstone par item supprimé, à la révision du lot
+        tombstones = ShoppingListTombstone.objects.filter(shopping_list=self.shopping_list)
+        self.assertEqual(sorted(tombstones.values_list('item_id', flat=True)), sorted([self.tomato.pk, self.onion.pk]))
+        self.assertEqual({tombstone.revision for tombstone in tombstones}, {created.revision})
+
+    def test_other_users_item_is_not_found(self):
+        missing_pk = ShoppingListItem.objects.order_by('pk').last().pk + 1
+        results = {}
+        for pk in (self.other_item.pk, missing_pk):
+            response = self.post([
+                {'op': 'update', 'id': self.rice.pk, 'data': {'is_checked': True}},
+                {'op': 'delete', 'id': self.tomato.pk},
+                {'op': 'delete', 'id': pk},
+            ])
+            self.assertEqual(response.status_code, 400)
+            results[pk] = response.json()['results']
+        self.assertEqual(results[self.other_item.pk][2], {'op': 'delete', 'id': self.other_item.pk,
+                                                          'status': 'error', 'errors': {'id': 'Item introuvable.'}})
+        self.assertEqual(results[missing_pk][2]['errors'], results[self.other_item.pk][2]['errors'])
+        self.assertEqual([result['status'] for result in results[missing_pk][:2]], ['skipped', 'skipped'])
+        # Rien n'est appliqué
+        self.assertFalse(ShoppingListItem.objects.get(pk=self.rice.pk).is_checked)
+        self.assertEqual(ShoppingListItem.objects.filter(pk__in=[self.tomato.pk, self.other_item.pk]).count(), 2)
+        self.assertFalse(ShoppingListTombstone.objects.exists())
+
+
+class RankingTests(SimpleTestCase):
+    """Clés de rang fractionnaires (ranking.py)"""
+
+    def assertBetween(self, lower, upper):
+        key = key_between(lower, upper)
+        self.assertLess(lower, key)
+        if upper is not None:
+            self.assertLess(key, upper)
+        self.assertFalse(key.endswith('0'), key)
+        return key
+
+    def test_key_between_neighbours(self):
+        for lower, upper in [('', None), ('', '1'), ('1', '2'), ('1', '11'), ('az', 'b'),
+                             ('h', 'h01'), ('zz', None), ('', '001'), ('y', 'z')]:
+            with self.subTest(lower=lower, upper=upper):
+                self.assertBetween(lower, upper)
+
+    def test_key_between_rejects_unordered_bounds(self):
+        for lower, upper in [('b', 'a'), ('b', 'b')]:
+            with self.subTest(lower=lower, upper=upper), self.assertRaises(ValueError):
+                key_between(lower, upper)
+
+    def test_appends_and_prepends_grow_slowly(self):
+        keys = ['']
+        for _ in range(100):
+            keys.append(self.assertBetween(keys[-1], None))
+        self.assertEqual(keys[1:4], ['i', 'j', 'k'])
+        self.assertLessEqual(len(keys[-1]), 6)
+        head = keys[1]
+        for _ in range(100):
+            head = self.assertBetween('', head)
+        self.assertLessEqual(len(head), 7)
+
+    def test_repeated_insertions_at_same_place(self):
+        lower, upper = '1', '2'
+        for _ in range(200):
+            upper = self.assertBetween(lower, upper)
+
+    def test_spread(self):
+        for count in [0, 1, 2, 35, 36, 1000]:
+            with self.subTest(count=count):
+                keys = spread(count)
+                self.assertEqual(len(keys), count)
+                self.assertEqual(keys, sorted(set(keys)))
+                self.assertTrue(all(key and not key.endswith('0') for key in keys))
+                if keys:
+                    # Place libre aux extrémités et entre deux clés
+                    self.assertBetween('', keys[0])
+                    self.assertBetween(keys[-1], None)
+                    for lower, upper in zip(keys, keys[1:]):
+                        self.assertBetween(lower, upper)
+
+
+def image_file(name='photo.png', color='red', size=(4, 4), format='PNG'):
+    """Petite image envoyable (contenu différent pour chaque couleur)"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{format.lower()}')
+
+
+class MediaRootMixin:
+    """MEDIA_ROOT temporaire, vidé après chaque test"""
+
+    def setUp(self):
+        super().setUp()
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def bearer(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+class MediaAccessTests(MediaRootMixin, TestCase):
+    """Contrôle d'accès et envoi des fichiers media (media.py)"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user('auteur', 'auteur@exemple.com', PASSWORD)
+        self.other = User.objects.create_user('voisin', 'voisin@exemple.com', PASSWORD)
+        self.recipe = Recipe.objects.create(
+            author=self.author, title='Brouillon', description='Recette', prep_time=10, cook_time=30,
+            servings=4, instructions='Cuire.', is_published=False,
+        )
+        self.image = RecipeImage(recipe=self.recipe)
+        self.image.image.save('photo.png', image_file())
+        self.url = self.image.image.url
+
+    def signed(self, expires=None, signature=None):
+        owner = self.author.pk
+        expires = media.signature_expiry() if expires is None else expires
+        signature = signature or media.signature(self.image.image.name, owner, expires)
+        return f"{self.url}?{urlencode({'owner': owner, 'expires': expires, 'signature': signature})}"
+
+    def test_unpublished_image_is_private(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(self.url, **self.bearer(self.other)).status_code, 404)
+        response = self.client.get(self.url, **self.bearer(self.author))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_serializer_emits_signed_url(self):
+        response = self.client.get(reverse('recipe-detail', kwargs={'pk': self.recipe.pk}), **self.bearer(self.author))
+        url = urlsplit(response.json()['images'][0]['image'])
+        self.assertEqual(url.path, self.url)
+        self.assertEqual(parse_qs(url.query)['owner'], [str(self.author.pk)])
+        # Chargée par <img src>, sans en-tête Authorization
+        self.assertEqual(self.client.get(f'{url.path}?{url.query}').status_code, 200)
+
+    def test_tampered_or_expired_signature_is_refused(self):
+        self.assertEqual(self.client.get(self.signed()).status_code, 200)
+        self.assertEqual(self.client.get(self.signed(signature='falsifiee')).status_code, 404)
+        expired = int(time.time()) - 1
+        self.assertEqual(self.client.get(self.signed(expires=expired)).status_code, 404)
+        # Signature d'une autre image
+        other = media.signature('images/autre.png', self.author.pk, media.signature_expiry())
+        self.assertEqual(self.client.get(self.signed(signature=other)).status_code, 404)
+
+    def test_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3', **self.bearer(self.author))
+        self.assertEqual(response.status_code, 206)
+        with open(self.image.image.path, 'rb') as file:
+            self.assertEqual(b''.join(response.streaming_content), file.read(4))
+        self.assertEqual(response['Content-Range'], f'bytes 0-3/{self.image.image.size}')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_deleted_recipe_image_is_hidden(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(is_published=True)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        soft_delete_recipe(Recipe.objects.get(pk=self.recipe.pk))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(self.url, **self.bearer(self.author)).status_code, 404)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_accel_redirect(self):
+        response = self.client.get(self.url, **self.bearer(self.author))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.image.image.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class DeferredDeletionTests(TestCase):
+    """Suppression différée et purge par lots (purge.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.author = User.objects.create_user('auteur', 'auteur@exemple.com', PASSWORD)
+        self.reader = User.objects.create_user('lecteur', 'lecteur@exemple.com', PASSWORD)
+        self.recipe = self.create_recipe(self.author, 'Mafé')
+        self.other_recipe = self.create_recipe(self.reader, 'Thiéboudienne')
+        # Favoris croisés, vues, menu et liste du lecteur référençant la recette de l'auteur
+        self.favorite(self.author, self.other_recipe)
+        self.favorite(self.reader, self.recipe)
+        # Second favori : une correction appliquée deux fois serait visible (compteur borné à 0)
+        self.fan = User.objects.create_user('fan', 'fan@exemple.com', PASSWORD)
+        self.favorite(self.fan, self.other_recipe)
+        RecipeView.objects.create(recipe=self.recipe, user=self.reader, ip_address='127.0.0.1')
+        RecipeView.objects.create(recipe=self.other_recipe, user=self.author, ip_address='127.0.0.1')
+        self.menu = Menu.objects.create(user=self.reader, name='Semaine', start_date=date.today(),
+                                        end_date=date.today())
+        MenuRecipe.objects.create(menu=self.menu, recipe=self.recipe, date=date.today(), meal_type='dinner')
+
+    def create_recipe(self, author, title):
+        recipe = Recipe.objects.create(
+            author=author, title=title, description='Recette', prep_time=10, cook_time=30,
+            servings=4, instructions='Cuire.',
+        )
+        Ingredient.objects.bulk_create([
+            Ingredient(recipe=recipe, name=name, quantity=Decimal(100), unit='g', rank=rank)
+            for name, rank in zip(['arachide', 'boeuf', 'riz'], spread(3))
+        ])
+        return recipe
+
+    def favorite(self, user, recipe):
+        response = self.client.post(reverse('recipe-favorite', kwargs={'pk': recipe.pk}),
+                                    **self.bearer(user))
+        self.assertEqual(response.status_code, 200)
+
+    def bearer(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    def test_soft_deleted_recipe_is_hidden(self):
+        soft_delete_recipe(self.recipe)
+        response = self.client.get(reverse('recipe-detail', kwargs={'pk': self.recipe.pk}))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('recipe-detail', kwargs={'pk': self.recipe.pk}),
+                                   **self.bearer(self.author))
+        self.assertEqual(response.status_code, 404)
+        ids = [recipe['id'] for recipe in self.client.get(reverse('recipe-list')).json()['results']]
+        self.assertEqual(ids, [self.other_recipe.pk])
+
+    def test_soft_deleted_user_is_refused(self):
+        headers = self.bearer(self.author)
+        self.assertEqual(self.client.get(reverse('user-me'), **headers).status_code, 200)
+        soft_delete_user(self.author)
+        self.assertEqual(self.client.get(reverse('user-me'), **headers).status_code, 401)
+        self.assertFalse(Recipe.objects.filter(author=self.author).exists())
+
+    def assertPurged(self):
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Recipe.all_objects.filter(author_id=self.author.pk).exists())
+        self.assertFalse(Ingredient.objects.filter(recipe_id=self.recipe.pk).exists())
+        self.assertFalse(FavoriteRecipe.objects.filter(Q(user_id=self.author.pk) | Q(recipe_id=self.recipe.pk)).exists())
+        self.assertFalse(RecipeView.objects.filter(Q(user_id=self.author.pk) | Q(recipe_id=self.recipe.pk)).exists())
+        self.assertFalse(MenuRecipe.objects.filter(recipe_id=self.recipe.pk).exists())
+        # Le contenu du lecteur est conservé ; son compteur de favoris est corrigé une seule fois
+        self.assertTrue(Menu.objects.filter(pk=self.menu.pk).exists())
+        self.assertEqual(Ingredient.objects.filter(recipe=self.other_recipe).count(), 3)
+        self.assertEqual(RecipeView.objects.filter(recipe=self.other_recipe).count(), 0)
+        self.assertEqual(Recipe.objects.get(pk=self.other_recipe.pk).favorites_count, 1)
+
+    def test_purge_removes_dependents_and_fixes_counters(self):
+        self.assertEqual(Recipe.objects.get(pk=self.other_recipe.pk).favorites_count, 2)
+        soft_delete_user(self.author)
+        deleted = purge_deleted(batch_size=2)
+        self.assertPurged()
+        self.assertEqual(deleted['mesrecettes.Ingredient'], 3)
+        self.assertEqual(deleted['mesrecettes.FavoriteRecipe'], 2)
+        self.assertEqual(deleted['mesrecettes.User'], 1)
+
+    def test_interrupted_purge_resumes(self):
+        soft_delete_user(self.author)
+        release_row_files = purge.release_row_files
+        calls = []
+
+        def interrupt(model, pks, using):
+            calls.append(model)
+            if model is User:
+                raise KeyboardInterrupt
+            release_row_files(model, pks, using)
+
+        with mock.patch.object(purge, 'release_row_files', interrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                purge_deleted(batch_size=1)
+        # Interrompue avant le DELETE de l'utilisateur, ses dépendances déjà supprimées
+        self.assertEqual(calls.count(FavoriteRecipe), 2)
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Recipe.all_objects.filter(pk=self.recipe.pk).exists())
+        self.assertFalse(FavoriteRecipe.objects.filter(user_id=self.author.pk).exists())
+        self.assertEqual(Recipe.objects.get(pk=self.other_recipe.pk).favorites_count, 1)
+        deleted = purge_deleted(batch_size=1)
+        self.assertEqual(dict(deleted), {'mesrecettes.User': 1})
+        self.assertPurged()
+
+
+class ImageUploadTests(MediaRootMixin, TestCase):
+    """Réception, partage et balayage des images (uploads.py, fields.py)"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+
+    def post(self, image, title='Yassa'):
+        return self.client.post(reverse('recipe-list'), {
+            'title': title, 'description': 'Recette', 'instructions': 'Cuire.', 'prep_time': 10,
+            'cook_time': 30, 'servings': 4, 'main_image': image,
+        }, **self.bearer(self.user))
+
+    def stored_files(self):
+        return [
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(settings.MEDIA_ROOT) for name in names
+        ]
+
+    def test_same_content_is_stored_once(self):
+        self.assertEqual(self.post(image_file(), 'Yassa').status_code, 201)
+        self.assertEqual(self.post(image_file('autre-nom.png'), 'Mafé').status_code, 201)
+        names = set(Recipe.objects.values_list('main_image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(self.post(image_file(color='blue'), 'Thiéboudienne').status_code, 201)
+        self.assertEqual(len(self.stored_files()), 2)
+
+    def test_sweep_keeps_referenced_files(self):
+        self.post(image_file(), 'Yassa')
+        self.post(image_file(), 'Mafé')
+        first, second = Recipe.objects.order_by('pk')
+        path = first.main_image.path
+        soft_delete_recipe(first)
+        purge_deleted()
+        # Encore référencé par la seconde recette
+        self.assertEqual(uploads.sweep_released_files(grace=0), 0)
+        self.assertTrue(os.path.exists(path))
+        soft_delete_recipe(second)
+        purge_deleted()
+        # Délai de grâce : un envoi concurrent peut encore réutiliser le fichier
+        self.assertEqual(uploads.sweep_released_files(), 0)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(uploads.sweep_released_files(grace=0), 1)
+        self.assertFalse(os.path.exists(path))
+
+    def test_replaced_image_is_released(self):
+        self.post(image_file(), 'Yassa')
+        recipe = Recipe.objects.get()
+        path = recipe.main_image.path
+        recipe.main_image.save('nouvelle.png', image_file(color='blue'))
+        self.assertEqual(uploads.sweep_released_files(grace=0), 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(Recipe.objects.get().main_image.path))
+
+    @override_settings(UPLOAD_MAX_REQUEST_SIZE=1024)
+    def test_oversized_request_is_refused_before_reading(self):
+        with mock.patch.object(uploads.ImageUploadHandler, 'receive_data_chunk') as receive:
+            response = self.post(image_file(size=(256, 256), format='BMP'))
+        self.assertEqual(response.status_code, 413)
+        receive.assert_not_called()
+        self.assertFalse(Recipe.objects.exists())
+
+    def assertFieldError(self, response, message):
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertIn(message, response.json()['main_image'][0])
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    @override_settings(UPLOAD_MAX_FILE_SIZE=1024)
+    def test_oversized_file_is_refused(self):
+        self.assertFieldError(self.post(image_file(size=(256, 256), format='BMP')), 'Fichier limité')
+
+    @override_settings(UPLOAD_MAX_DIMENSION=100)
+    def test_too_many_pixels_are_refused(self):
+        self.assertFieldError(self.post(image_file(size=(101, 1))), 'Image limitée à 100 pixels')
+
+    def test_non_image_is_refused(self):
+        self.assertFieldError(self.post(SimpleUploadedFile('photo.png', b'pas une image' * 100)), 'invalide')
+
+
+class UserCacheTests(TestCase):
+    """Cache des utilisateurs authentifiés par JWT (authentication.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def get_me(self):
+        return self.client.get(reverse('user-me'), **self.headers)
+
+    def database_reads(self, method='get', path=None, data=None):
+        """(réponse, nombre de lectures de l'utilisateur en base par l'authentification)"""
+        with mock.patch.object(JWTAuthentication, 'get_user', autospec=True,
+                               side_effect=JWTAuthentication.get_user) as get_user:
+            response = getattr(self.client, method)(path or reverse('user-me'), data,
+                                                    content_type='application/json', **self.headers)
+        return response, get_user.call_count
+
+    def test_safe_methods_read_from_cache(self):
+        self.assertEqual(self.database_reads(), (mock.ANY, 1))
+        response, reads = self.database_reads()
+        self.assertEqual((response.status_code, reads), (200, 0))
+
+    def test_unsafe_methods_reload_the_user(self):
+        self.get_me()
+        # Désactivation sans signal (update) : seul un rechargement la voit
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get_me().status_code, 200)
+        response, reads = self.database_reads('patch', reverse('user-update-me'), {'first_name': 'Awa'})
+        self.assertEqual((response.status_code, reads), (401, 1))
+
+    def test_saved_user_is_reloaded(self):
+        self.get_me()
+        self.user.first_name = 'Awa'
+        self.user.save()
+        self.assertIsNone(user_cache.get(self.user.pk))
+        self.assertEqual(self.get_me().json()['first_name'], 'Awa')
+
+    def test_deactivated_user_is_refused(self):
+        self.assertEqual(self.get_me().status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_deleted_user_is_refused(self):
+        self.assertEqual(self.get_me().status_code, 200)
+        self.user.delete()
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_password_change_revokes_cached_user(self):
+        # Les modules de simplejwt gardent leur objet api_settings : pas d'override_settings
+        with mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True):
+            self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+            self.assertEqual(self.get_me().status_code, 200)
+            self.user.set_password('Xy7!nouveau')
+            self.user.save()
+            self.assertIsNone(user_cache.get(self.user.pk))
+            self.assertEqual(self.get_me().status_code, 401)
+
+
+class ConditionalGetTests(TestCase):
+    """Réponses 304 et en-têtes de cache (conditional.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.category = RecipeCategory.objects.create(name='Plat principal')
+        # Fixtures validées (commit) : les modifications du test forment une nouvelle transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = Recipe.objects.create(
+                author=self.user, title='Yassa', description='Recette', category=self.category,
+                prep_time=10, cook_time=30, servings=4, instructions='Cuire.',
+            )
+            self.ingredient = Ingredient.objects.create(
+                recipe=self.recipe, name='oignon', quantity=Decimal(2), unit=''
+            )
+        self.shopping_list = ShoppingList.objects.create(user=self.user, name='Courses')
+
+    def get(self, path, etag=None, **headers):
+        if etag:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        return self.client.get(path, **headers)
+
+    def assertNotModified(self, path, **headers):
+        """304 au second appel, sans sérialisation ni document"""
+        etag = self.get(path, **headers)['ETag']
+        self.assertTrue(etag)
+        with mock.patch.object(serializers.Serializer, 'to_representation') as serialize, \
+                mock.patch.object(serializers.ListSerializer, 'to_representation') as serialize_list, \
+                mock.patch.object(ReferenceDataMixin, 'list_from_snapshot') as from_snapshot, \
+                mock.patch.object(documents, 'recipe_body') as recipe_body:
+            response = self.get(path, etag, **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        for handler in (serialize, serialize_list, from_snapshot, recipe_body):
+            handler.assert_not_called()
+        return etag
+
+    def test_recipe_detail_not_modified(self):
+        path = reverse('recipe-detail', kwargs={'pk': self.recipe.pk})
+        self.assertNotModified(path)
+        self.assertNotModified(path, **self.headers)
+        # La lecture est comptée même pour un 304
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).views_count, 4)
+
+    def test_reference_data_not_modified(self):
+        self.assertNotModified(reverse('recipe-category-list'))
+
+    def test_shopping_list_not_modified(self):
+        path = reverse('shopping-list-detail', kwargs={'pk': self.shopping_list.pk})
+        etag = self.assertNotModified(path, **self.headers)
+        ShoppingListItem.objects.create(shopping_list=self.shopping_list, ingredient_name='riz',
+                                        quantity=Decimal(1), unit='kg')
+        response = self.get(path, etag, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_recipe_etag_follows_ingredients_and_categories(self):
+        path = reverse('recipe-detail', kwargs={'pk': self.recipe.pk})
+        etag = self.get(path)['ETag']
+        self.ingredient.quantity = Decimal(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredient.save()
+        response = self.get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ingredients'][0]['quantity'], '3.00')
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+        self.category.name = 'Plat'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        response = self.get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['category']['name'], 'Plat')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_public_and_private_cache_headers(self):
+        path = reverse('recipe-detail', kwargs={'pk': self.recipe.pk})
+        anonymous = self.get(path)
+        self.assertIn('public', anonymous['Cache-Control'])
+        self.assertNotIn('Authorization', anonymous.get('Vary', ''))
+        authenticated = self.get(path, **self.headers)
+        self.assertIn('private', authenticated['Cache-Control'])
+        self.assertIn('Authorization', authenticated['Vary'])
+        categories = self.get(reverse('recipe-category-list'), **self.headers)
+        self.assertIn('public', categories['Cache-Control'])
+        self.assertIn(f'max-age={ReferenceDataMixin.cache_max_age}', categories['Cache-Control'])
+        self.assertNotIn('Authorization', categories.get('Vary', ''))
+        shopping_list = self.get(reverse('shopping-list-detail', kwargs={'pk': self.shopping_list.pk}), **self.headers)
+        self.assertIn('private', shopping_list['Cache-Control'])
+        self.assertIn('Authorization', shopping_list['Vary'])
+
+
+class RecipeDocumentTests(TestCase):
+    """Documents précalculés du détail des recettes (documents.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = Recipe.objects.create(
+                author=self.user, title='Yassa', description='Recette',
+                prep_time=10, cook_time=30, servings=4, instructions='Cuire.',
+            )
+            self.ingredient = Ingredient.objects.create(
+                recipe=self.recipe, name='oignon', quantity=Decimal(2), unit=''
+            )
+        self.path = reverse('recipe-detail', kwargs={'pk': self.recipe.pk})
+
+    def stored_body(self):
+        return bytes(RecipeDocument.objects.get(recipe=self.recipe).body)
+
+    def replace_ingredients(self, names):
+        return self.client.patch(
+            self.path, {'ingredients': [{'name': name, 'quantity': '1', 'unit': ''} for name in names]},
+            content_type='application/json', **self.headers
+        )
+
+    def ingredient_names(self):
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()['ingredients']]
+
+    def test_document_regenerated_at_commit(self):
+        self.assertIn(b'oignon', self.stored_body())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.replace_ingredients(['tomate']).status_code, 200)
+        self.assertIn(b'tomate', self.stored_body())
+        # Servi tel quel, sans nouvelle sérialisation
+        with mock.patch.object(documents, 'build_documents') as build:
+            self.assertEqual(self.ingredient_names(), ['tomate'])
+        build.assert_not_called()
+
+    def test_edited_recipe_never_serves_stale_document(self):
+        # Document pas encore régénéré (commit non exécuté) : l'empreinte ne correspond plus
+        self.assertEqual(self.replace_ingredients(['tomate']).status_code, 200)
+        self.assertIn(b'oignon', self.stored_body())
+        self.assertEqual(self.ingredient_names(), ['tomate'])
+
+    def test_change_outside_request_regenerates_document(self):
+        # Écriture hors requête (commande, shell) : régénérée au commit, sans request_finished
+        self.ingredient.name = 'poivron'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredient.save()
+        self.assertIn(b'poivron', self.stored_body())
+        self.assertEqual(self.ingredient_names(), ['poivron'])
+
+    def test_recipe_touched_once_per_transaction(self):
+        names = [f'ingrédient {index}' for index in range(20)]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.replace_ingredients(names).status_code, 200)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "mesrecettes_recipe"')]
+        self.assertEqual(len(updates), 1, updates)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.ingredient_names(), names)
+
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            for ingredient in Ingredient.objects.filter(recipe=self.recipe):
+                ingredient.quantity = Decimal(2)
+                ingredient.save()
+        touches = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "mesrecettes_recipe"')]
+        self.assertEqual(len(touches), 1, touches)
+
+    def test_rolled_back_change_touches_again(self):
+        updated_at = Recipe.objects.get(pk=self.recipe.pk).updated_at
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.ingredient.save()
+            raise RuntimeError
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).updated_at, updated_at)
+        self.ingredient.save()
+        self.assertGreater(Recipe.objects.get(pk=self.recipe.pk).updated_at, updated_at)
+
+
+class MenuPlannerTests(TestCase):
+    """Remplissage automatique des menus (planner.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.start = date(2030, 1, 7)
+
+    def recipe(self, title, minutes=30, price='5', tags=(), ingredient='riz', **fields):
+        recipe = Recipe.objects.create(
+            author=self.user, title=title, description='Recette', prep_time=minutes, cook_time=0,
+            servings=2, instructions='Cuire.', tags=list(tags), **fields
+        )
+        Ingredient.objects.create(recipe=recipe, name=ingredient, quantity=Decimal(1), unit='',
+                                  estimated_price=Decimal(price))
+        return recipe
+
+    def autofill(self, days, **params):
+        menu = Menu.objects.create(user=self.user, name='Semaine', start_date=self.start,
+                                   end_date=self.start + timedelta(days=days - 1))
+        params.setdefault('meal_types', ['dinner'])
+        params.setdefault('seed', 1)
+        response = self.client.post(reverse('menu-autofill', kwargs={'pk': menu.pk}), params,
+                                    content_type='application/json', **self.headers)
+        return menu, response
+
+    def entries(self, menu):
+        return list(MenuRecipe.objects.filter(menu=menu).select_related('recipe').order_by('date', 'meal_type'))
+
+    def test_allergies_and_diets_are_excluded(self):
+        profile = UserProfile.objects.create(user=self.user)
+        profile.allergies.add(Allergy.objects.create(name='arachide'))
+        profile.dietary_restrictions.add(DietaryRestriction.objects.create(name='vegetarien'))
+        allowed = {self.recipe(f'Légumes {index}', tags=['vegetarien']).pk for index in range(2)}
+        self.recipe('Mafé', tags=['vegetarien'], ingredient='pâte d\'arachide')
+        self.recipe('Satay', tags=['vegetarien', 'arachide'])
+        self.recipe('Poulet rôti', tags=['viande'])
+        menu, response = self.autofill(4, no_repeat_days=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 4)
+        self.assertEqual({entry.recipe_id for entry in self.entries(menu)}, allowed)
+
+    def test_no_repeat_within_window(self):
+        for index in range(3):
+            self.recipe(f'Plat {index}')
+        menu, response = self.autofill(7, no_repeat_days=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['unfilled'], [])
+        last_day = {}
+        for entry in self.entries(menu):
+            if entry.recipe_id in last_day:
+                self.assertGreater((entry.date - last_day[entry.recipe_id]).days, 2)
+            last_day[entry.recipe_id] = entry.date
+        # Plus de créneaux que de recettes hors fenêtre : créneaux laissés vides
+        menu, response = self.autofill(5, no_repeat_days=7)
+        self.assertEqual(response.json()['created'], 3)
+        self.assertEqual(len(response.json()['unfilled']), 2)
+
+    def test_daily_time_cap(self):
+        self.recipe('Rapide', minutes=20)
+        self.recipe('Moyen', minutes=40)
+        self.recipe('Long', minutes=90)
+        menu, response = self.autofill(3, meal_types=['lunch', 'dinner'], max_daily_time=60, no_repeat_days=0)
+        self.assertEqual(response.status_code, 200)
+        daily = {}
+        for entry in self.entries(menu):
+            daily[entry.date] = daily.get(entry.date, 0) + entry.recipe.total_time
+        self.assertTrue(daily)
+        self.assertLessEqual(max(daily.values()), 60)
+        self.assertNotIn('Long', {entry.recipe.title for entry in self.entries(menu)})
+
+    def test_budget(self):
+        self.recipe('Homard', price='40')
+        self.recipe('Lentilles', price='3')
+        self.recipe('Pâtes', price='2')
+        menu, response = self.autofill(5, budget='20', no_repeat_days=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 5)
+        total = sum(entry.recipe.ingredients.get().estimated_price for entry in self.entries(menu))
+        self.assertLessEqual(total, Decimal('20'))
+
+    @override_settings(MENU_MAX_DAYS=7)
+    def test_menu_max_days(self):
+        self.recipe('Plat')
+        response = self.client.post(reverse('menu-list'), {
+            'name': 'Mois', 'start_date': '2030-01-07', 'end_date': '2030-01-14',
+        }, content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('end_date', response.json())
+        # Menu antérieur à la limite : pas de planification sur toute sa période
+        menu, response = self.autofill(8)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MenuRecipe.objects.filter(menu=menu).exists())
+        menu, response = self.autofill(7, no_repeat_days=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 7)
+
+
+@override_settings(SUGGEST_REFRESH_SECONDS=0)
+class RecipeFacetsTests(TestCase):
+    """Facettes de la liste des recettes (facets.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.main = RecipeCategory.objects.create(name='Plat principal')
+        self.dessert = RecipeCategory.objects.create(name='Dessert')
+        for title, category, difficulty, servings in [
+            ('Yassa', self.main, 1, 4), ('Mafé', self.main, 1, 4), ('Thiéboudienne', self.main, 2, 4),
+            ('Domoda', self.main, 3, 4), ('Soupe kandia', self.main, 2, 1), ('Thiakry', self.dessert, 1, 4),
+        ]:
+            Recipe.objects.create(
+                author=self.user, title=title, description='Recette', category=category,
+                difficulty=difficulty, prep_time=10, cook_time=30, servings=servings, instructions='Cuire.',
+            )
+
+    def facets(self, **params):
+        response = self.client.get(reverse('recipe-list'), {'facets': '1', **params})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data['count'], {
+            facet: {entry['value']: entry['count'] for entry in entries}
+            for facet, entries in data['facets'].items()
+        }
+
+    def test_facet_ignores_its_own_filter(self):
+        count, facets = self.facets(difficulty=1, category=self.main.pk, min_servings=2)
+        self.assertEqual(count, 2)
+        # Autres difficultés comptées dans la catégorie, avec min_servings (Soupe kandia exclue)
+        self.assertEqual(facets['difficulty'], {1: 2, 2: 1, 3: 1, 4: 0, 5: 0})
+        # Autres catégories comptées avec difficulty=1
+        self.assertEqual(facets['category'], {self.main.pk: 2, self.dessert.pk: 1})
+        self.assertEqual(sum(facets['estimated_cost'].values()), count)
+
+    def test_facets_without_filters(self):
+        count, facets = self.facets()
+        self.assertEqual(count, 6)
+        self.assertEqual(facets['difficulty'], {1: 3, 2: 2, 3: 1, 4: 0, 5: 0})
+        self.assertEqual(facets['category'], {self.main.pk: 5, self.dessert.pk: 1})
+
+
+@override_settings(SUGGEST_REFRESH_SECONDS=0)
+class SuggestTests(TestCase):
+    """Suggestions de saisie (suggest.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.user = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.brulee, self.caramel, self.anglaise, self.chantilly = (
+            Recipe.objects.create(
+                author=self.user, title=title, description='Recette', prep_time=10, cook_time=30,
+                servings=4, instructions='Cuire.', is_published=is_published,
+            )
+            for title, is_published in [
+                ('Crème brûlée', True), ('Crème caramel', False), ('Crème anglaise', True), ('Crème chantilly', True),
+            ]
+        )
+        soft_delete_recipe(self.anglaise)
+
+    def titles(self, query):
+        response = self.client.get(reverse('recipe-suggest'), {'q': query}, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['title'] for recipe in response.json()['recipes']]
+
+    def test_normalize(self):
+        self.assertEqual(suggest.normalize('Crème brûlée !'), 'creme brulee')
+        self.assertEqual(suggest.normalize('creme BRU'), 'creme bru')
+
+    def test_prefix_ignores_case_and_accents(self):
+        self.assertEqual(self.titles('creme BRU'), ['Crème brûlée'])
+        self.assertEqual(self.titles('BRÛL'), ['Crème brûlée'])
+
+    def test_hidden_recipes_never_suggested(self):
+        # Non publiée (même pour son auteur) ou supprimée avant la construction de l'index
+        self.assertEqual(sorted(self.titles('crème')), ['Crème brûlée', 'Crème chantilly'])
+        # Dépubliée, puis supprimée après : retirées à la fin de la requête
+        response = self.client.patch(reverse('recipe-detail', kwargs={'pk': self.chantilly.pk}),
+                                     {'is_published': False}, content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles('crème'), ['Crème brûlée'])
+        response = self.client.delete(reverse('recipe-detail', kwargs={'pk': self.brulee.pk}), **self.headers)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.titles('crème'), [])
+        self.assertEqual(self.titles('creme BRU'), [])
+
+
+class UserStatisticsTests(TestCase):
+    """Statistiques maintenues par deltas (stats.py) : identiques à une reconstruction"""
+
+    FIELDS = ('recipes_count', 'favorites_given', 'favorites_received', 'views_made', 'views_received',
+              'most_viewed_recipes', 'recent_recipes')
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.author = User.objects.create_user('cuisinier', 'cuisinier@exemple.com', PASSWORD)
+        self.reader = User.objects.create_user('lecteur', 'lecteur@exemple.com', PASSWORD)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.reader).access_token}'}
+        self.author_headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.author).access_token}'}
+        self.yassa, self.mafe = (
+            Recipe.objects.create(
+                author=self.author, title=title, description='Recette', prep_time=10, cook_time=30,
+                servings=4, instructions='Cuire.',
+            )
+            for title in ('Yassa', 'Mafé')
+        )
+        for user in (self.author, self.reader):
+            get_statistics_row(user.pk)
+
+    def statistics(self, user):
+        row = UserStatistics.objects.get(user=user)
+        # Un bucket retombé à 0 équivaut à un bucket absent
+        daily = {day: count for day, count in get_daily_view_counts(user.pk).items() if count}
+        return {field: getattr(row, field) for field in self.FIELDS}, daily
+
+    def assertMatchesRebuild(self):
+        for user in (self.author, self.reader):
+            maintained = self.statistics(user)
+            rebuild_user_statistics(user.pk)
+            self.assertEqual(maintained, self.statistics(user), user.username)
+
+    def favorite(self, recipe, method='post'):
+        path = reverse('recipe-favorite', kwargs={'pk': recipe.pk})
+        response = getattr(self.client, method)(path, **self.headers)
+        self.assertIn(response.status_code, (200, 201, 204))
+
+    def test_favorite_and_unfavorite(self):
+        self.favorite(self.yassa)
+        self.favorite(self.mafe)
+        self.assertEqual(self.statistics(self.author)[0]['favorites_received'], 2)
+        self.assertMatchesRebuild()
+        self.favorite(self.yassa, 'delete')
+        self.assertEqual(self.statistics(self.reader)[0]['favorites_given'], 1)
+        self.assertMatchesRebuild()
+
+    def test_view(self):
+        for headers in (self.headers, self.headers, {}):
+            response = self.client.get(reverse('recipe-detail', kwargs={'pk': self.mafe.pk}), **headers)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.statistics(self.author)[0]['views_received'], 3)
+        self.assertEqual(self.statistics(self.author)[0]['most_viewed_recipes'][0]['title'], 'Mafé')
+        self.assertMatchesRebuild()
+
+    def test_recipe_delete(self):
+        self.favorite(self.yassa)
+        self.favorite(self.mafe)
+        for recipe in (self.yassa, self.mafe):
+            self.client.get(reverse('recipe-detail', kwargs={'pk': recipe.pk}), **self.headers)
+        # Suppression différée (API), puis définitive (administration)
+        response = self.client.delete(reverse('recipe-detail', kwargs={'pk': self.yassa.pk}), **self.author_headers)
+        self.assertEqual(response.status_code, 204)
+        for user in (self.author, self.reader):
+            get_statistics_row(user.pk)
+        self.assertEqual(self.statistics(self.author)[0]['recipes_count'], 1)
+        self.assertMatchesRebuild()
+        Recipe.objects.get(pk=self.mafe.pk).delete()
+        self.assertEqual(self.statistics(self.author)[0]['recipes_count'], 0)
+        self.assertEqual(self.statistics(self.reader)[0]['favorites_given'], 0)
+        self.assertMatchesRebuild()
+
+
+class ReferenceDataTests(TestCase):
+    """Listes des données de référence servies depuis l'instantané (reference_data.py)"""
+
+    def setUp(self):
+        reset_process_caches()
+        self.addCleanup(reset_process_caches)
+        self.categories = [RecipeCategory.objects.create(name=name) for name in ('Dessert', 'Entrée', 'Plat')]
+
+    def test_page_body_does_not_depend_on_envelope_order(self):
+        expected = {
+            'count': 3, 'next': None, 'previous': None,
+            'results': [{'id': category.pk, 'name': category.name} for category in self.categories],
+        }
+
+        def results_first(*args, **kwargs):
+            envelope = pagination.paginated(*args, **kwargs)
+            return {'results': envelope.pop('results'), **envelope}
+
+        for side_effect in (pagination.paginated, results_first):
+            reset_process_caches()
+            with mock.patch.object(reference_data, 'paginated', side_effect=side_effect):
+                response = self.client.get(reverse('recipe-category-list'))
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            data['results'] = [{'id': item['id'], 'name': item['name']} for item in data['results']]
+            self.assertEqual(data, expected)
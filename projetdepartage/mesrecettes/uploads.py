@@ -0,0 +1,198 @@
+"""
+Envoi et stockage des images.
+
+Réception (StreamingMultiPartParser, parser multipart de l'API) : chaque
+fichier est écrit sur disque par blocs (fichier temporaire, déplacé ensuite
+dans MEDIA_ROOT sans copie) et haché au fil de l'eau. L'envoi est refusé dès
+que possible :
+- requête annoncée au-delà de UPLOAD_MAX_REQUEST_SIZE, avant toute lecture ;
+- fichier au-delà de UPLOAD_MAX_FILE_SIZE, dès le bloc qui dépasse ;
+- image de plus de UPLOAD_MAX_DIMENSION pixels de côté, ou illisible, dès la
+  lecture de son en-tête (les pixels ne sont pas décodés).
+
+Stockage : une image est enregistrée sous son empreinte (fields.py), dans un
+répertoire commun à tous les champs d'images ; un contenu déjà stocké n'est
+pas réécrit mais partagé. Le nombre de références d'un fichier est compté
+sur les colonnes (indexées) des champs d'images plutôt que stocké : les
+suppressions ensemblistes de purge.py ne peuvent pas le désynchroniser.
+
+Suppression : un fichier dont une référence disparaît (objet supprimé, image
+remplacée ou retirée : signals.py ; lot de purge) est inscrit dans
+ReleasedFile, dans la transaction qui retire la référence. Le balayage
+(sweep_released_files, commande purge_deleted) supprime les fichiers inscrits
+depuis plus de MEDIA_RELEASE_GRACE_SECONDS qui ne sont plus référencés : un
+envoi en cours qui réutilise le fichier a le temps d'enregistrer sa ligne.
+L'envoi retire aussi le fichier de ReleasedFile (verrou de la ligne pris par
+le balayage) et le réécrit s'il a été supprimé entre-temps (fields.py).
+"""
+import hashlib
+import io
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import router, transaction
+from django.db.models import Count
+from django.utils import timezone
+from PIL import Image
+from rest_framework import parsers, status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .fields import HASH_LENGTH, HashedImageField
+
+# Octets lus au plus pour trouver les dimensions d'une image (en-tête, métadonnées EXIF)
+HEADER_BYTES = 512 * 1024
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Requête trop volumineuse.'
+    default_code = 'payload_too_large'
+
+
+class UploadRejected(Exception):
+    """Fichier refusé : erreur de validation du champ `field_name`"""
+
+    def __init__(self, field_name, message):
+        super().__init__(message)
+        self.field_name = field_name
+        self.message = message
+
+
+def megabytes(size):
+    return f'{size / 1024 / 1024:g} Mo'
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Fichiers écrits sur disque, hachés et contrôlés pendant la réception"""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_file_size = getattr(settings, 'UPLOAD_MAX_FILE_SIZE', 10 * 1024 * 1024)
+        self.max_request_size = getattr(settings, 'UPLOAD_MAX_REQUEST_SIZE', 60 * 1024 * 1024)
+        self.max_dimension = getattr(settings, 'UPLOAD_MAX_DIMENSION', 8000)
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_request_size:
+            raise PayloadTooLarge(f'Requête limitée à {megabytes(self.max_request_size)}.')
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.header = b''
+
+    def reject(self, exception):
+        self.file.close()
+        raise exception
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_request_size:
+            self.reject(PayloadTooLarge(f'Requête limitée à {megabytes(self.max_request_size)}.'))
+        if start + len(raw_data) > self.max_file_size:
+            self.reject(UploadRejected(self.field_name, f'Fichier limité à {megabytes(self.max_file_size)}.'))
+        if self.header is not None:
+            self.check_header(raw_data)
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self, raw_data):
+        """Dimensions lues dans l'en-tête dès qu'il est complet, sans décoder l'image"""
+        self.header += raw_data[:HEADER_BYTES - len(self.header)]
+        try:
+            with Image.open(io.BytesIO(self.header)) as image:
+                size = image.size
+        except Image.DecompressionBombError:
+            size = (self.max_dimension + 1, 0)
+        except (OSError, SyntaxError, ValueError):
+            if len(self.header) >= HEADER_BYTES:
+                self.reject(UploadRejected(self.field_name, 'Fichier image invalide.'))
+            return
+        self.header = None
+        if max(size) > self.max_dimension:
+            self.reject(UploadRejected(self.field_name, f'Image limitée à {self.max_dimension} pixels de côté.'))
+
+    def file_complete(self, file_size):
+        if self.header is not None:
+            # Fichier terminé avant un en-tête lisible
+            self.reject(UploadRejected(self.field_name, 'Fichier image invalide.'))
+        file = super().file_complete(file_size)
+        file.content_hash = self.digest.hexdigest()[:HASH_LENGTH]
+        return file
+
+
+class StreamingMultiPartParser(parsers.MultiPartParser):
+    """MultiPartParser recevant les fichiers avec ImageUploadHandler"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request._request.upload_handlers = [ImageUploadHandler(request._request)]
+        try:
+            return super().parse(stream, media_type, parser_context)
+        except UploadRejected as exc:
+            raise ValidationError({exc.field_name: [exc.message]})
+
+
+# ---------------------------------------------------------------------------
+# Références
+# ---------------------------------------------------------------------------
+
+def image_fields():
+    """[(modèle, champ)] des champs d'images nommées d'après leur contenu"""
+    return [
+        (model, field)
+        for model in apps.get_app_config('mesrecettes').get_models()
+        for field in model._meta.concrete_fields if isinstance(field, HashedImageField)
+    ]
+
+
+def reference_counts(names, using=None):
+    """{nom: nombre de lignes le référençant}, tous champs d'images et lignes supprimées en différé compris"""
+    counts = Counter()
+    for model, field in image_fields():
+        rows = model._base_manager.using(using).filter(**{f'{field.attname}__in': names})
+        counts.update(dict(rows.order_by().values_list(field.attname).annotate(count=Count('pk'))))
+    return counts
+
+
+def release_files(names, using=None):
+    """Inscrit les fichiers `names` pour le balayage (dans la transaction qui retire leur référence)"""
+    from .models import ReleasedFile
+
+    names = {name for name in names if name}
+    if names:
+        now = timezone.now()
+        ReleasedFile.objects.using(using or router.db_for_write(ReleasedFile)).bulk_create(
+            [ReleasedFile(name=name, released_at=now) for name in sorted(names)],
+            update_conflicts=True, unique_fields=['name'], update_fields=['released_at'],
+        )
+
+
+def sweep_released_files(grace=None, batch_size=500, using=None):
+    """
+    Supprime les fichiers inscrits depuis plus de `grace` secondes qui ne sont
+    plus référencés ; renvoie le nombre de fichiers supprimés.
+    """
+    from .models import ReleasedFile
+
+    using = using or router.db_for_write(ReleasedFile)
+    if grace is None:
+        grace = getattr(settings, 'MEDIA_RELEASE_GRACE_SECONDS', 3600)
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    released = ReleasedFile.objects.using(using).filter(released_at__lte=cutoff).order_by('pk')
+    removed = 0
+    while True:
+        with transaction.atomic(using=using):
+            # Lignes verrouillées : un envoi qui réutilise un fichier attend la fin du lot (fields.py)
+            batch = list(released.select_for_update().values_list('pk', 'name')[:batch_size])
+            if not batch:
+                return removed
+            names = [name for _, name in batch]
+            for name in set(names) - set(reference_counts(names, using)):
+                default_storage.delete(name)
+                removed += 1
+            ReleasedFile.objects.using(using).filter(pk__in=[pk for pk, _ in batch]).delete()
@@ -6,6 +6,7 @@ from django_rest_passwordreset.views import (
     ResetPasswordConfirm,
     ResetPasswordValidateToken
 )
+from . import async_views
 from .views import (
     UserViewSet, UserRegistrationView, UserProfileViewSet,
     RecipeViewSet, RecipeCategoryViewSet, IngredientCategoryViewSet,
@@ -35,5 +36,12 @@ urlpatterns = [
     path('auth/password-reset/validate_token/', ResetPasswordValidateToken.as_view(), name='password-reset-validate-token'),
     path('auth/social/callback/', social_auth_callback, name='social-auth-callback'),
     path('statistics/', StatisticsView.as_view(), name='statistics'),
+    # Variantes asynchrones (ASGI) des endpoints de lecture
+    path('async/recipes/', async_views.recipe_list, name='async-recipe-list'),
+    path('async/recipes/history/', async_views.recipe_history, name='async-recipe-history'),
+    path('async/recipes/<int:pk>/', async_views.recipe_detail, name='async-recipe-detail'),
+    path('async/recipe-categories/', async_views.recipe_category_list, name='async-recipe-category-list'),
+    path('async/reference-data/', async_views.reference_data, name='async-reference-data'),
+    path('async/statistics/', async_views.statistics, name='async-statistics'),
 ]
 
@@ -3,10 +3,16 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.settings import api_settings
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Count
+from django.db import router
+from django.db.models import Q, F, Count, Max, Sum, Exists, OuterRef, Prefetch
 from django.utils import timezone
-from django.shortcuts import redirect
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.utils.crypto import constant_time_compare
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import (
     User, UserProfile, Recipe, RecipeImage, Ingredient,
@@ -19,17 +25,60 @@ from .serializers import (
     RecipeSerializer, RecipeCreateUpdateSerializer, IngredientSerializer,
     RecipeCategorySerializer, IngredientCategorySerializer,
     DietaryRestrictionSerializer, AllergySerializer, FavoriteRecipeSerializer,
-    ShoppingListSerializer, ShoppingListCreateUpdateSerializer, ShoppingListItemSerializer, MenuSerializer, MenuRecipeSerializer
+    ShoppingListSerializer, ShoppingListCreateUpdateSerializer, ShoppingListItemSerializer, MenuSerializer, MenuRecipeSerializer,
+    MenuAutofillSerializer, ShoppingListItemBulkSerializer, MoveSerializer, RecipeImageSerializer,
+    ShoppingListSyncSerializer
 )
+from .conditional import (
+    ConditionalGetMixin, latest, make_etag,
+    RECIPE_CATEGORIES, INGREDIENT_CATEGORIES, DIETARY_RESTRICTIONS, ALLERGIES
+)
+from .reference_data import ReferenceDataMixin, reference_versions
+from .recipe_filters import (
+    RECIPE_ORDERING_FIELDS, RECIPE_SEARCH_FIELDS, RecipeOrderingFilter, filter_recipes, parse_ids,
+    visible_recipes
+)
+from . import documents, metrics, ranking, suggest
+from .bulk import apply_item_operations
+from .facets import get_facets, wants_facets
+from .media import signature_expiry
+from .planner import autofill_menu
+from .profiling import phase
+from .purge import soft_delete_recipe, soft_delete_user
+from .stats import get_user_statistics
+from .sync import apply_changes, changes_since, parse_token
 
 User = get_user_model()
 
 
+def move_instance(request, instance):
+    """Déplace un item, un ingrédient ou une image parmi ses frères (MoveSerializer)"""
+    serializer = MoveSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = {pk for pk in serializer.validated_data.values() if pk is not None}
+    if instance.pk in ids:
+        raise ValidationError({'detail': "Un élément ne peut pas être son propre voisin."})
+    neighbours = ranking.siblings(type(instance), ranking.parent_id(instance)).in_bulk(ids)
+    positions = {}
+    for name, pk in serializer.validated_data.items():
+        if pk is not None and pk not in neighbours:
+            raise ValidationError({name: "Cet élément n'appartient pas à la même liste."})
+        positions[name] = neighbours.get(pk)
+    try:
+        ranking.move(instance, **positions)
+    except ValueError as exc:
+        raise ValidationError({'detail': str(exc)})
+
+
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.filter(deleted_at__isnull=True)
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
+    def perform_destroy(self, instance):
+        # Compte désactivé et contenu masqué ; lignes supprimées par purge_deleted
+        soft_delete_user(instance)
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
         serializer = self.get_serializer(request.user)
@@ -50,7 +99,9 @@ class UserRegistrationView(generics.CreateAPIView):
 
 
 class UserProfileViewSet(viewsets.ModelViewSet):
-    queryset = UserProfile.objects.all()
+    queryset = UserProfile.objects.filter(user__deleted_at__isnull=True).select_related('user').prefetch_related(
+        'dietary_restrictions', 'allergies'
+    )
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
 
@@ -67,36 +118,40 @@ class UserProfileViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
 
 
-class RecipeCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class RecipeCategoryViewSet(ReferenceDataMixin, viewsets.ReadOnlyModelViewSet):
     queryset = RecipeCategory.objects.all()
     serializer_class = RecipeCategorySerializer
     permission_classes = [AllowAny]
+    version_key = RECIPE_CATEGORIES
 
 
-class IngredientCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientCategoryViewSet(ReferenceDataMixin, viewsets.ReadOnlyModelViewSet):
     queryset = IngredientCategory.objects.all()
     serializer_class = IngredientCategorySerializer
     permission_classes = [AllowAny]
+    version_key = INGREDIENT_CATEGORIES
 
 
-class DietaryRestrictionViewSet(viewsets.ReadOnlyModelViewSet):
+class DietaryRestrictionViewSet(ReferenceDataMixin, viewsets.ReadOnlyModelViewSet):
     queryset = DietaryRestriction.objects.all()
     serializer_class = DietaryRestrictionSerializer
     permission_classes = [AllowAny]
+    version_key = DIETARY_RESTRICTIONS
 
 
-class AllergyViewSet(viewsets.ReadOnlyModelViewSet):
+class AllergyViewSet(ReferenceDataMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Allergy.objects.all()
     serializer_class = AllergySerializer
     permission_classes = [AllowAny]
+    version_key = ALLERGIES
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'description', 'tags', 'ingredients__name']
-    ordering_fields = ['created_at', 'views_count', 'favorites_count', 'total_time']
+    filter_backends = [filters.SearchFilter, RecipeOrderingFilter]
+    search_fields = RECIPE_SEARCH_FIELDS
+    ordering_fields = RECIPE_ORDERING_FIELDS
     ordering = ['-created_at']
 
     def get_serializer_class(self):
@@ -107,51 +162,59 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAuthenticated()]
-        return [AllowAny()]
+        # Les actions (favorites, history...) déclarent leurs propres permissions
+        return super().get_permissions()
 
     def get_queryset(self):
-        # Si l'utilisateur n'est pas authentifié, ne montrer que les recettes publiées
-        if not self.request.user.is_authenticated:
-            queryset = Recipe.objects.filter(is_published=True)
-        # Si l'utilisateur est authentifié, montrer toutes les recettes publiées
-        # et les recettes non publiées de l'utilisateur
-        else:
-            queryset = Recipe.objects.filter(
-                Q(is_published=True) | Q(author=self.request.user)
-            )
+        queryset = visible_recipes(self.request.user)
         
         # Précharger les relations pour optimiser les performances
-        queryset = queryset.select_related('author', 'category').prefetch_related(
-            'ingredients', 'images', 'ingredients__category'
-        )
+        # Les catégories (recette, ingrédients) sont lues depuis l'instantané de reference_data
+        queryset = queryset.select_related('author').prefetch_related('ingredients', 'images')
         
         # Filtres
-        category = self.request.query_params.get('category', None)
-        difficulty = self.request.query_params.get('difficulty', None)
-        max_time = self.request.query_params.get('max_time', None)
-        min_servings = self.request.query_params.get('min_servings', None)
-        tags = self.request.query_params.getlist('tags', None)
-        ingredient = self.request.query_params.get('ingredient', None)
-
-        if category:
-            queryset = queryset.filter(category_id=category)
-        if difficulty:
-            queryset = queryset.filter(difficulty=difficulty)
-        if max_time:
-            queryset = queryset.filter(
-                prep_time__lte=max_time,
-                cook_time__lte=max_time
-            )
-        if min_servings:
-            queryset = queryset.filter(servings__gte=min_servings)
-        if tags:
-            for tag in tags:
-                queryset = queryset.filter(tags__icontains=tag)
-        if ingredient:
-            queryset = queryset.filter(ingredients__name__icontains=ingredient)
+        queryset = filter_recipes(queryset, self.request.query_params)
 
         return queryset.distinct()
 
+    def get_serializer(self, *args, **kwargs):
+        # is_favorited : une seule requête pour toute la liste au lieu d'une par recette
+        if kwargs.get('many') and args and self.request.user.is_authenticated:
+            recipes = list(args[0])
+            context = kwargs.setdefault('context', self.get_serializer_context())
+            context['favorited_ids'] = set(FavoriteRecipe.objects.filter(
+                user=self.request.user, recipe__in=[recipe.pk for recipe in recipes]
+            ).values_list('recipe_id', flat=True))
+            args = (recipes,) + args[1:]
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' not in request.query_params:
+            response = super().list(request, *args, **kwargs)
+            # Facettes : une requête d'agrégation (ou le cache), voir facets.py
+            if wants_facets(request.query_params):
+                response.data['facets'] = get_facets(
+                    request.user, request.query_params, request.query_params.get(api_settings.SEARCH_PARAM, '')
+                )
+            return response
+        # Multi-get : une seule requête (plus les préchargements), sans pagination,
+        # dans l'ordre demandé ; les recettes absentes ou non visibles sont omises
+        ids = parse_ids(request.query_params['ids'])
+        with phase('queryset'):
+            recipes = self.filter_queryset(self.get_queryset()).in_bulk(ids) if ids else {}
+        serializer = self.get_serializer([recipes[pk] for pk in ids if pk in recipes], many=True)
+        return Response(serializer.data)
+
+    def perform_destroy(self, instance):
+        # Masquée immédiatement ; lignes et fichiers supprimés par purge_deleted
+        soft_delete_recipe(instance)
+
+    def check_recipe_visibility(self, recipe):
+        # Si l'utilisateur n'est pas authentifié, ne montrer que les recettes publiées
+        # Si l'utilisateur est authentifié, montrer les recettes publiées ou les recettes de l'utilisateur
+        if not recipe.is_published and recipe.author_id != self.request.user.pk:
+            raise NotFound('No Recipe matches the given query.')
+
     def get_object(self):
         """
         Override get_object pour récupérer la recette directement
@@ -161,31 +224,67 @@ class RecipeViewSet(viewsets.ModelViewSet):
         lookup_value = self.kwargs[lookup_url_kwarg]
         
         try:
-            recipe = Recipe.objects.select_related('author', 'category').prefetch_related(
-                'ingredients', 'images', 'ingredients__category'
-            ).get(pk=lookup_value)
+            with phase('queryset'):
+                recipe = Recipe.objects.select_related('author').prefetch_related(
+                    'ingredients', 'images'
+                ).get(pk=lookup_value)
         except Recipe.DoesNotExist:
-            from rest_framework.exceptions import NotFound
             raise NotFound('No Recipe matches the given query.')
         
         # Vérifier les permissions d'accès
-        # Si l'utilisateur n'est pas authentifié, ne montrer que les recettes publiées
-        if not self.request.user.is_authenticated:
-            if not recipe.is_published:
-                from rest_framework.exceptions import NotFound
-                raise NotFound('No Recipe matches the given query.')
-        # Si l'utilisateur est authentifié, montrer les recettes publiées ou les recettes de l'utilisateur
-        else:
-            if not recipe.is_published and recipe.author != self.request.user:
-                from rest_framework.exceptions import NotFound
-                raise NotFound('No Recipe matches the given query.')
-        
+        self.check_recipe_visibility(recipe)
+        return recipe
+
+    def get_validator_object(self):
+        """
+        Version allégée de get_object (une seule requête, sans relations) servant
+        à calculer l'ETag, à enregistrer la vue et à servir le document précalculé.
+        """
+        if hasattr(self, '_validator_object'):
+            return self._validator_object
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        user = self.request.user
+        # Lu sur la base d'écriture : retrieve incrémente views_count à partir de cet objet
+        queryset = Recipe.objects.using(router.db_for_write(Recipe)).only(
+            'id', 'title', 'author_id', 'category_id', 'views_count', 'favorites_count',
+            'is_published', 'updated_at'
+        ).annotate(author_updated_at=F('author__updated_at'))
+        queryset = documents.with_document(queryset)
+        if user.is_authenticated:
+            queryset = queryset.annotate(is_favorited_flag=Exists(
+                FavoriteRecipe.objects.filter(user=user, recipe=OuterRef('pk'))
+            ))
+        try:
+            with phase('queryset'):
+                recipe = queryset.get(pk=self.kwargs[lookup_url_kwarg])
+        except (Recipe.DoesNotExist, ValueError):
+            raise NotFound('No Recipe matches the given query.')
+        self.check_recipe_visibility(recipe)
+        self._validator_object = recipe
         return recipe
 
+    def get_validators(self):
+        if self.action != 'retrieve':
+            return None, None
+        recipe = self.get_validator_object()
+        versions = reference_versions()
+        # views_count est volontairement exclu : ETag faible, le compteur change à chaque lecture
+        etag = make_etag(
+            'recipe', recipe.pk, recipe.updated_at.isoformat(), recipe.favorites_count,
+            recipe.author_updated_at.isoformat(), recipe.category_id,
+            getattr(recipe, 'is_favorited_flag', False),
+            versions[RECIPE_CATEGORIES][0], versions[INGREDIENT_CATEGORIES][0],
+            # URLs d'images signées : renouvelées à chaque période
+            None if recipe.is_published else signature_expiry(),
+        )
+        return etag, None
+
+    def is_public_response(self):
+        return not self.request.user.is_authenticated
+
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        
-        # Enregistrer la vue
+        # Enregistrer la vue, y compris lorsque le client reçoit un 304
+        instance = self.get_validator_object()
         RecipeView.objects.create(
             recipe=instance,
             user=request.user if request.user.is_authenticated else None,
@@ -194,6 +293,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
         instance.views_count += 1
         instance.save(update_fields=['views_count'])
 
+        return self.conditional_response(self.retrieve_representation, request, *args, **kwargs)
+
+    def retrieve_representation(self, request, *args, **kwargs):
+        recipe = self.get_validator_object()
+        # Recette non publiée (URLs d'images signées, voir media.py) ou API navigable : sérialisation complète
+        if recipe.is_published and request.accepted_renderer.format == 'json':
+            body = documents.recipe_body(request, recipe)
+            if body is not None:
+                return HttpResponse(body, content_type='application/json')
+        instance = self.get_object()
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -220,26 +329,65 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_recipes(self, request):
-        recipes = Recipe.objects.filter(author=request.user)
+        recipes = Recipe.objects.filter(author=request.user).select_related('author').prefetch_related(
+            'ingredients', 'images'
+        )
         serializer = self.get_serializer(recipes, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def favorites(self, request):
-        favorites = FavoriteRecipe.objects.filter(user=request.user)
+        favorites = FavoriteRecipe.objects.filter(
+            user=request.user, recipe__deleted_at__isnull=True
+        ).select_related('recipe__author').prefetch_related(
+            'recipe__ingredients', 'recipe__images'
+        )
         recipes = [f.recipe for f in favorites]
         serializer = self.get_serializer(recipes, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def history(self, request):
-        views = RecipeView.objects.filter(user=request.user).order_by('-viewed_at')[:50]
+        views = RecipeView.objects.filter(
+            user=request.user, recipe__deleted_at__isnull=True
+        ).order_by('-viewed_at').select_related(
+            'recipe__author'
+        ).prefetch_related('recipe__ingredients', 'recipe__images')[:50]
         recipes = [v.recipe for v in views]
         serializer = self.get_serializer(recipes, many=True)
         return Response(serializer.data)
 
-
-class ShoppingListViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Suggestions de saisie : titres, tags et ingrédients commençant par ?q=,
+        ?limit= de chaque (voir suggest.py).
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= suggest.MAX_LIMIT:
+            raise ValidationError({'limit': f'Entier entre 1 et {suggest.MAX_LIMIT}.'})
+        return Response({'query': query, **suggest.search(query, limit)})
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
+            url_path=r'ingredients/(?P<ingredient_id>\d+)/move')
+    def move_ingredient(self, request, pk=None, ingredient_id=None):
+        ingredient = get_object_or_404(Ingredient, pk=ingredient_id, recipe_id=pk, recipe__author=request.user)
+        move_instance(request, ingredient)
+        return Response(IngredientSerializer(ingredient, context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
+            url_path=r'images/(?P<image_id>\d+)/move')
+    def move_image(self, request, pk=None, image_id=None):
+        image = get_object_or_404(RecipeImage, pk=image_id, recipe_id=pk, recipe__author=request.user)
+        move_instance(request, image)
+        return Response(RecipeImageSerializer(image, context=self.get_serializer_context()).data)
+
+
+class ShoppingListViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ShoppingList.objects.all()
     permission_classes = [IsAuthenticated]
 
@@ -249,7 +397,51 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
         return ShoppingListSerializer
 
     def get_queryset(self):
-        return ShoppingList.objects.filter(user=self.request.user)
+        queryset = ShoppingList.objects.filter(user=self.request.user)
+        if self.action in ['list', 'retrieve']:
+            # Pas pour les actions qui ajoutent des items : le préchargement serait périmé
+            queryset = queryset.prefetch_related('items')
+        return queryset
+
+    def get_validators(self):
+        # ShoppingList.updated_at est mis à jour à chaque modification d'un item (voir signals.py)
+        category_version, category_updated_at = reference_versions()[INGREDIENT_CATEGORIES]
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                updated_at = self.get_queryset().values_list('updated_at', flat=True).get(
+                    pk=self.kwargs[lookup_url_kwarg]
+                )
+            except (ShoppingList.DoesNotExist, ValueError):
+                raise NotFound()
+            etag = make_etag('shopping-list', self.kwargs[lookup_url_kwarg], updated_at.isoformat(), category_version)
+            return etag, latest(updated_at, category_updated_at)
+        if self.action == 'list':
+            # Pas de Last-Modified : une suppression ne fait pas avancer max(updated_at)
+            summary = self.get_queryset().aggregate(count=Count('id'), last=Max('updated_at'))
+            etag = make_etag(
+                'shopping-lists', self.request.user.pk, summary['count'], summary['last'],
+                category_version, self.request.get_full_path()
+            )
+            return etag, None
+        return None, None
+
+    @action(detail=True, methods=['get', 'post'])
+    def sync(self, request, pk=None):
+        """
+        Synchronisation différentielle (voir sync.py) : GET ?since=<jeton>, ou
+        POST {"since", "changes"} pour envoyer d'abord les modifications hors ligne.
+        """
+        shopping_list = self.get_object()
+        context = self.get_serializer_context()
+        if request.method == 'GET':
+            since = parse_token(request.query_params.get('since'))
+            return Response(changes_since(shopping_list, since, context))
+        serializer = ShoppingListSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        since = parse_token(serializer.validated_data.get('since'))
+        results = apply_changes(shopping_list, serializer.validated_data['changes'], context)
+        return Response({'results': results, **changes_since(shopping_list, since, context)})
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def add_item(self, request, pk=None):
@@ -329,6 +521,29 @@ class ShoppingListItemViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return ShoppingListItem.objects.filter(shopping_list__user=self.request.user)
 
+    @action(detail=True, methods=['post'])
+    def move(self, request, pk=None):
+        item = self.get_object()
+        move_instance(request, item)
+        return Response(self.get_serializer(item).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Lot de créations, modifications et suppressions appliqué en une
+        transaction (voir bulk.py) ; 400 sans rien appliquer si une opération
+        est invalide.
+        """
+        serializer = ShoppingListItemBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        applied, results = apply_item_operations(
+            request.user, serializer.validated_data['operations'], self.get_serializer_context()
+        )
+        return Response(
+            {'results': results},
+            status=status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST
+        )
+
 
 class MenuViewSet(viewsets.ModelViewSet):
     queryset = Menu.objects.all()
@@ -336,7 +551,18 @@ class MenuViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Menu.objects.filter(user=self.request.user)
+        # Nombre de requêtes constant : les entrées, leurs recettes et les agrégats
+        # d'ingrédients sont chargés en une seule requête de préchargement
+        entries = MenuRecipe.objects.filter(recipe__deleted_at__isnull=True).select_related('recipe').annotate(
+            ingredients_cost=Sum('recipe__ingredients__estimated_price'),
+            ingredients_count=Count('recipe__ingredients'),
+        ).order_by('date', 'meal_type', 'pk')
+        return Menu.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('recipes', queryset=entries)
+        ).order_by('-start_date', '-pk')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def add_recipe(self, request, pk=None):
@@ -346,24 +572,42 @@ class MenuViewSet(viewsets.ModelViewSet):
         serializer.save(menu=menu)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def autofill(self, request, pk=None):
+        menu = self.get_object()
+        params = MenuAutofillSerializer(data=request.data, context={'menu': menu})
+        params.is_valid(raise_exception=True)
+        planned, unfilled = autofill_menu(menu, **params.validated_data)
+        menu = self.get_queryset().get(pk=menu.pk)
+        return Response({
+            'created': len(planned),
+            'unfilled': unfilled,
+            'menu': self.get_serializer(menu).data,
+        })
+
 
 class StatisticsView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        stats = {
-            'total_recipes': Recipe.objects.filter(author=user).count(),
-            'total_favorites': FavoriteRecipe.objects.filter(user=user).count(),
-            'total_views': RecipeView.objects.filter(user=user).count(),
-            'most_viewed_recipes': Recipe.objects.filter(
-                author=user
-            ).order_by('-views_count')[:5].values('id', 'title', 'views_count'),
-            'recent_recipes': Recipe.objects.filter(
-                author=user
-            ).order_by('-created_at')[:5].values('id', 'title', 'created_at'),
-        }
-        return Response(stats)
+        return Response(get_user_statistics(request.user))
+
+
+def metrics_view(request):
+    """
+    Métriques Prometheus (format texte) agrégées sur tous les workers.
+    L'en-tête Authorization: Bearer <METRICS_TOKEN> est exigé ; sans jeton
+    configuré, la vue n'est ouverte qu'en DEBUG.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse(status=403)
+    elif not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    if not metrics.enabled():
+        return HttpResponse(status=404)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 def social_auth_callback(request):
@@ -56,6 +56,21 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'mesrecettes.profiling': {
+            'handlers': ['console'],
+            'level': os.environ.get('PROFILING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'mesrecettes.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'mesrecettes.startup': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
         'django': {
             'handlers': ['console'],
             'level': 'ERROR' if not DEBUG else 'INFO',
@@ -95,6 +110,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'mesrecettes.middleware.RequestProfilingMiddleware',  # Server-Timing, journal et profils cProfile
     'mesrecettes.middleware.DisableCSRFForAPI',  # Désactive CSRF pour les endpoints API
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -149,6 +165,30 @@ else:
         }
     }
 
+# Réplicas en lecture (mesrecettes/db_router.py) : URLs séparées par des virgules.
+# En local : DATABASE_REPLICA_URLS=sqlite:////chemin/replica.sqlite3, alimenté
+# par `manage.py sync_sqlite_replicas`
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(os.environ.get('DATABASE_REPLICA_URLS', '').split(','), start=1):
+    if replica_url.strip():
+        alias = f'replica_{index}'
+        DATABASES[alias] = dj_database_url.parse(replica_url.strip(), conn_max_age=600, conn_health_checks=True)
+        DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+        DATABASE_REPLICAS.append(alias)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['mesrecettes.db_router.PrimaryReplicaRouter']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+        'mesrecettes.middleware.ReplicaRoutingMiddleware',
+    )
+
+# Durée pendant laquelle un client qui vient d'écrire lit sur le primaire
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get('REPLICA_HEALTH_CHECK_INTERVAL', 10))
+REPLICA_MAX_LAG = int(os.environ.get('REPLICA_MAX_LAG', 30))
+REPLICA_EXCLUDED_PATHS = ('/admin/', '/auth/')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -195,6 +235,21 @@ if not DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Envoi des fichiers media (mesrecettes/media.py) après contrôle d'accès : 'x-accel-redirect'
+# (nginx, location interne MEDIA_ACCEL_PREFIX), 'x-sendfile' (Apache) ou vide (Django).
+# MEDIA_MAX_AGE : durée de cache des fichiers non nommés d'après leur contenu
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', 3600))
+# Période des URLs signées des images de recettes non publiées (valables une à deux périodes)
+MEDIA_URL_LIFETIME = int(os.environ.get('MEDIA_URL_LIFETIME', 6 * 3600))
+
+# Images envoyées à l'API (mesrecettes/uploads.py) : taille par fichier et par requête
+# (octets), côté maximal (pixels)
+UPLOAD_MAX_FILE_SIZE = int(os.environ.get('UPLOAD_MAX_FILE_SIZE', 10 * 1024 * 1024))
+UPLOAD_MAX_REQUEST_SIZE = int(os.environ.get('UPLOAD_MAX_REQUEST_SIZE', 60 * 1024 * 1024))
+UPLOAD_MAX_DIMENSION = int(os.environ.get('UPLOAD_MAX_DIMENSION', 8000))
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -207,15 +262,100 @@ AUTH_USER_MODEL = 'mesrecettes.User'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'mesrecettes.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # orjson si installé, json de la bibliothèque standard sinon
+    'DEFAULT_RENDERER_CLASSES': (
+        'mesrecettes.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'mesrecettes.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        # Fichiers reçus sur disque, hachés et limités (mesrecettes/uploads.py)
+        'mesrecettes.uploads.StreamingMultiPartParser',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'mesrecettes.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
+# Vues asynchrones (mesrecettes/async_views.py) : requêtes indépendantes exécutées
+# en parallèle, chacune sur sa propre connexion
+ASYNC_PARALLEL_QUERIES = os.environ.get('ASYNC_PARALLEL_QUERIES', 'True').lower() in ('true', '1', 'yes')
+
+# Données de référence servies depuis un instantané en mémoire (mesrecettes/reference_data.py) :
+# délai de relecture des versions partagées et durée de cache HTTP
+REFERENCE_DATA_TTL = int(os.environ.get('REFERENCE_DATA_TTL', 5))
+REFERENCE_DATA_MAX_AGE = int(os.environ.get('REFERENCE_DATA_MAX_AGE', 3600))
+
+# Préchauffage des workers gunicorn (gunicorn.conf.py, mesrecettes/startup.py)
+STARTUP_WARM_UP = os.environ.get('STARTUP_WARM_UP', 'True').lower() in ('true', '1', 'yes')
+
+# Profilage des requêtes (mesrecettes/profiling.py) : en-tête Server-Timing (staff
+# uniquement, sauf PROFILING_SERVER_TIMING), journal structuré, profils cProfile
+# échantillonnés (taux entre 0 et 1) ou au-delà d'un seuil
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'True').lower() in ('true', '1', 'yes')
+PROFILING_SERVER_TIMING = os.environ.get('PROFILING_SERVER_TIMING', 'False').lower() in ('true', '1', 'yes')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_SLOW_MS = float(os.environ.get('PROFILING_SLOW_MS', 0))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', 100))
+
+# Journal des requêtes SQL lentes (mesrecettes/slow_queries.py, admin « Requêtes lentes ») :
+# seuil en ms (0, par défaut : désactivé), empreintes conservées, délai entre deux EXPLAIN
+# d'une empreinte
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+SLOW_QUERY_TOP_N = int(os.environ.get('SLOW_QUERY_TOP_N', 200))
+SLOW_QUERY_EXPLAIN_INTERVAL = int(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', 3600))
+
+# Métriques Prometheus sur /metrics (mesrecettes/metrics.py) : un fichier mmap par processus
+# dans METRICS_DIR, un répertoire neuf par démarrage de gunicorn (gunicorn.conf.py) ; sans
+# METRICS_DIR (runserver, commandes), les métriques sont désactivées. /metrics exige
+# METRICS_TOKEN (Authorization: Bearer <jeton>), sauf en DEBUG
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() in ('true', '1', 'yes')
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Clés de rang des items, ingrédients et images (mesrecettes/ranking.py) : longueur au-delà
+# de laquelle les clés d'une liste sont redistribuées en arrière-plan
+RANK_REBALANCE_LENGTH = int(os.environ.get('RANK_REBALANCE_LENGTH', 24))
+
+# Synchronisation des listes de courses (mesrecettes/sync.py) : durée de conservation des
+# suppressions ; un client plus en retard reçoit la liste complète
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', 30))
+
+# Menus (mesrecettes/planner.py) : nombre de jours maximal entre start_date et end_date,
+# qui borne le travail du remplissage automatique
+MENU_MAX_DAYS = int(os.environ.get('MENU_MAX_DAYS', 31))
+
+# Suppression différée des utilisateurs et recettes (mesrecettes/purge.py, commande
+# purge_deleted) : lignes par DELETE, et délai avant la suppression définitive
+PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', 500))
+PURGE_DELAY_HOURS = float(os.environ.get('PURGE_DELAY_HOURS', 0))
+# Délai avant qu'un fichier media qui n'est plus référencé soit supprimé par purge_deleted
+# (mesrecettes/uploads.py) : laisse aux envois en cours qui le réutilisent le temps de valider
+MEDIA_RELEASE_GRACE_SECONDS = int(os.environ.get('MEDIA_RELEASE_GRACE_SECONDS', 3600))
+
+# Suggestions de saisie (mesrecettes/suggest.py) : taille maximale de l'index de préfixes
+# en mémoire, relecture des recettes modifiées et reconstruction complète (secondes)
+SUGGEST_MAX_KEYS = int(os.environ.get('SUGGEST_MAX_KEYS', 2_000_000))
+SUGGEST_REFRESH_SECONDS = int(os.environ.get('SUGGEST_REFRESH_SECONDS', 30))
+SUGGEST_REBUILD_SECONDS = int(os.environ.get('SUGGEST_REBUILD_SECONDS', 3600))
+
+# Facettes de la liste des recettes (mesrecettes/facets.py) : durée de mise en cache (secondes)
+FACETS_CACHE_TTL = int(os.environ.get('FACETS_CACHE_TTL', 60))
+
+# Cache local au processus, compté dans les métriques (hits / misses)
+CACHES = {
+    'default': {
+        'BACKEND': 'mesrecettes.cache_backends.LocMemCache',
+        'METRICS_NAME': 'default',
+    },
+}
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -223,6 +363,10 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
 }
 
+# Cache par processus des utilisateurs authentifiés par JWT (mesrecettes/authentication.py)
+JWT_USER_CACHE_TTL = int(os.environ.get('JWT_USER_CACHE_TTL', 30))
+JWT_USER_CACHE_SIZE = int(os.environ.get('JWT_USER_CACHE_SIZE', 1024))
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
@@ -276,10 +420,12 @@ DJANGO_REST_PASSWORDRESET_TOKEN_CONFIG = {
 PASSWORD_RESET_URL = 'http://localhost:5173/reset-password?token={token}'
 
 # Social Auth Settings
+# ModelBackend en tête : une connexion par mot de passe réussie n'importe pas
+# les backends OAuth (authenticate() s'arrête au premier backend qui l'accepte)
 AUTHENTICATION_BACKENDS = (
+    'django.contrib.auth.backends.ModelBackend',
     'social_core.backends.google.GoogleOAuth2',
     'social_core.backends.facebook.FacebookOAuth2',
-    'django.contrib.auth.backends.ModelBackend',
 )
 
 
@@ -1,20 +1,26 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
+from mesrecettes.media import media_file
+from mesrecettes.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('mes-recettes/', include('mesrecettes.urls')),
     path('api/', include('mesrecettes.urls')),  # Alias pour l'API
     path('auth/', include('social_django.urls', namespace='social')),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus
+    # Fichiers media : contrôle d'accès puis envoi délégué au serveur web (mesrecettes/media.py)
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), media_file, name='media'),
     path('', RedirectView.as_view(url='/mes-recettes/', permanent=False)),  # Redirection de la racine
 ]
 
-# Servir les fichiers média et statiques
+# Servir les fichiers statiques
 # En développement (DEBUG=True), Django sert les fichiers statiques directement
 # En production (DEBUG=False), WhiteNoise sert les fichiers statiques
 if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file